@@ -0,0 +1,252 @@
+import json
+import select
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .devices import YEELIGHT_PORT
+
+# Limits of the Yeelight LAN protocol
+MIN_COLOR_TEMP = 1700
+MAX_COLOR_TEMP = 6500
+
+# Result placeholder for bulbs apply() leaves alone
+SKIPPED = object()
+
+class BulbError(Exception):
+    """A bulb rejected a command or could not be reached."""
+
+class BulbConnection:
+    """
+    Persistent connection to one Yeelight bulb.
+
+    Commands are JSON lines over TCP. The socket is opened on first use
+    and kept for later commands. Bulbs drop idle connections, so a command
+    that fails on a reused socket is retried once on a fresh one. Bulbs
+    also push property notifications over the same socket whenever their
+    state changes, e.g. when switched off from the app; these are used to
+    track the bulb's power state without asking for it before every command.
+    """
+
+    def __init__(self, address, port=YEELIGHT_PORT, timeout=2.0):
+        """
+        Initialize the connection (nothing is opened yet).
+
+        Args:
+            address (str): Bulb IP address
+            port (int): Bulb control port
+            timeout (float): Seconds to wait for connecting and for each reply
+        """
+        self.address = address
+        self.port = port
+        self.timeout = timeout
+        self.connects = 0
+        self.power = None  # 'on', 'off' or None until known
+        self._sock = None
+        self._buffer = b''
+        self._next_id = 1
+        self._lock = threading.Lock()  # one command in flight per bulb
+
+    def command(self, method, params):
+        """
+        Send a command and wait for its reply.
+
+        Returns:
+            list: The command's result
+
+        Raises:
+            BulbError: If the bulb returned an error or could not be reached
+        """
+        return self._call(lambda: self._exchange(method, params))
+
+    def power_state(self):
+        """
+        Return the bulb's power state, 'on' or 'off'.
+
+        Notifications that arrived since the last command are read first;
+        the bulb is only asked when the state isn't known yet, i.e. once
+        per connection.
+
+        Raises:
+            BulbError: As for command()
+        """
+        def read_power():
+            self._drain()
+            if self.power is None:
+                self.power = self._exchange('get_prop', ['power'])[0]
+            return self.power
+        return self._call(read_power)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _call(self, action):
+        """Run an exchange under the lock, reconnecting once if a reused socket fails."""
+        with self._lock:
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if not reused:
+                        self._connect()
+                    return action()
+                except OSError as e:
+                    self._close()
+                    if not reused or attempt:
+                        raise BulbError(f"{self.address}:{self.port}: {e}") from e
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.address, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connects += 1
+
+    def _exchange(self, method, params):
+        request_id = self._next_id
+        self._next_id += 1
+        message = json.dumps({'id': request_id, 'method': method, 'params': params})
+        self._sock.sendall(message.encode() + b'\r\n')
+        while True:
+            reply = self._handle(self._read_line())
+            if reply is None or reply.get('id') != request_id:
+                continue  # a notification, or a reply we stopped waiting for
+            if 'error' in reply:
+                raise BulbError(f"{self.address}:{self.port}: {reply['error']}")
+            return reply.get('result')
+
+    def _drain(self):
+        """Handle whatever the bulb has sent without waiting for more."""
+        while select.select([self._sock], [], [], 0)[0]:
+            data = self._sock.recv(4096)
+            if not data:
+                raise ConnectionResetError("connection closed by bulb")
+            self._buffer += data
+        while b'\n' in self._buffer:
+            line, self._buffer = self._buffer.split(b'\n', 1)
+            self._handle(line)
+
+    def _read_line(self):
+        while b'\n' not in self._buffer:
+            data = self._sock.recv(4096)
+            if not data:
+                raise ConnectionResetError("connection closed by bulb")
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line
+
+    def _handle(self, line):
+        """Parse a message, noting any power change it reports."""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(message, dict):
+            return None
+        if message.get('method') == 'props':
+            power = (message.get('params') or {}).get('power')
+            if power is not None:
+                self.power = power
+        return message
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buffer = b''
+        self.power = None  # may have changed while disconnected
+
+
+class BulbPool:
+    """
+    Pool of persistent bulb connections with concurrent fan-out.
+
+    One connection is kept per bulb and reused across applies, and a
+    command for many bulbs is sent to all of them at once from a thread
+    pool, so applying settings costs one round-trip however many bulbs
+    there are.
+    """
+
+    def __init__(self, max_workers=16, timeout=2.0):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers (int): Bulbs commanded concurrently
+            timeout (float): Seconds to wait for connecting and for each reply
+        """
+        self.timeout = timeout
+        self._connections = {}  # (address, port) -> BulbConnection
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulb")
+
+    def connection(self, device):
+        """Return the pooled connection to a device dict with 'address' and 'port'."""
+        key = (device['address'], device.get('port', YEELIGHT_PORT))
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None:
+                connection = self._connections[key] = BulbConnection(*key, timeout=self.timeout)
+            return connection
+
+    def send_all(self, devices, method, params):
+        """
+        Send the same command to every device concurrently.
+
+        Returns:
+            dict: Device id -> result, or the BulbError it failed with
+        """
+        return self._fan_out(devices, lambda connection: connection.command(method, params))
+
+    def apply(self, devices, brightness, color_temp):
+        """
+        Set brightness and colour temperature on every device that is on.
+
+        Both go in a single set_scene command per bulb instead of separate
+        set_bright and set_ct_abx round-trips. set_scene also switches a bulb
+        on, so bulbs that are off are left alone, as the separate commands
+        (which an off bulb rejects) did.
+
+        Returns:
+            dict: As for send_all, without the bulbs that are off
+        """
+        brightness = int(min(100, max(1, round(brightness))))
+        color_temp = int(min(MAX_COLOR_TEMP, max(MIN_COLOR_TEMP, round(color_temp))))
+
+        def set_scene(connection):
+            if connection.power_state() != 'on':
+                return SKIPPED
+            return connection.command('set_scene', ['ct', color_temp, brightness])
+
+        results = self._fan_out(devices, set_scene)
+        return {device_id: result for device_id, result in results.items() if result is not SKIPPED}
+
+    def _fan_out(self, devices, action):
+        """Run action on the connection of every device concurrently."""
+        futures = {device.get('id', device['address']):
+                   self._executor.submit(action, self.connection(device))
+                   for device in devices}
+        results = {}
+        for device_id, future in futures.items():
+            try:
+                results[device_id] = future.result()
+            except BulbError as e:
+                results[device_id] = e
+        return results
+
+    def retain(self, devices):
+        """Close connections to bulbs that are no longer among devices."""
+        keep = {(device['address'], device.get('port', YEELIGHT_PORT)) for device in devices}
+        with self._lock:
+            dropped = [self._connections.pop(key) for key in list(self._connections) if key not in keep]
+        for connection in dropped:
+            connection.close()
+
+    def close(self):
+        """Close every connection and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
\ No newline at end of file
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+SSDP_ADDRESS = ('239.255.255.250', 1982)
+YEELIGHT_SEARCH = (b'M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1982\r\n'
+                   b'MAN: "ssdp:discover"\r\nST: wifi_bulb\r\n')
+YEELIGHT_PORT = 55443
+
+def discover_yeelight(timeout=1.0, address=SSDP_ADDRESS):
+    """
+    Find Yeelight bulbs on the local network with an SSDP search.
+
+    Every reply that arrives within the timeout is collected, not just
+    the first one.
+
+    Args:
+        timeout (float): Seconds to wait for replies
+        address (tuple): Where to send the search, the SSDP multicast group by default
+
+    Returns:
+        list: Device dicts with 'id', 'address', 'port' and 'model'
+    """
+    devices = {}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        sock.sendto(YEELIGHT_SEARCH, address)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            sock.settimeout(remaining)
+            try:
+                reply, (host, _) = sock.recvfrom(4096)
+            except socket.timeout:
+                break
+            headers = {}
+            for line in reply.decode('utf-8', 'replace').split('\r\n')[1:]:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            bulb_address, port = host, YEELIGHT_PORT
+            location = headers.get('location', '')
+            if location.startswith('yeelight://'):
+                bulb_address, _, port_text = location[len('yeelight://'):].partition(':')
+                port = int(port_text) if port_text.isdigit() else YEELIGHT_PORT
+            device_id = headers.get('id') or f'{bulb_address}:{port}'
+            devices[device_id] = {'id': device_id, 'address': bulb_address, 'port': port,
+                                  'model': headers.get('model')}
+    finally:
+        sock.close()
+    return list(devices.values())
+
+def discover_hue(config_path='~/.hue_bridge'):
+    """
+    Read the configured Philips Hue bridge.
+
+    Returns:
+        list: A device dict with 'id' and 'address' per configured bridge
+    """
+    path = os.path.expanduser(config_path)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        address = f.read().strip()
+    return [{'id': address, 'address': address}] if address else []
+
+# Discovery function per device kind
+DISCOVERERS = {
+    'hue': discover_hue,
+    'yeelight': discover_yeelight,
+}
+
+class DeviceRegistry:
+    """
+    Registry of known lighting devices, filled by background discovery.
+
+    Discovery of each device kind runs on a background thread: right
+    away for kinds whose cached results are missing or older than
+    ``ttl``, then every ``refresh_interval`` seconds. Discovery results are
+    merged into what is known: multicast replies get lost, so a device is
+    only forgotten once it has been missing from ``max_misses`` scans in a
+    row or has not been seen for ``ttl`` seconds. Results are kept in
+    a JSON file, so after a restart the devices found last time are
+    addressable immediately while a fresh discovery runs. Reading the
+    registry never touches the network.
+    """
+
+    def __init__(self, path=None, ttl=86400, refresh_interval=3600, discoverers=None, max_misses=3):
+        """
+        Initialize the registry from its cache file.
+
+        Args:
+            path (str): JSON cache file, defaults to ~/.env-sense/devices.json
+            ttl (float): Seconds after which a kind's cached devices are rediscovered at startup
+            refresh_interval (float): Seconds between background discoveries, None to never repeat
+            discoverers (dict): Device kind -> callable returning device dicts,
+                defaults to DISCOVERERS
+            max_misses (int): Scans in a row a device may be missing from before it is forgotten
+        """
+        self.path = path or os.path.join(os.path.expanduser('~'), '.env-sense', 'devices.json')
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.discoverers = dict(DISCOVERERS if discoverers is None else discoverers)
+        self.max_misses = max_misses
+        self.logger = logging.getLogger("DeviceRegistry")
+
+        self._lock = threading.Lock()
+        # kind -> {'discovered_at': epoch seconds, 'devices': [...],
+        #          'seen': {device id: epoch seconds}, 'misses': {device id: scans}}
+        self._kinds = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._load()
+
+    def devices(self, kind=None):
+        """Return copies of the known devices, of one kind or all of them."""
+        with self._lock:
+            kinds = [kind] if kind is not None else list(self._kinds)
+            return [dict(device, kind=k) for k in kinds
+                    for device in self._kinds.get(k, {}).get('devices', [])]
+
+    def kinds(self):
+        """Return the device kinds with at least one known device."""
+        with self._lock:
+            return [kind for kind, entry in self._kinds.items() if entry['devices']]
+
+    def is_stale(self, kind, now=None):
+        """Check whether a kind has never been discovered or its results are older than ttl."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._kinds.get(kind)
+        return entry is None or now - entry['discovered_at'] >= self.ttl
+
+    def on_change(self, callback):
+        """Register a callable invoked with the kind whose devices changed."""
+        self._listeners.append(callback)
+
+    def update(self, kind, devices):
+        """Replace the devices of a kind and save the registry."""
+        now = time.time()
+        devices = [dict(device) for device in devices]
+        self._set(kind, {'discovered_at': now, 'devices': devices,
+                         'seen': {self._key(device): now for device in devices}, 'misses': {}})
+
+    def refresh(self, kinds=None):
+        """Run discovery now for some kinds (default: all) and merge in the results."""
+        for kind in list(self.discoverers) if kinds is None else kinds:
+            try:
+                devices = self.discoverers[kind]()
+            except Exception as e:
+                # Keep what we knew; the next refresh tries again
+                self.logger.error(f"Error discovering {kind} devices: {e}")
+                continue
+            self._set(kind, self._merge(kind, devices))
+
+    def _merge(self, kind, found):
+        """Combine a discovery's results with the known devices of a kind."""
+        now = time.time()
+        with self._lock:
+            entry = self._kinds.get(kind, {})
+            known = entry.get('devices', [])
+            last_scan = entry.get('discovered_at', now)
+            seen = dict(entry.get('seen', {}))
+            misses = dict(entry.get('misses', {}))
+
+        devices = [dict(device) for device in found]
+        found_keys = set()
+        for device in devices:
+            key = self._key(device)
+            found_keys.add(key)
+            seen[key] = now
+            misses.pop(key, None)
+        for device in known:
+            key = self._key(device)
+            if key in found_keys:
+                continue
+            misses[key] = misses.get(key, 0) + 1
+            if misses[key] < self.max_misses and now - seen.get(key, last_scan) < self.ttl:
+                devices.append(dict(device))  # probably a lost reply; keep it for now
+            else:
+                self.logger.info(f"Forgetting {kind} device {key}, not seen in {misses[key]} scans")
+                seen.pop(key, None)
+                misses.pop(key)
+        return {'discovered_at': now, 'devices': devices, 'seen': seen, 'misses': misses}
+
+    def _set(self, kind, entry):
+        """Store a kind's entry, save the registry and notify listeners if its devices changed."""
+        with self._lock:
+            previous = self._kinds.get(kind, {}).get('devices')
+            self._kinds[kind] = entry
+        self._save()
+        if entry['devices'] != previous:
+            self.logger.info(f"Found {len(entry['devices'])} {kind} device(s)")
+            for callback in list(self._listeners):
+                try:
+                    callback(kind)
+                except Exception as e:
+                    self.logger.error(f"Error in device change listener: {e}")
+
+    @staticmethod
+    def _key(device):
+        return str(device.get('id') or device['address'])
+
+    def start(self):
+        """Start background discovery."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="device-discovery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop background discovery."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _run(self):
+        """Discovery thread: refresh stale kinds now, then all of them periodically."""
+        self.refresh([kind for kind in self.discoverers if self.is_stale(kind)])
+        while self.refresh_interval and not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+    def _load(self):
+        """Load the cached registry, ignoring a missing or unreadable file."""
+        try:
+            with open(self.path) as f:
+                kinds = json.load(f).get('kinds', {})
+            with self._lock:
+                self._kinds = {kind: {'discovered_at': float(entry['discovered_at']),
+                                      'devices': list(entry['devices']),
+                                      'seen': dict(entry.get('seen', {})),
+                                      'misses': dict(entry.get('misses', {}))}
+                               for kind, entry in kinds.items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            self.logger.warning(f"Ignoring unreadable device registry {self.path}: {e}")
+
+    def _save(self):
+        """Write the registry atomically."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self._lock:
+                state = json.dumps({'kinds': self._kinds}, indent=2)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(state)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.error(f"Error saving device registry: {e}")
\ No newline at end of file
@@ -1,19 +1,36 @@
 import logging
 import subprocess
-import os
+from .bulbs import BulbError, BulbPool
+from .devices import DeviceRegistry
 
 class LightingAdapter:
     """Adapter for controlling lighting in the user's environment."""
     
-    def __init__(self):
+    def __init__(self, registry=None, bulb_pool=None):
+        """
+        Initialize the adapter.
+        
+        Args:
+            registry: DeviceRegistry of known lights, defaults to one cached in
+                ~/.env-sense; discovery runs in the background and never blocks
+            bulb_pool: BulbPool holding the Yeelight connections, defaults to a new one
+        """
         self.logger = logging.getLogger("LightingAdapter")
         self.current_settings = {
             'lighting_brightness': 75,
             'lighting_color_temp': 4000,  # Kelvin
             'lighting_mode': 'auto'
         }
-        # Check which lighting systems are available
-        self.available_systems = self._detect_lighting_systems()
+        self.registry = registry or DeviceRegistry()
+        self.bulb_pool = bulb_pool or BulbPool()
+        # Drop connections to bulbs that disappear from the network
+        self.registry.on_change(self._on_devices_changed)
+        self.registry.start()
+        
+    @property
+    def available_systems(self):
+        """Lighting systems with known devices, from the device registry."""
+        return self._detect_lighting_systems()
         
     def supported_settings(self):
         """Return a list of settings this adapter can modify."""
@@ -45,48 +62,34 @@ class LightingAdapter:
         """Return current lighting settings."""
         return self.current_settings.copy()
         
-    def _detect_lighting_systems(self):
-        """Detect available lighting systems."""
-        systems = []
+    def close(self):
+        """Stop background device discovery and close bulb connections."""
+        self.registry.stop()
+        self.bulb_pool.close()
         
-        # Check for Phillips Hue Bridge
-        try:
-            # Simple check if Hue bridge IP is stored in config file
-            if os.path.exists(os.path.expanduser('~/.hue_bridge')):
-                systems.append('hue')
-        except:
-            pass
-            
-        # Check for Yeelight bulbs on network
-        try:
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.settimeout(1)
-            sock.sendto(b'M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1982\r\nMAN: "ssdp:discover"\r\nST: wifi_bulb\r\n', ('239.255.255.250', 1982))
-            try:
-                sock.recvfrom(1024)
-                systems.append('yeelight')
-            except socket.timeout:
-                pass
-        except:
-            pass
+    def _on_devices_changed(self, kind):
+        if kind == 'yeelight':
+            self.bulb_pool.retain(self.registry.devices('yeelight'))
+        
+    def _detect_lighting_systems(self):
+        """Detect available lighting systems from the devices discovered so far."""
+        systems = [kind for kind in ('hue', 'yeelight') if kind in self.registry.kinds()]
             
         # Windows always available for screen brightness
         systems.append('windows')
         
-        self.logger.info(f"Detected lighting systems: {systems}")
         return systems
         
     def _apply_hue_settings(self):
         """Apply settings to Phillips Hue lights."""
         try:
             # This would use a proper Hue API in production
-            bridge_ip = open(os.path.expanduser('~/.hue_bridge')).read().strip()
+            bridges = [device['address'] for device in self.registry.devices('hue')]
             brightness = self.current_settings['lighting_brightness']
             color_temp = self.current_settings['lighting_color_temp']
             
             # Mock implementation - in production, use the Hue API
-            self.logger.info(f"Setting Hue lights to brightness: {brightness}, color temp: {color_temp}")
+            self.logger.info(f"Setting Hue lights on {bridges} to brightness: {brightness}, color temp: {color_temp}")
             return True
         except Exception as e:
             self.logger.error(f"Error setting Hue lights: {e}")
@@ -95,19 +98,19 @@ class LightingAdapter:
     def _apply_yeelight_settings(self):
         """Apply settings to Yeelight bulbs."""
         try:
-            from yeelight import discover_bulbs, Bulb
-            
-            bulbs = discover_bulbs()
+            # Only bulbs the background discovery already found
+            bulbs = self.registry.devices('yeelight')
             brightness = self.current_settings['lighting_brightness']
             color_temp = self.current_settings['lighting_color_temp']
             
-            for bulb_info in bulbs:
-                bulb = Bulb(bulb_info["ip"])
-                bulb.set_brightness(brightness)
-                bulb.set_color_temp(color_temp)
+            # One combined command per bulb, sent to all bulbs at once
+            results = self.bulb_pool.apply(bulbs, brightness, color_temp)
+            failed = [result for result in results.values() if isinstance(result, BulbError)]
+            for error in failed:
+                self.logger.error(f"Error setting Yeelight bulb: {error}")
                 
-            self.logger.info(f"Set {len(bulbs)} Yeelight bulbs to brightness: {brightness}, color temp: {color_temp}")
-            return True
+            self.logger.info(f"Set {len(results) - len(failed)} of {len(bulbs)} Yeelight bulbs to brightness: {brightness}, color temp: {color_temp}")
+            return not failed or len(failed) < len(results)
         except Exception as e:
             self.logger.error(f"Error setting Yeelight bulbs: {e}")
             return False
@@ -3,7 +3,13 @@ import subprocess
 import ctypes
 from ctypes import cast, POINTER
 import os
-from playsound import playsound
+
+# Sound profile playback is optional
+try:
+    from playsound import playsound
+    PLAYSOUND_AVAILABLE = True
+except ImportError:
+    PLAYSOUND_AVAILABLE = False
 
 # Try to import Windows-specific audio libraries
 try:
@@ -30,7 +36,9 @@ class SoundManager:
             print(f"Profile '{profile_name}' not found.")
 
     def play_sound(self):
-        if self.current_profile and os.path.exists(self.current_profile):
+        if not PLAYSOUND_AVAILABLE:
+            print("Sound playback is not available (playsound is not installed).")
+        elif self.current_profile and os.path.exists(self.current_profile):
             playsound(self.current_profile)
         else:
             print("No sound profile set or file does not exist.")
@@ -2,11 +2,17 @@ import logging
 import subprocess
 import json
 import os
-import win32gui
-import win32con
-import win32process
-import psutil
 import time
+from ..core.process_cache import shared_cache
+
+# Window management needs the Win32 API
+try:
+    import win32gui
+    import win32con
+    import win32process
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
 
 class Workspace:
     def __init__(self):
@@ -38,8 +44,9 @@ class Workspace:
 class WorkspaceAdapter:
     """Adapter for controlling window and application arrangements."""
     
-    def __init__(self):
+    def __init__(self, process_cache=None):
         self.logger = logging.getLogger("WorkspaceAdapter")
+        self.processes = process_cache or shared_cache()
         self.current_settings = {
             'app_arrangement': 'default',
             'desktop_arrangement': 'default',
@@ -92,8 +99,9 @@ class WorkspaceAdapter:
             if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
                 try:
                     _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                    process = psutil.Process(pid)
-                    app_name = process.name()
+                    app_name = self.processes.name(pid)
+                    if app_name is None:
+                        return True
                     
                     # Get window position and state
                     rect = win32gui.GetWindowRect(hwnd)
@@ -127,23 +135,26 @@ class WorkspaceAdapter:
             self.logger.warning(f"No saved layout found for '{layout_name}'")
             return False
             
+        # Index the visible windows by process name in one enumeration pass
+        windows_by_app = {}
+        
+        def enum_callback(hwnd, extra):
+            if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
+                try:
+                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                    app_name = self.processes.name(pid)
+                    if app_name in layout:
+                        windows_by_app.setdefault(app_name, []).append(hwnd)
+                except:
+                    pass
+            return True
+            
+        win32gui.EnumWindows(enum_callback, None)
+        
         # Find and arrange windows
         for app_name, window_info in layout.items():
             try:
-                # Find matching windows by process name
-                def enum_callback(hwnd, results):
-                    if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
-                        try:
-                            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                            process = psutil.Process(pid)
-                            if process.name() == app_name:
-                                results.append(hwnd)
-                        except:
-                            pass
-                    return True
-                    
-                matching_windows = []
-                win32gui.EnumWindows(enum_callback, matching_windows)
+                matching_windows = windows_by_app.get(app_name, [])
                 
                 # Arrange each matching window
                 for hwnd in matching_windows:
@@ -222,12 +233,7 @@ class WorkspaceAdapter:
         target_apps = set(self.current_settings['active_apps'])
         
         # Get currently running apps
-        running_apps = set()
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                running_apps.add(proc.info['name'])
-            except:
-                pass
+        running_apps = self.processes.names()
                 
         # Apps to launch
         to_launch = target_apps - running_apps
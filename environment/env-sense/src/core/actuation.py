@@ -0,0 +1,94 @@
+import logging
+import threading
+
+# Default per-setting tolerances; changes within these are not worth actuating
+DEFAULT_TOLERANCES = {
+    'lighting_brightness': 2,    # percentage points
+    'lighting_color_temp': 100,  # Kelvin
+    'sound_volume': 2,           # percentage points
+}
+
+class ActuationLayer:
+    """
+    Applies recommended settings through adapters, skipping no-op changes.
+
+    The layer remembers the settings each adapter last applied successfully
+    and only forwards settings that differ from them by more than their
+    tolerance. In steady state most cycles therefore make no adapter calls
+    at all, which avoids the subprocess and OS API work behind them.
+    """
+
+    def __init__(self, adapters, tolerances=None):
+        """
+        Initialize the actuation layer.
+
+        Args:
+            adapters (list): Adapter objects that can modify the environment
+            tolerances (dict): Optional per-setting tolerances overriding the defaults
+        """
+        self.adapters = adapters
+        self.tolerances = dict(DEFAULT_TOLERANCES)
+        if tolerances:
+            self.tolerances.update(tolerances)
+        self.logger = logging.getLogger("ActuationLayer")
+        self._applied = {}  # adapter -> settings it last applied successfully
+        self._lock = threading.Lock()
+
+    def apply(self, settings, force=False):
+        """
+        Apply settings through every adapter that supports them.
+
+        Args:
+            settings (dict): Desired environment settings
+            force (bool): Apply all supported settings even if unchanged
+
+        Returns:
+            dict: Settings that were sent to each adapter, keyed by adapter class name
+        """
+        applied = {}
+        for adapter in self.adapters:
+            relevant_settings = {k: v for k, v in settings.items()
+                                if k in adapter.supported_settings()}
+            if not force:
+                relevant_settings = self.changed_settings(adapter, relevant_settings)
+            if not relevant_settings:
+                continue
+
+            if adapter.apply_settings(relevant_settings):
+                with self._lock:
+                    self._applied.setdefault(adapter, {}).update(relevant_settings)
+            else:
+                # Leave the state untouched so the change is retried next cycle
+                self.logger.warning(f"{adapter.__class__.__name__} failed to apply {relevant_settings}")
+            applied[adapter.__class__.__name__] = relevant_settings
+
+        return applied
+
+    def changed_settings(self, adapter, settings):
+        """Return the subset of settings that differ from what the adapter last applied."""
+        with self._lock:
+            last_applied = self._applied.get(adapter, {})
+            return {k: v for k, v in settings.items()
+                    if k not in last_applied or not self._within_tolerance(k, last_applied[k], v)}
+
+    def last_applied(self, adapter):
+        """Return the settings an adapter last applied successfully."""
+        with self._lock:
+            return dict(self._applied.get(adapter, {}))
+
+    def reset(self, adapter=None):
+        """Forget applied state so the next apply pushes every setting again."""
+        with self._lock:
+            if adapter is None:
+                self._applied.clear()
+            else:
+                self._applied.pop(adapter, None)
+
+    def _within_tolerance(self, name, old, new):
+        """Check whether a new value is close enough to the applied one to skip it."""
+        tolerance = self.tolerances.get(name)
+        if (tolerance is not None and isinstance(old, (int, float))
+                and isinstance(new, (int, float))
+                and not isinstance(old, bool) and not isinstance(new, bool)):
+            return abs(new - old) <= tolerance
+        return old == new
\ No newline at end of file
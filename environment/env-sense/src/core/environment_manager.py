@@ -1,12 +1,24 @@
 import logging
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from .actuation import ActuationLayer
+from .scheduler import TimerWheel
+
+# Scheduler key of the periodic storage rollup/retention job
+STORAGE_MAINTENANCE = 'storage_maintenance'
+
+# Check frequency at which collectors run at their configured intervals
+DEFAULT_ADJUSTMENT_FREQUENCY = 60
 
 class EnvironmentManager:
     """Central coordinator for the personalized environment system."""
     
-    def __init__(self, data_collectors, preference_engine, adapters):
+    def __init__(self, data_collectors, preference_engine, adapters,
+                 collector_timeout=5.0, collector_timeouts=None, max_workers=4,
+                 collector_intervals=None, collector_ttls=None, scheduler_tick=1.0,
+                 actuation_tolerances=None, storage=None, maintenance_interval=3600):
         """
         Initialize the environment manager.
         
@@ -14,14 +26,43 @@ class EnvironmentManager:
             data_collectors (list): List of collector objects that gather environmental data
             preference_engine: Engine that determines user preferences
             adapters (list): List of adapter objects that can modify the environment
+            collector_timeout (float): Default deadline in seconds for each collector per cycle
+            collector_timeouts (dict): Optional per-collector deadlines keyed by class name
+            max_workers (int): Size of the worker pool used to run collectors in parallel
+            collector_intervals (dict): Optional per-collector sampling intervals keyed by class name
+            collector_ttls (dict): Optional per-collector data lifetimes keyed by class name
+            scheduler_tick (float): Resolution of the collector scheduler in seconds
+            actuation_tolerances (dict): Optional per-setting tolerances below which changes are skipped
+            storage: Optional DataStorage that each snapshot is recorded to
+            maintenance_interval (float): Seconds between storage rollup/retention runs,
+                None to disable them
         """
         self.data_collectors = data_collectors
         self.preference_engine = preference_engine
         self.adapters = adapters
+        self.storage = storage
+        self.maintenance_interval = maintenance_interval
+        self._maintenance = None  # future of a running storage maintenance job
         self.running = False
         self.monitoring_thread = None
-        self.adjustment_frequency = 60  # seconds between environment checks
+        self._adjustment_frequency = DEFAULT_ADJUSTMENT_FREQUENCY
+        self._frequency_changed = False
+        self.collector_timeout = collector_timeout
+        self.collector_timeouts = dict(collector_timeouts or {})
+        self.collector_intervals = dict(collector_intervals or {})
+        self.collector_ttls = dict(collector_ttls or {})
+        self.max_workers = max_workers
+        self.executor = None
+        self.scheduler = TimerWheel(tick=scheduler_tick)
+        self.actuator = ActuationLayer(adapters, actuation_tolerances)
         self.logger = logging.getLogger("EnvironmentManager")
+
+        # Last good result, its age and in-flight future for each collector
+        self._collector_lock = threading.RLock()
+        self._last_results = {}
+        self._result_times = {}
+        self._pending = {}
+        self._stop_event = threading.Event()
         
     def start(self):
         """Start the environment monitoring and adjustment system."""
@@ -29,6 +70,9 @@ class EnvironmentManager:
             return
             
         self.running = True
+        self._stop_event.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="collector")
         self.monitoring_thread = threading.Thread(target=self._monitoring_loop)
         self.monitoring_thread.daemon = True
         self.monitoring_thread.start()
@@ -37,37 +81,247 @@ class EnvironmentManager:
     def stop(self):
         """Stop the environment monitoring and adjustment system."""
         self.running = False
+        self._stop_event.set()
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5.0)
+        if self.executor:
+            # Don't wait on collectors that are stuck in a slow call
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.preference_engine is not None:
+            self.preference_engine.close()
+        if self.storage is not None:
+            # Don't lose samples still waiting in the write buffer
+            self.storage.flush()
         self.logger.info("Environment manager stopped")
         
+    @property
+    def adjustment_frequency(self):
+        """
+        Overall check period in seconds.
+
+        Every collector interval and TTL is scaled by this over
+        DEFAULT_ADJUSTMENT_FREQUENCY, so 30 samples everything twice as
+        often as configured and 120 half as often. A change takes effect
+        on the next scheduler tick.
+        """
+        return self._adjustment_frequency
+
+    @adjustment_frequency.setter
+    def adjustment_frequency(self, value):
+        self._adjustment_frequency = value
+        self._frequency_changed = True
+
+    def _scaled(self, seconds):
+        return seconds * self._adjustment_frequency / DEFAULT_ADJUSTMENT_FREQUENCY
+
+    def collector_deadline(self, collector):
+        """Return the per-cycle deadline in seconds for a collector."""
+        name = collector.__class__.__name__
+        if name in self.collector_timeouts:
+            return self.collector_timeouts[name]
+        return getattr(collector, 'timeout', self.collector_timeout)
+
+    def collector_interval(self, collector):
+        """Return how often in seconds a collector should be sampled."""
+        name = collector.__class__.__name__
+        if name in self.collector_intervals:
+            return self._scaled(self.collector_intervals[name])
+        return self._scaled(getattr(collector, 'interval', DEFAULT_ADJUSTMENT_FREQUENCY))
+
+    def collector_ttl(self, collector):
+        """Return how long in seconds a collector's result stays fresh."""
+        name = collector.__class__.__name__
+        if name in self.collector_ttls:
+            return self._scaled(self.collector_ttls[name])
+        if hasattr(collector, 'ttl'):
+            return self._scaled(collector.ttl)
+        return self.collector_interval(collector)
+
+    def is_stale(self, collector, now=None):
+        """Check whether a collector's cached result has outlived its TTL."""
+        now = time.monotonic() if now is None else now
+        with self._collector_lock:
+            collected_at = self._result_times.get(collector)
+        return collected_at is None or now - collected_at >= self.collector_ttl(collector)
+
+    def _collect_data(self, collectors=None):
+        """
+        Run collectors concurrently and merge the cached results of all of them.
+
+        Every collector run is given its own deadline measured from the start
+        of the cycle. Collectors that miss it are served from their last good
+        result, so the cycle takes at most as long as the largest deadline.
+        A collector still running from an earlier cycle is not resubmitted.
+
+        Args:
+            collectors (list): Collectors to run now, defaults to all of them
+
+        Returns:
+            dict: Snapshot assembled from the latest result of every collector
+        """
+        if collectors is None:
+            collectors = self.data_collectors
+        cycle_start = time.monotonic()
+        futures = {}
+
+        with self._collector_lock:
+            for collector in collectors:
+                future = self._pending.get(collector)
+                if future is None or future.done():
+                    future = self.executor.submit(collector.collect)
+                    self._pending[collector] = future
+                    future.add_done_callback(
+                        lambda f, c=collector: self._on_collector_done(c, f))
+                futures[collector] = future
+
+        for collector, future in futures.items():
+            remaining = cycle_start + self.collector_deadline(collector) - time.monotonic()
+            try:
+                self._store_result(collector, future.result(timeout=max(0.0, remaining)))
+            except FutureTimeoutError:
+                self.logger.warning(
+                    f"{collector.__class__.__name__} missed its deadline, using last result")
+            except Exception:
+                # Already logged by _on_collector_done
+                pass
+
+        return self._snapshot()
+
+    def _snapshot(self):
+        """Merge the cached results of all collectors into one data dict."""
+        current_data = {}
+        with self._collector_lock:
+            for collector in self.data_collectors:
+                current_data.update(self._last_results.get(collector, {}))
+        return current_data
+
+    def _on_collector_done(self, collector, future):
+        """Store the result of a finished collector, even if it arrived late."""
+        with self._collector_lock:
+            if self._pending.get(collector) is future:
+                del self._pending[collector]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Error in {collector.__class__.__name__}: {error}")
+            return
+        self._store_result(collector, future.result())
+
+    def _store_result(self, collector, result):
+        """Remember a collector result as its last good value."""
+        # Collectors return an empty dict when they fail internally
+        if result:
+            with self._collector_lock:
+                if self._last_results.get(collector) is not result:
+                    self._last_results[collector] = result
+                    self._result_times[collector] = time.monotonic()
+
+    def _due_collectors(self):
+        """Advance the scheduler one tick and return the due collectors whose data is stale."""
+        if self._frequency_changed:
+            # Move every collector to its interval at the new frequency
+            self._frequency_changed = False
+            for collector in self.data_collectors:
+                self.scheduler.schedule(collector, self.collector_interval(collector))
+        due = self.scheduler.advance()
+        # Allow half a tick of slack so results collected just after the
+        # previous tick don't look fresh and get skipped for a whole interval
+        now = time.monotonic() + self.scheduler.tick / 2
+        stale = []
+        for collector in due:
+            if collector is STORAGE_MAINTENANCE:
+                self._start_maintenance()
+                continue
+            self.scheduler.schedule(collector, self.collector_interval(collector))
+            if self.is_stale(collector, now):
+                stale.append(collector)
+        return stale
+
+    def _start_maintenance(self):
+        """Run storage rollups and retention on the worker pool, one run at a time."""
+        self.scheduler.schedule(STORAGE_MAINTENANCE, self.maintenance_interval)
+        if self._maintenance is not None and not self._maintenance.done():
+            return
+        self._maintenance = self.executor.submit(self.storage.apply_retention)
+
+    def apply_settings(self, settings, force=False):
+        """
+        Apply settings through the adapters, skipping ones that are already in place.
+
+        Args:
+            settings (dict): Desired environment settings
+            force (bool): Push every supported setting even if it looks unchanged
+
+        Returns:
+            dict: Settings that were sent to each adapter, keyed by adapter class name
+        """
+        return self.actuator.apply(settings, force=force)
+
+    def _adjust_environment(self, current_data):
+        """Get recommendations for the current data and apply the ones that changed."""
+        recommendations = self.preference_engine.get_recommendations(current_data)
+
+        applied = self.apply_settings(recommendations)
+        if applied:
+            self.logger.debug(f"Applied changed settings: {applied}")
+
+        return recommendations
+
+    def _record_snapshot(self, current_data, recommendations):
+        """Queue a snapshot and the recommendations made for it for storage."""
+        if self.storage is None:
+            return
+        record = dict(current_data)
+        record['recommendations'] = recommendations
+        self.storage.save_environment_data(datetime.now(), record)
+
     def _monitoring_loop(self):
-        """Main loop that periodically checks and adjusts the environment."""
+        """
+        Main loop that samples collectors on their own schedules and adjusts the environment.
+
+        The loop wakes once per scheduler tick. Only collectors that are due
+        and whose data has gone stale are run; the snapshot handed to the
+        preference engine is assembled from cached results, and the
+        environment is only re-evaluated when some collector was refreshed.
+        """
+        # Sample everything once, then let each collector follow its own interval
+        due = list(self.data_collectors)
+        for collector in self.data_collectors:
+            self.scheduler.schedule(collector, self.collector_interval(collector))
+        if self.storage is not None and self.maintenance_interval:
+            # Catch up on rollups soon after startup, then run periodically
+            self.scheduler.schedule(STORAGE_MAINTENANCE, self.scheduler.tick)
+        next_tick = time.monotonic()
+
         while self.running:
             try:
-                # 1. Collect current environment data
-                current_data = {}
-                for collector in self.data_collectors:
-                    current_data.update(collector.collect())
-                
-                # 2. Get recommended settings
-                recommendations = self.preference_engine.get_recommendations(current_data)
-                
-                # 3. Apply changes through adapters
-                for adapter in self.adapters:
-                    relevant_settings = {k: v for k, v in recommendations.items() 
-                                        if k in adapter.supported_settings()}
-                    if relevant_settings:
-                        adapter.apply_settings(relevant_settings)
-                
-                # 4. Record user feedback (if any)
-                # This would be handled via UI events
-                
-                # Log activity
-                self.logger.debug(f"Environment adjusted at {datetime.now()}")
-                
+                if due:
+                    # 1. Refresh stale collectors and assemble the snapshot
+                    current_data = self._collect_data(due)
+
+                    # 2-3. Get recommended settings and apply them
+                    recommendations = self._adjust_environment(current_data)
+                    self._record_snapshot(current_data, recommendations)
+
+                    # 4. Record user feedback (if any)
+                    # This would be handled via UI events
+
+                    # Log activity
+                    self.logger.debug(f"Environment adjusted at {datetime.now()} "
+                                      f"after refreshing {len(due)} collectors")
+
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {e}")
-            
-            # Sleep until next check
-            time.sleep(self.adjustment_frequency)
\ No newline at end of file
+
+            # Sleep until the next scheduler tick
+            next_tick += self.scheduler.tick
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind after a slow cycle; skip the missed ticks
+                next_tick = time.monotonic()
+                delay = 0
+            if self._stop_event.wait(delay):
+                break
+            due = self._due_collectors()
\ No newline at end of file
@@ -1,26 +1,73 @@
 import logging
 import numpy as np
-import pandas as pd
 from datetime import datetime
+from ..ml.backends import benchmark_backends
+from ..ml.cache import PredictionCache
+from ..ml.features import FeatureSchema
 from ..ml.models import UserPreferenceModel
+from ..ml.training import BackgroundTrainer, fit_model, validate_model
+from ..data.export import ColumnarDataset
 from ..data.storage import DataStorage
 
+# Order of the settings in a model's prediction/target vector
+SETTING_NAMES = ['lighting_brightness', 'sound_volume', 'temperature', 'app_arrangement', 'desktop_arrangement']
+ARRANGEMENT_TYPES = ['default', 'focused', 'relaxed', 'productive']
+
+# Target columns of the exported training dataset
+TARGET_COLUMNS = [f'target_{name}' for name in SETTING_NAMES]
+
 class PreferenceEngine:
     """Engine for determining user preferences based on collected data."""
     
-    def __init__(self, storage, model=None):
+    def __init__(self, storage, model=None, cache_size=512, cache_ttl=600,
+                 background_training=True, training_process=True,
+                 model_backend='random_forest', model_params=None,
+                 learning_mode='batch', consolidation_hours=None, dataset_path=None):
         """
         Initialize the preference engine.
         
         Args:
             storage: DataStorage instance for retrieving and storing preference data
             model: Optional pre-trained model
+            cache_size (int): Maximum number of memoized recommendations
+            cache_ttl (float): Seconds a memoized recommendation stays valid
+            background_training (bool): Train off the calling thread and hot-swap the model
+            training_process (bool): Fit background models in a separate worker process
+            model_backend (str): Estimator backend used for new models (see ml/backends.py)
+            model_params (dict): Optional estimator parameters for the backend
+            learning_mode (str): 'batch' to retrain from history, or 'incremental' to
+                update the model from each piece of feedback
+            consolidation_hours (float): In incremental mode, optionally refit from the
+                full history this often; None disables consolidation
+            dataset_path (str): Optional directory of a columnar training dataset that
+                new feedback is exported to and models are trained from memory-mapped
         """
         self.storage = storage
-        self.model = model if model else UserPreferenceModel()
+        self.model_options = {'backend': model_backend, 'backend_params': model_params}
+        self.model = model if model else UserPreferenceModel(**self.model_options)
         self.logger = logging.getLogger("PreferenceEngine")
+        self.learning_mode = learning_mode
+        self.consolidation_hours = consolidation_hours
+        if learning_mode == 'incremental' and not getattr(self.model, 'supports_partial_fit', False):
+            self.logger.warning(f"Backend '{model_backend}' cannot learn incrementally, "
+                                "falling back to batch training")
+            self.learning_mode = 'batch'
+        self._last_data = None  # data behind the most recent recommendation
         self.last_training_time = None
+        self.model_version = 0  # bumped whenever a new model is trained
+        self.prediction_cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
+        self.feature_schema = FeatureSchema()  # used for models that don't carry their own
+        self._feature_row = None  # reused inference buffer
         self.training_frequency_hours = 12  # Retrain model every 12 hours
+        self.training_retry_seconds = 300  # Wait between attempts while data is scarce
+        self.retrain_new_data = 20  # Retrain once more new feedback than this has arrived
+        self.last_training_attempt = None
+        self.dataset = ColumnarDataset(dataset_path) if dataset_path else None
+        self.trainer = None
+        if background_training:
+            self.trainer = BackgroundTrainer(self._load_training_data, self._swap_model,
+                                             use_process=training_process,
+                                             model_options=self.model_options)
         self.default_preferences = {
             'lighting_brightness': 75,  # percentage
             'sound_volume': 50,         # percentage
@@ -41,30 +88,74 @@ class PreferenceEngine:
         """
         # Check if model needs training or retraining
         if self._should_train_model():
-            self._train_model()
+            self._request_training()
         
         try:
-            # Prepare features for prediction
-            features = self._prepare_features(current_data)
+            # Remember the context so feedback can be attributed to it
+            self._last_data = current_data
+            
+            # Prepare features for prediction using the schema the model was trained on
+            model = self.model
+            schema = getattr(model, 'schema', None) or self.feature_schema
+            row = self._prepare_features(current_data, schema)
+            
+            # Serve repeated feature combinations from the memo cache
+            cache_key = (self.model_version, schema.quantize(row))
+            recommendations = self.prediction_cache.get(cache_key)
+            if recommendations is not None:
+                return recommendations.copy()
             
             # Get model predictions if model is available
-            if self.model and hasattr(self.model, 'predict'):
-                predictions = self.model.predict(features)
+            if model and hasattr(model, 'predict'):
+                if hasattr(model, 'predict_row'):
+                    # Fast path: scale in place and call the estimator directly
+                    predictions = model.predict_row(row)
+                else:
+                    predictions = model.predict(row.reshape(1, -1))
                 
                 # Convert predictions to recommendation dict
                 recommendations = self._convert_predictions_to_recommendations(predictions)
+                self.prediction_cache.put(cache_key, recommendations)
             else:
                 # Use default preferences if no model is available
                 recommendations = self.default_preferences.copy()
             
             # Log and return recommendations
             self.logger.debug(f"Generated recommendations: {recommendations}")
-            return recommendations
+            return recommendations.copy()
             
         except Exception as e:
             self.logger.error(f"Error generating recommendations: {e}")
             return self.default_preferences.copy()
     
+    def get_cache_stats(self):
+        """Return hit/miss counters for the recommendation cache."""
+        return self.prediction_cache.stats()
+    
+    def benchmark_backends(self, backends=None):
+        """
+        Benchmark model backends on the stored training history.
+        
+        The configured backend is benchmarked with the configured model
+        parameters, the others with their defaults.
+        
+        Args:
+            backends (list): Backend names to compare, defaults to all registered ones
+            
+        Returns:
+            list: Fit time, predict latency, model size and held-out error per backend
+        """
+        data = self._load_training_data(force=True)
+        if data is None or len(data[0]) < 4:
+            self.logger.warning("Not enough stored history to benchmark model backends")
+            return []
+        features, targets = data
+        if isinstance(features, ColumnarDataset):
+            features, targets = features.matrix(self.feature_schema.columns), features.matrix(targets)
+        options = self.model_options
+        return benchmark_backends(features, targets, backends=backends,
+                                  backend_params={options['backend']: options['backend_params']})
+    
     def record_feedback(self, settings, satisfaction_score):
         """
         Record user feedback about current environment settings.
@@ -81,80 +172,172 @@ class PreferenceEngine:
             data = {**settings, 'satisfaction': satisfaction_score, 'timestamp': datetime.now()}
             self.storage.store_feedback(data)
             
-            # Check if model should be retrained
-            if satisfaction_score < 50:  # Low satisfaction might trigger immediate retraining
-                self._train_model(force=True)
+            if self.learning_mode == 'incremental':
+                # Fold the feedback straight into the model instead of retraining
+                self._update_incrementally(settings, satisfaction_score)
+            elif satisfaction_score < 50:  # Low satisfaction might trigger immediate retraining
+                self._request_training(force=True)
                 
         except Exception as e:
             self.logger.error(f"Error recording feedback: {e}")
     
+    def close(self):
+        """Stop the background trainer's worker process, if there is one."""
+        if self.trainer:
+            self.trainer.shutdown()
+    
     def _should_train_model(self):
         """Check if the model needs training based on last training time or data volume."""
+        if self.trainer and self.trainer.is_training:
+            return False
+            
+        if self.learning_mode == 'incremental':
+            if not self.last_training_time:
+                # Bootstrap once from stored history, e.g. after a restart
+                return self.model_version == 0 and self.last_training_attempt is None
+            # After that full refits are only an optional consolidation step
+            if not self.consolidation_hours:
+                return False
+            hours_since_training = (datetime.now() - self.last_training_time).total_seconds() / 3600
+            return hours_since_training >= self.consolidation_hours
+            
         if not self.last_training_time:
+            # Don't hammer storage every cycle while there isn't enough data yet
+            if self.last_training_attempt:
+                seconds_since_attempt = (datetime.now() - self.last_training_attempt).total_seconds()
+                return seconds_since_attempt >= self.training_retry_seconds
             return True
             
         hours_since_training = (datetime.now() - self.last_training_time).total_seconds() / 3600
         if hours_since_training >= self.training_frequency_hours:
             return True
             
-        # Check if enough new data is available
-        new_data_count = self.storage.count_new_data(self.last_training_time)
-        if new_data_count > 20:  # Retrain if we have 20+ new data points
+        # Check if enough new data is available; the count stops at the threshold
+        new_data_count = self.storage.count_new_data(self.last_training_time,
+                                                     limit=self.retrain_new_data + 1)
+        if new_data_count > self.retrain_new_data:
             return True
             
         return False
         
+    def _request_training(self, force=False):
+        """Train in the background if enabled, otherwise synchronously."""
+        if self.trainer:
+            self.trainer.request(force=force)
+        else:
+            self._train_model(force=force)
+    
     def _train_model(self, force=False):
-        """Train or retrain the preference model using stored data."""
+        """Train or retrain the preference model synchronously using stored data."""
         try:
-            # Get training data from storage
-            training_data = self.storage.get_training_data()
-            
-            if len(training_data) < 10 and not force:
-                self.logger.info("Not enough data to train model")
+            data = self._load_training_data(force)
+            if data is None:
                 return False
-                
-            # Prepare features and targets
-            features = pd.DataFrame([d['features'] for d in training_data])
-            targets = pd.DataFrame([d['preferences'] for d in training_data])
-            
-            # Train the model
-            self.model.train(features, targets)
+            features, targets = data
             
-            # Update last training time
-            self.last_training_time = datetime.now()
-            self.logger.info(f"Model trained with {len(training_data)} data points")
+            # Train a new model and swap it in once it has been validated
+            model = fit_model(features, targets, **self.model_options)
+            if not validate_model(model, features):
+                self.logger.warning("Trained model failed validation, keeping the current one")
+                return False
+            self._swap_model(model, len(features))
             return True
             
         except Exception as e:
             self.logger.error(f"Error training model: {e}")
             return False
     
-    def _prepare_features(self, current_data):
-        """Prepare features for model prediction."""
-        # Extract relevant features
-        features = {}
+    def _load_training_data(self, force=False):
+        """Load training features and targets, or None if there is not enough data."""
+        self.last_training_attempt = datetime.now()
+        
+        if self.dataset is not None:
+            return self._load_training_dataset(force)
+        
+        # Get training data from storage
+        training_data = self.storage.get_training_data()
+        
+        if not training_data or (len(training_data) < 10 and not force):
+            self.logger.info("Not enough data to train model")
+            return None
+            
+        # Prepare features and targets
+        features = self.feature_schema.to_matrix([d['features'] for d in training_data])
+        targets = np.array([self._settings_to_targets(d['preferences']) for d in training_data])
+        return features, targets
+    
+    def _load_training_dataset(self, force=False):
+        """Export new feedback to the columnar dataset and return it for training."""
+        if self.dataset.columns and self.dataset.columns != self._dataset_columns():
+            self.logger.info("Feature schema changed, rebuilding the training dataset")
+            self.dataset.clear()
+        
+        self.storage.export_training_data(self.dataset, self._encode_training_rows)
         
-        # Time features
-        if 'time_hour' in current_data:
-            features['time_hour'] = current_data['time_hour']
-            features['time_minute'] = current_data.get('time_minute', 0)
-            features['time_day_of_week'] = current_data.get('time_day_of_week', 0)
-            features['time_is_weekend'] = current_data.get('time_is_weekend', 0)
+        if len(self.dataset) == 0 or (len(self.dataset) < 10 and not force):
+            self.logger.info("Not enough data to train model")
+            return None
         
-        # System features
-        if 'system_cpu_usage' in current_data:
-            features['system_cpu_usage'] = current_data['system_cpu_usage']
-            features['system_memory_usage'] = current_data.get('system_memory_usage', 50)
-            features['system_battery'] = current_data.get('system_battery', 100)
+        # Models read features and TARGET_COLUMNS straight from the memory maps
+        return self.dataset, TARGET_COLUMNS
+    
+    def _dataset_columns(self):
+        """Column layout of the exported training dataset."""
+        return self.feature_schema.columns + TARGET_COLUMNS + ['satisfaction']
+    
+    def _encode_training_rows(self, training_data):
+        """Encode get_training_data rows as dataset columns."""
+        features = self.feature_schema.to_matrix([d['features'] for d in training_data])
+        targets = np.array([self._settings_to_targets(d['preferences']) for d in training_data])
+        columns = dict(zip(self.feature_schema.columns, features.T))
+        columns.update(zip(TARGET_COLUMNS, targets.T))
+        columns['satisfaction'] = np.array([np.nan if d['satisfaction'] is None else d['satisfaction']
+                                            for d in training_data], dtype=float)
+        return columns
+    
+    def _swap_model(self, model, n_samples):
+        """Atomically replace the serving model and invalidate memoized predictions."""
+        # Rebinding the attribute is atomic, so predictions in flight keep using the old model
+        self.model = model
+        
+        # Update last training time and invalidate memoized predictions
+        self.last_training_time = datetime.now()
+        self.model_version += 1
+        self.prediction_cache.clear()
+        self.logger.info(f"Model trained with {n_samples} data points")
+    
+    def _update_incrementally(self, settings, satisfaction_score):
+        """Update the serving model with one feedback sample in constant time."""
+        if self._last_data is None:
+            self.logger.debug("No recommendation context for feedback yet")
+            return False
         
-        # Calendar features
-        if 'calendar_has_current_meeting' in current_data:
-            features['calendar_has_current_meeting'] = int(current_data['calendar_has_current_meeting'])
-            features['calendar_next_meeting_in_minutes'] = current_data.get('calendar_next_meeting_in_minutes', 1440)
+        # Weight the sample by satisfaction so disliked settings barely move the model
+        weight = max(0.0, min(100.0, float(satisfaction_score))) / 100.0
+        if weight <= 0:
+            return False
         
-        # Return as DataFrame for model
-        return pd.DataFrame([features])
+        self.model.partial_fit([self._last_data], [self._settings_to_targets(settings)],
+                               sample_weight=[weight])
+        self.model_version += 1
+        self.prediction_cache.clear()
+        return True
+    
+    def _settings_to_targets(self, settings):
+        """Convert a settings dict into a target vector, the inverse of the prediction mapping."""
+        targets = []
+        for name in SETTING_NAMES:
+            value = settings.get(name, self.default_preferences[name])
+            if name in ('app_arrangement', 'desktop_arrangement'):
+                value = ARRANGEMENT_TYPES.index(value) if value in ARRANGEMENT_TYPES else 0
+            targets.append(float(value))
+        return targets
+    
+    def _prepare_features(self, current_data, schema):
+        """Fill the reused feature row for model prediction."""
+        if self._feature_row is None or len(self._feature_row) != schema.width:
+            self._feature_row = schema.new_row()
+        return schema.fill(current_data, self._feature_row)
     
     def _convert_predictions_to_recommendations(self, predictions):
         """Convert model predictions to recommendation dictionary."""
@@ -162,10 +345,8 @@ class PreferenceEngine:
         recommendations = {}
         
         # This is simplified - in production, you would have a more robust mapping
-        setting_names = ['lighting_brightness', 'sound_volume', 'temperature', 'app_arrangement', 'desktop_arrangement']
-        
         # Convert predictions to appropriate types
-        for i, name in enumerate(setting_names):
+        for i, name in enumerate(SETTING_NAMES):
             if i < len(predictions[0]):
                 value = predictions[0][i]
                 
@@ -178,9 +359,8 @@ class PreferenceEngine:
                     recommendations[name] = max(18, min(26, int(value)))
                 elif name in ['app_arrangement', 'desktop_arrangement']:
                     # Convert numerical values to arrangement types
-                    arrangement_types = ['default', 'focused', 'relaxed', 'productive']
-                    idx = max(0, min(len(arrangement_types) - 1, int(value)))
-                    recommendations[name] = arrangement_types[idx]
+                    idx = max(0, min(len(ARRANGEMENT_TYPES) - 1, int(value)))
+                    recommendations[name] = ARRANGEMENT_TYPES[idx]
                 else:
                     recommendations[name] = value
         
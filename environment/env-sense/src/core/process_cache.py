@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+import psutil
+
+# What the cache knows about a process; (pid, create_time) identifies it
+# even after the pid has been reused
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'create_time', 'name'])
+
+def _lookup(pid):
+    """Read a process's identity from the OS, or None if it is gone."""
+    try:
+        process = psutil.Process(pid)
+        with process.oneshot():
+            return ProcessInfo(pid, process.create_time(), process.name())
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        return ProcessInfo(pid, None, None)
+
+def _create_time(pid):
+    """Read a process's create time, None if it can't be read, or raise if it is gone."""
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.AccessDenied:
+        return None
+    except psutil.ZombieProcess:
+        raise psutil.NoSuchProcess(pid)
+
+class ProcessCache:
+    """
+    Process-wide cache of process metadata.
+
+    The process table is scanned at most once per ``max_age`` seconds, and
+    incrementally: one cheap listing of the live pids, after which only
+    pids that weren't there last time are looked up and vanished ones are
+    dropped. Pids seen before only have their create time read, and are
+    looked up again if it changed, i.e. the pid was reused. Every collector
+    and adapter that needs process names shares one instance (see
+    shared_cache), so a monitoring cycle touches the process table once
+    however many of them ask.
+
+    Entries carry the process's create time, so a cached entry can be told
+    apart from a later process that reused its pid; process() checks this
+    before handing out a handle to act on.
+    """
+
+    def __init__(self, max_age=5.0, pids=None, lookup=None, create_time=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_age (float): Seconds a scan is reused before the next one
+            pids: Callable listing the live pids, defaults to psutil.pids
+            lookup: Callable mapping a pid to a ProcessInfo or None, defaults
+                to reading it with psutil
+            create_time: Callable mapping a pid to its create time, raising
+                psutil.NoSuchProcess if it is gone; defaults to reading it with
+                psutil, or to a full lookup when only lookup is given
+        """
+        self.max_age = max_age
+        self._pids = pids or psutil.pids
+        self._lookup = lookup or _lookup
+        if create_time is None:
+            create_time = _create_time if lookup is None else self._create_time_from_lookup
+        self._create_time = create_time
+        self.logger = logging.getLogger("ProcessCache")
+
+        self._entries = {}  # pid -> ProcessInfo
+        self._scanned = None  # monotonic time of the last scan
+        self._lock = threading.RLock()
+
+    def refresh(self, force=False):
+        """Rescan the process table if the last scan is older than max_age."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._scanned is not None and now - self._scanned < self.max_age:
+                return
+            try:
+                live = set(self._pids())
+            except Exception as e:
+                self.logger.error(f"Error listing processes: {e}")
+                return
+            for pid in set(self._entries) - live:
+                del self._entries[pid]
+            for pid, info in list(self._entries.items()):
+                if not self._is_current(info):
+                    del self._entries[pid]  # reused or gone; looked up below if still live
+            for pid in live - set(self._entries):
+                info = self._lookup(pid)
+                if info is not None:
+                    self._entries[pid] = info
+            self._scanned = now
+
+    def get(self, pid):
+        """
+        Return the ProcessInfo of a pid, or None if there is no such process.
+
+        A pid started since the last scan is looked up on its own rather
+        than triggering a rescan.
+        """
+        self.refresh()
+        with self._lock:
+            info = self._entries.get(pid)
+            if info is None:
+                info = self._lookup(pid)
+                if info is not None:
+                    self._entries[pid] = info
+            return info
+
+    def name(self, pid):
+        """Return the process name of a pid, or None if it is unknown."""
+        info = self.get(pid)
+        return info.name if info else None
+
+    def processes(self):
+        """Return the ProcessInfo of every known process."""
+        self.refresh()
+        with self._lock:
+            return list(self._entries.values())
+
+    def names(self):
+        """Return the set of names of all running processes."""
+        return {info.name for info in self.processes() if info.name}
+
+    def find(self, name):
+        """Return the processes with a name, compared case-insensitively."""
+        name = name.lower()
+        return [info for info in self.processes() if info.name and info.name.lower() == name]
+
+    def process(self, info):
+        """
+        Return a psutil.Process for a cached entry, checking it is still the same process.
+
+        Raises:
+            psutil.NoSuchProcess: If the process exited or its pid now belongs to another one
+        """
+        process = psutil.Process(info.pid)
+        if info.create_time is not None and process.create_time() != info.create_time:
+            # The pid was reused: forget the stale entry
+            with self._lock:
+                if self._entries.get(info.pid) == info:
+                    del self._entries[info.pid]
+            raise psutil.NoSuchProcess(info.pid, info.name, "pid was reused by another process")
+        return process
+
+    def _is_current(self, info):
+        """Check that a cached entry still describes the process holding its pid."""
+        if info.create_time is None:
+            return True  # nothing to compare; kept until the pid goes away
+        try:
+            return self._create_time(info.pid) == info.create_time
+        except psutil.NoSuchProcess:
+            return False
+        except Exception as e:
+            self.logger.debug(f"Error reading create time of {info.pid}: {e}")
+            return True
+
+    def _create_time_from_lookup(self, pid):
+        info = self._lookup(pid)
+        if info is None:
+            raise psutil.NoSuchProcess(pid)
+        return info.create_time
+
+    def invalidate(self, pid=None):
+        """Forget one pid, or everything, so it is looked up again."""
+        with self._lock:
+            if pid is None:
+                self._entries.clear()
+                self._scanned = None
+            else:
+                self._entries.pop(pid, None)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_cache():
+    """Return the ProcessCache shared by the whole process."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ProcessCache()
+        return _shared
\ No newline at end of file
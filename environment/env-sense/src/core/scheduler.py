@@ -0,0 +1,63 @@
+import math
+import threading
+
+class TimerWheel:
+    """
+    Hashed timer wheel for recurring jobs.
+
+    Time is divided into fixed ticks and jobs are hashed into one of a ring
+    of slots by the tick they are due on. Scheduling is O(1) and advancing
+    the wheel only looks at the jobs in the current slot, so the cost of a
+    tick does not grow with the number of jobs scheduled far in the future.
+    """
+
+    def __init__(self, tick=1.0, slots=64):
+        """
+        Initialize the timer wheel.
+
+        Args:
+            tick (float): Length of one tick in seconds
+            slots (int): Number of slots in the ring
+        """
+        self.tick = tick
+        self.current_tick = 0
+        self._slots = [[] for _ in range(slots)]
+        self._deadlines = {}  # key -> tick the key is currently scheduled for
+        self._lock = threading.Lock()
+
+    def schedule(self, key, delay):
+        """Schedule key to become due after delay seconds, replacing any earlier entry."""
+        ticks = max(1, int(math.ceil(delay / self.tick)))
+        with self._lock:
+            due_tick = self.current_tick + ticks
+            self._deadlines[key] = due_tick
+            self._slots[due_tick % len(self._slots)].append((due_tick, key))
+
+    def cancel(self, key):
+        """Cancel a scheduled key. Stale slot entries are dropped lazily."""
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def advance(self):
+        """Advance the wheel by one tick and return the keys that became due."""
+        with self._lock:
+            self.current_tick += 1
+            index = self.current_tick % len(self._slots)
+            due = []
+            remaining = []
+            for due_tick, key in self._slots[index]:
+                if self._deadlines.get(key) != due_tick:
+                    # Cancelled or rescheduled since this entry was added
+                    continue
+                if due_tick <= self.current_tick:
+                    del self._deadlines[key]
+                    due.append(key)
+                else:
+                    # Due on a later revolution of the wheel
+                    remaining.append((due_tick, key))
+            self._slots[index] = remaining
+            return due
+
+    def __len__(self):
+        with self._lock:
+            return len(self._deadlines)
\ No newline at end of file
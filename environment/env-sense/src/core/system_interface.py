@@ -3,16 +3,24 @@ import platform
 import os
 import subprocess
 import psutil
-import win32api
-import win32con
-import win32gui
+from .process_cache import shared_cache
+
+# Windows-specific APIs, only used when running on Windows
+try:
+    import win32api
+    import win32con
+    import win32gui
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
 
 class SystemInterface:
     """Interface for interacting with the underlying operating system."""
     
-    def __init__(self):
+    def __init__(self, process_cache=None):
         self.logger = logging.getLogger("SystemInterface")
         self.platform = platform.system()
+        self.processes = process_cache or shared_cache()
         
     def adjust_lighting(self, level):
         """Adjust the lighting level in the environment."""
@@ -126,11 +134,11 @@ class SystemInterface:
         """Close an application by name."""
         try:
             closed = False
-            for proc in psutil.process_iter(['pid', 'name']):
+            for info in self.processes.find(app_name):
                 try:
-                    if proc.info['name'].lower() == app_name.lower():
-                        proc.terminate()
-                        closed = True
+                    # Verified against the cached create time, so a reused pid is left alone
+                    self.processes.process(info).terminate()
+                    closed = True
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
                     
@@ -0,0 +1,102 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .insights import RunningInsights
+from .processors import adjust_environment
+from .schema import NUMERIC_COLUMN_NAMES
+
+logger = logging.getLogger("ChunkedAnalytics")
+
+def _map_chunk(chunk, fields, activity_field):
+    """Map one chunk of data points to its partial aggregates (runs in a worker)."""
+    return RunningInsights.from_batch(chunk, fields, activity_field)
+
+def reduce_chunks(chunks, fields=(), activity_field='activity_level', max_workers=None,
+                  max_pending=None):
+    """
+    Map chunks of data points to partial aggregates in parallel and merge them.
+
+    Chunks are submitted to a process pool as they are read, with at most
+    ``max_pending`` in flight, so only a few chunks are ever held in memory
+    however long the input is. Partial results are merged in input order,
+    which keeps the result deterministic.
+
+    Args:
+        chunks (iterable): Chunks of data points, each a list of dicts, a
+            DataFrame or a dict of columns
+        fields (iterable): Numeric fields to keep a mean and variance of
+        activity_field (str): Field averaged into 'average_activity' and 'hourly_activity'
+        max_workers (int): Worker processes, defaults to the number of cores;
+            0 maps the chunks in this process
+        max_pending (int): Chunks in flight at once, defaults to twice the workers
+
+    Returns:
+        RunningInsights: The aggregates of all chunks
+    """
+    fields = list(fields)
+    total = RunningInsights(fields, activity_field)
+
+    if max_workers == 0:
+        for chunk in chunks:
+            total.merge(_map_chunk(chunk, fields, activity_field))
+        return total
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or max_workers * 2
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_map_chunk, chunk, fields, activity_field))
+            # Wait for the oldest chunk before reading more than max_pending ahead
+            if len(pending) >= max_pending:
+                total.merge(pending.popleft().result())
+        while pending:
+            total.merge(pending.popleft().result())
+    return total
+
+def analyze_history(storage, start=None, end=None, fields=None, activity_field='activity_level',
+                    batch_size=10000, max_workers=None):
+    """
+    Analyze stored environment data without loading it all into memory.
+
+    The history is streamed from storage in keyset-paged batches of only
+    the columns needed, each batch is reduced to partial aggregates on a
+    process pool, and the partials are merged, so memory stays at a few
+    batches and the work spreads over every core. History that retention
+    has already rolled up is read from the hourly and daily rollups
+    instead (see RunningInsights.from_rollups for what they preserve), so
+    the analysis covers everything that was ever stored. In rolled-up
+    history, start and end are applied at the tier's resolution, i.e. to
+    whole hours or days.
+
+    Args:
+        storage: DataStorage to read from
+        start: Optional datetime or ISO timestamp bounding the samples
+        end: Optional datetime or ISO timestamp bounding the samples
+        fields (list): Numeric sample columns to summarize, defaults to all of them
+        activity_field (str): Column averaged into 'average_activity' and 'hourly_activity'
+        batch_size (int): Samples per chunk
+        max_workers (int): As for reduce_chunks
+
+    Returns:
+        dict: 'insights' and 'adjustments', like processors.analyze_data
+    """
+    fields = list(NUMERIC_COLUMN_NAMES if fields is None else fields)
+    columns = list(dict.fromkeys(fields + ([activity_field] if activity_field in NUMERIC_COLUMN_NAMES else [])))
+    start = None if start is None else storage._timestamp(start)
+    end = None if end is None else storage._timestamp(end)
+
+    # Rolled-up history first, then the raw samples after the rollups' watermark
+    storage.flush()
+    rolled = [name for name in columns if name in NUMERIC_COLUMN_NAMES]
+    rows, raw_from = storage.retention.rollup_rows(rolled, start, end)
+    insights = RunningInsights.from_rollups(rows, fields, activity_field)
+    if raw_from is not None and (start is None or start < raw_from):
+        start = raw_from
+
+    chunks = storage.iter_environment_data(start, end, columns=columns, batch_size=batch_size)
+    insights.merge(reduce_chunks(chunks, fields, activity_field, max_workers=max_workers))
+    logger.info(f"Analyzed {insights.sample_count} stored samples")
+    result = insights.insights()
+    return {'insights': result, 'adjustments': adjust_environment(result)}
\ No newline at end of file
@@ -0,0 +1,165 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+class WriteBuffer:
+    """
+    Group-commit buffer for high-frequency inserts.
+
+    Rows are queued in memory and written by a background thread with one
+    ``executemany`` per statement inside a single transaction, so many
+    samples share one commit (and one fsync) instead of paying for their
+    own. A flush happens as soon as ``max_rows`` rows are queued or the
+    oldest queued row has waited ``max_delay`` seconds, whichever comes
+    first. Callers never touch the disk, so a slow disk only delays the
+    flusher, not the monitoring loop. A flush that fails because another
+    writer holds the database is retried; any other failure (a constraint
+    or schema error) would fail again, so those rows are logged and dropped.
+    """
+
+    def __init__(self, connections, max_rows=500, max_delay=2.0, max_pending=None, write=None,
+                 on_flush=None, on_commit=None):
+        """
+        Initialize the write buffer.
+
+        Args:
+            connections: ConnectionManager used by the flusher thread
+            max_rows (int): Queued rows that trigger an immediate flush
+            max_delay (float): Seconds a row may wait before it is flushed
+            max_pending (int): Rows kept while the database is locked, oldest dropped first
+            write: Optional callable run with the connection and the flushed rows
+                (a dict of statement -> parameter lists) that writes them itself,
+                for rows that need ids assigned by earlier ones; by default each
+                statement is run with executemany
+            on_flush: Optional callable run with the connection and the flushed rows
+                (a dict of statement -> parameter lists) inside each flush
+                transaction, for state that must be committed together with the rows
+            on_commit: Optional callable run once a flush transaction has committed
+        """
+        self.connections = connections
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending or max_rows * 20
+        self.write = write or self._execute
+        self.on_flush = on_flush
+        self.on_commit = on_commit
+        self.logger = logging.getLogger("WriteBuffer")
+
+        self._rows = deque()  # (sql, params) in arrival order
+        self._oldest = None  # monotonic time the oldest queued row arrived
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time, in order
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._rows)
+
+    def add(self, sql, params):
+        """Queue one row for insertion."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("WriteBuffer is closed")
+            first = not self._rows
+            if first:
+                self._oldest = time.monotonic()
+            self._rows.append((sql, params))
+            # Wake the flusher to start the age timer or flush a full buffer
+            if first or len(self._rows) >= self.max_rows:
+                self._condition.notify()
+
+    def flush(self):
+        """
+        Write every queued row now.
+
+        Returns:
+            bool: True if the queue was written (or empty), False if the write failed
+        """
+        with self._flush_lock:
+            with self._condition:
+                rows = list(self._rows)
+                self._rows.clear()
+                self._oldest = None
+            if not rows:
+                return True
+
+            # Keep each statement's rows together and in arrival order
+            batches = {}
+            for sql, params in rows:
+                batches.setdefault(sql, []).append(params)
+            try:
+                with self.connections.transaction() as conn:
+                    self.write(conn, batches)
+                    if self.on_flush is not None:
+                        self.on_flush(conn, batches)
+            except sqlite3.Error as e:
+                if not self._transient(e):
+                    # Retrying would fail the same way and block every later row
+                    self.logger.error(f"Dropped {len(rows)} buffered rows that cannot be written: {e}")
+                    return False
+                self.logger.error(f"Error flushing {len(rows)} buffered rows: {e}")
+                self._requeue(rows)
+                return False
+            if self.on_commit is not None:
+                self.on_commit()
+            return True
+
+    def close(self):
+        """Stop the flusher thread and write whatever is still queued."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=5.0)
+        self.flush()
+
+    @staticmethod
+    def _execute(conn, batches):
+        for sql, params in batches.items():
+            conn.executemany(sql, params)
+
+    @staticmethod
+    def _transient(error):
+        """Whether a flush failed only because another writer held the database."""
+        message = str(error).lower()
+        return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+    def _requeue(self, rows):
+        """Put rows from a failed flush back in front of newer ones."""
+        with self._condition:
+            self._rows.extendleft(reversed(rows))
+            dropped = len(self._rows) - self.max_pending
+            for _ in range(max(0, dropped)):
+                self._rows.popleft()
+            if dropped > 0:
+                self.logger.warning(f"Dropped {dropped} buffered rows while the database is locked")
+            if self._rows:
+                self._oldest = time.monotonic()
+
+    def _due(self):
+        """Seconds until the next flush is due, or 0 if it is due now."""
+        if not self._rows:
+            return None
+        if len(self._rows) >= self.max_rows:
+            return 0
+        return max(0.0, self._oldest + self.max_delay - time.monotonic())
+
+    def _run(self):
+        """Flusher thread: sleep until the size or age threshold is reached."""
+        while True:
+            with self._condition:
+                while not self._closed:
+                    wait = self._due()
+                    if wait == 0:
+                        break
+                    self._condition.wait(wait)
+                if self._closed:
+                    return
+            if not self.flush():
+                # Back off instead of spinning while the database is locked
+                with self._condition:
+                    if not self._closed:
+                        self._condition.wait(self.max_delay)
\ No newline at end of file
@@ -0,0 +1,238 @@
+import datetime
+import logging
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+
+class CalendarSource(ABC):
+    """
+    Interface to a calendar that CalendarCollector caches.
+
+    Sources return plain event dicts with 'subject', 'start', 'end' and
+    'location' (naive local datetimes for the times) and call the
+    listeners registered with on_change() when the calendar is modified,
+    so the collector only re-reads it when it has to.
+    """
+
+    def __init__(self):
+        self._listeners = []
+
+    @abstractmethod
+    def events(self, start, end):
+        """
+        Return the events overlapping [start, end), recurring ones expanded.
+
+        Args:
+            start (datetime): Start of the window
+            end (datetime): End of the window
+
+        Returns:
+            list: Event dicts sorted by start
+        """
+
+    def on_change(self, callback):
+        """Register a callable to be invoked whenever the calendar changes."""
+        self._listeners.append(callback)
+
+    def close(self):
+        """Release the source's resources."""
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logging.getLogger("CalendarSource").error(f"Error in calendar change listener: {e}")
+
+
+class OutlookCalendarSource(CalendarSource):
+    """
+    Outlook calendar read over one long-lived COM session.
+
+    COM objects are bound to the thread that created them, so a dedicated
+    thread initializes COM once, keeps the Outlook application and the
+    calendar folder alive, and serves queries handed to it through a
+    queue. Between queries it pumps COM messages, which delivers Outlook's
+    ItemAdd/ItemChange/ItemRemove events as change notifications. If
+    Outlook goes away, the session is rebuilt on the next query.
+    """
+
+    CALENDAR_FOLDER = 9  # olFolderCalendar
+
+    def __init__(self, timeout=30.0, pump_interval=0.5):
+        """
+        Start the Outlook session thread.
+
+        Args:
+            timeout (float): Seconds to wait for a query before giving up
+            pump_interval (float): Seconds between COM message pumps while idle
+        """
+        super().__init__()
+        self.timeout = timeout
+        self.pump_interval = pump_interval
+        self.logger = logging.getLogger("OutlookCalendarSource")
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="outlook-calendar", daemon=True)
+        self._thread.start()
+
+    def events(self, start, end):
+        future = Future()
+        self._requests.put((future, start, end))
+        return future.result(timeout=self.timeout)
+
+    def close(self):
+        self._requests.put(None)
+        self._thread.join(timeout=5.0)
+
+    def _run(self):
+        """Session thread: own the COM objects and serve queries."""
+        try:
+            import pythoncom
+            import win32com.client
+        except ImportError as e:
+            # Not on Windows: fail every query instead of leaving it waiting
+            self.logger.error(f"Outlook is not available: {e}")
+            self._fail_requests(e)
+            return
+
+        pythoncom.CoInitialize()
+        session = None
+        try:
+            while True:
+                # Delivers Outlook's item events to the change handler
+                pythoncom.PumpWaitingMessages()
+                try:
+                    request = self._requests.get(timeout=self.pump_interval)
+                except queue.Empty:
+                    continue
+                if request is None:
+                    return
+                future, start, end = request
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if session is None:
+                        session = self._connect(win32com.client)
+                    future.set_result(self._query(session['folder'], start, end))
+                except Exception as e:
+                    session = None  # e.g. Outlook was closed; reconnect next time
+                    future.set_exception(e)
+        finally:
+            session = None
+            pythoncom.CoUninitialize()
+
+    def _connect(self, client):
+        """Open Outlook and subscribe to changes of the calendar folder."""
+        source = self
+
+        class ItemEvents:
+            def OnItemAdd(self, item):
+                source._notify()
+
+            def OnItemChange(self, item):
+                source._notify()
+
+            def OnItemRemove(self):
+                source._notify()
+
+        outlook = client.Dispatch("Outlook.Application")
+        folder = outlook.GetNamespace("MAPI").GetDefaultFolder(self.CALENDAR_FOLDER)
+        # The watched collection must stay referenced for its events to fire
+        items = folder.Items
+        client.WithEvents(items, ItemEvents)
+        self.logger.info("Connected to Outlook calendar")
+        return {'outlook': outlook, 'folder': folder, 'items': items}
+
+    def _query(self, folder, start, end):
+        """Read the appointments overlapping [start, end)."""
+        items = folder.Items
+        # Sorting by start is required for IncludeRecurrences to expand series
+        items.Sort("[Start]")
+        items.IncludeRecurrences = True
+        restriction = (f"[Start] < '{end.strftime('%m/%d/%Y %I:%M %p')}' AND "
+                       f"[End] > '{start.strftime('%m/%d/%Y %I:%M %p')}'")
+        events = []
+        for appointment in items.Restrict(restriction):
+            events.append({
+                'subject': appointment.Subject,
+                'start': self._naive(appointment.Start),
+                'end': self._naive(appointment.End),
+                'location': appointment.Location
+            })
+        return events
+
+    def _fail_requests(self, error):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            future = request[0]
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    @staticmethod
+    def _naive(value):
+        """Convert a COM time to a naive local datetime."""
+        return datetime.datetime(value.year, value.month, value.day,
+                                 value.hour, value.minute, value.second)
+
+
+class FakeCalendarSource(CalendarSource):
+    """
+    In-memory calendar for tests and benchmarks on any platform.
+
+    Counts queries so callers can check how often the calendar is read.
+    """
+
+    def __init__(self, events=()):
+        """
+        Initialize the fake calendar.
+
+        Args:
+            events (iterable): Event dicts with 'subject', 'start', 'end' and 'location'
+        """
+        super().__init__()
+        self._events = list(events)
+        self.queries = 0
+
+    def events(self, start, end):
+        self.queries += 1
+        return sorted((dict(event) for event in self._events
+                       if event['start'] < end and event['end'] > start),
+                      key=lambda event: event['start'])
+
+    def set_events(self, events):
+        """Replace the calendar's events and notify listeners, like an edit in Outlook."""
+        self._events = list(events)
+        self._notify()
+
+
+def benchmark_calendar_collector(events=200, repeats=1000):
+    """
+    Time CalendarCollector.collect against a fake calendar.
+
+    Args:
+        events (int): Number of events spread over today
+        repeats (int): collect() calls to time
+
+    Returns:
+        dict: 'events', 'us_per_collect' and 'queries' made during the timed calls
+    """
+    import time
+    from .collectors import CalendarCollector
+
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    step = datetime.timedelta(days=1) / max(events, 1)
+    source = FakeCalendarSource({'subject': f'Meeting {i}', 'start': today + step * i,
+                                 'end': today + step * i + datetime.timedelta(minutes=30),
+                                 'location': ''} for i in range(events))
+    collector = CalendarCollector(source=source)
+    collector.collect()  # fill the cache
+
+    source.queries = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        collector.collect()
+    seconds = time.perf_counter() - start
+    return {'events': events, 'us_per_collect': seconds / repeats * 1e6, 'queries': source.queries}
\ No newline at end of file
@@ -1,13 +1,13 @@
-import win32api
-import win32con
-import win32gui
-import win32process
 import psutil
 import datetime
-import pythoncom
-import win32com.client
 import os
 import logging
+import threading
+import time
+from .calendar_source import OutlookCalendarSource
+from .event_index import EventIndex
+from .window_system import Win32WindowSystem
+from ..core.process_cache import shared_cache
 
 class DataCollector:
     def __init__(self):
@@ -39,6 +39,10 @@ class DataCollector:
 class TimeCollector:
     """Collects time-related data."""
     
+    # Cheap to sample, so keep it fresh for quick reactions
+    interval = 5  # seconds
+    ttl = 5
+    
     def __init__(self):
         self.logger = logging.getLogger("TimeCollector")
     
@@ -61,8 +65,22 @@ class TimeCollector:
 class WindowsSystemCollector:
     """Collects system-related data from Windows."""
     
-    def __init__(self):
+    interval = 30  # seconds
+    ttl = 30
+    
+    def __init__(self, window_system=None, process_cache=None):
+        """
+        Initialize the collector.
+        
+        Args:
+            window_system: WindowSystem to query, defaults to the Win32 one
+            process_cache: ProcessCache resolving pids to names, defaults to the shared one
+        """
         self.logger = logging.getLogger("WindowsSystemCollector")
+        self.window_system = window_system or Win32WindowSystem()
+        self.processes = process_cache or shared_cache()
+        # The first cpu_percent() call only starts the measurement
+        psutil.cpu_percent()
     
     def collect(self):
         """Gather system-related data."""
@@ -90,77 +108,239 @@ class WindowsSystemCollector:
     def _get_active_window(self):
         """Get the currently active window."""
         try:
-            hwnd = win32gui.GetForegroundWindow()
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            try:
-                process = psutil.Process(pid)
-                return process.name()
-            except:
-                return "unknown"
-        except:
+            pid = self.window_system.foreground_pid()
+            return self._name(pid) if pid is not None else "unknown"
+        except Exception:
             return "unknown"
             
     def _get_active_processes(self):
-        """Get a list of user-facing applications currently running."""
+        """
+        Get a list of user-facing applications currently running.
+        
+        The visible windows are enumerated once into a pid index and the
+        pids are resolved to names through the shared process cache.
+        """
         active_apps = []
-        for proc in psutil.process_iter(['pid', 'name']):
+        for pid in self.window_system.visible_windows():
+            name = self._name(pid)
+            if name != "unknown" and name not in active_apps:
+                active_apps.append(name)
+        return active_apps
+        
+    def _name(self, pid):
+        """Resolve a pid to its process name through the process cache."""
+        return self.processes.name(pid) or "unknown"
+
+
+class _ProcFile:
+    """A /proc or /sys file kept open and re-read into a reused buffer."""
+    
+    def __init__(self, path, size=4096):
+        self.path = path
+        self._file = open(path, 'rb', buffering=0)
+        self._buffer = bytearray(size)
+        
+    def read(self):
+        """Return the file's current contents as bytes."""
+        self._file.seek(0)
+        view = memoryview(self._buffer)
+        size = 0
+        while True:
+            if size == len(self._buffer):
+                # Grow once; later reads reuse the larger buffer
+                view.release()
+                self._buffer.extend(bytes(len(self._buffer)))
+                view = memoryview(self._buffer)
+            read = self._file.readinto(view[size:])
+            if not read:
+                break
+            size += read
+        view.release()
+        return bytes(self._buffer[:size])
+        
+    def close(self):
+        self._file.close()
+
+
+class LinuxSystemCollector:
+    """
+    Collects system-related data from /proc and /sys on Linux.
+    
+    The files are kept open and re-read into reused buffers instead of
+    going through psutil, and CPU usage is computed from the tick deltas
+    since the previous sample (the first one is taken at construction),
+    so every value covers the whole interval between two collections.
+    Returns the same ``system_*`` keys as WindowsSystemCollector, plus
+    per-core usage.
+    """
+    
+    interval = 30  # seconds
+    ttl = 30
+    
+    def __init__(self, proc_root='/proc', power_supply_root='/sys/class/power_supply'):
+        """
+        Initialize the collector.
+        
+        Args:
+            proc_root (str): Mount point of procfs
+            power_supply_root (str): sysfs directory of power supplies
+        """
+        self.logger = logging.getLogger("LinuxSystemCollector")
+        self._stat = _ProcFile(os.path.join(proc_root, 'stat'), size=16384)
+        self._meminfo = _ProcFile(os.path.join(proc_root, 'meminfo'))
+        self._batteries = self._open_batteries(power_supply_root)
+        # Tick counters of the previous sample: [total ticks, busy ticks] per CPU line
+        self._previous = self._read_cpu_ticks()
+    
+    def collect(self):
+        """Gather system-related data."""
+        try:
+            total, per_core = self._get_cpu_usage()
+            data = {
+                'system_cpu_usage': total,
+                'system_cpu_per_core': per_core,
+                'system_memory_usage': self._get_memory_usage(),
+                'system_battery': self._get_battery_info(),
+                # No window system to ask; kept for the same keys as on Windows
+                'system_active_window': "unknown",
+                'system_active_processes': []
+            }
+            return data
+        except Exception as e:
+            self.logger.error(f"Error collecting Linux system data: {e}")
+            return {}
+    
+    def close(self):
+        """Close the kept-open files."""
+        for proc_file in [self._stat, self._meminfo] + self._batteries:
+            proc_file.close()
+    
+    def _read_cpu_ticks(self):
+        """Return [total, busy] ticks for the aggregate line and each core."""
+        ticks = []
+        for line in self._stat.read().split(b'\n'):
+            if not line.startswith(b'cpu'):
+                break  # the cpu lines come first
+            # user nice system idle iowait irq softirq steal (guest time is already in user)
+            values = [int(value) for value in line.split()[1:9]]
+            total = sum(values)
+            ticks.append((total, total - values[3] - values[4]))
+        return ticks
+    
+    def _get_cpu_usage(self):
+        """Return overall and per-core CPU usage in percent since the previous sample."""
+        current = self._read_cpu_ticks()
+        usage = []
+        for (total, busy), (previous_total, previous_busy) in zip(current, self._previous):
+            elapsed = total - previous_total
+            usage.append(round(100.0 * (busy - previous_busy) / elapsed, 1) if elapsed > 0 else 0.0)
+        self._previous = current
+        return usage[0], usage[1:]
+    
+    def _get_memory_usage(self):
+        """Return the share of memory in use in percent, as psutil reports it."""
+        fields = {}
+        for line in self._meminfo.read().split(b'\n'):
+            name, _, rest = line.partition(b':')
+            if name in (b'MemTotal', b'MemAvailable'):
+                fields[name] = int(rest.split()[0])
+                if len(fields) == 2:
+                    break
+        total = fields.get(b'MemTotal')
+        if not total:
+            return 0.0
+        return round(100.0 * (total - fields.get(b'MemAvailable', 0)) / total, 1)
+    
+    def _get_battery_info(self):
+        """Get battery percentage if available."""
+        levels = []
+        for battery in self._batteries:
             try:
-                # Filter to only include visible applications
-                if win32gui.IsWindowVisible(win32gui.FindWindow(None, proc.name())):
-                    active_apps.append(proc.name())
-            except:
+                levels.append(float(battery.read()))
+            except (OSError, ValueError):
                 pass
-        return active_apps
+        return sum(levels) / len(levels) if levels else 100  # Default to 100% if not available
+    
+    def _open_batteries(self, root):
+        """Open the capacity file of every battery under the power supply directory."""
+        batteries = []
+        try:
+            names = sorted(os.listdir(root))
+        except OSError:
+            return batteries
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                with open(os.path.join(path, 'type')) as f:
+                    if f.read().strip() != 'Battery':
+                        continue
+                batteries.append(_ProcFile(os.path.join(path, 'capacity'), size=16))
+            except OSError:
+                continue
+        return batteries
 
 
 class CalendarCollector:
-    """Collects calendar events from Outlook."""
+    """
+    Collects calendar events from Outlook.
     
-    def __init__(self):
+    Events of a window of ``window_days`` days starting today are cached in
+    memory in an EventIndex. The source is only queried again when it
+    reports a change, when today is no longer inside the window or after
+    ``refresh_ttl`` seconds as a safety net, so collect() normally never
+    leaves the process, and its lookups cost O(log n) however many
+    events the calendar holds.
+    """
+    
+    # Served from memory, so it can be sampled often enough to notice
+    # meetings starting and ending
+    interval = 60  # seconds
+    ttl = 60
+    
+    def __init__(self, source=None, refresh_ttl=1800, window_days=7):
+        """
+        Initialize the collector.
+        
+        Args:
+            source: CalendarSource to read, defaults to a persistent Outlook session
+            refresh_ttl (float): Seconds cached events are trusted without a change notification
+            window_days (int): Days of events read and indexed at once, starting today
+        """
         self.logger = logging.getLogger("CalendarCollector")
+        self.source = source or OutlookCalendarSource()
+        self.refresh_ttl = refresh_ttl
+        self.window_days = max(1, window_days)
+        
+        self._lock = threading.Lock()
+        self._index = EventIndex()
+        self._window = None  # (start, end) the cached events cover
+        self._loaded_at = None  # monotonic time they were read
+        self._dirty = True
+        self.source.on_change(self.invalidate)
+        
+    def invalidate(self):
+        """Mark the cached events as outdated; called on change notifications."""
+        with self._lock:
+            self._dirty = True
     
     def collect(self):
         """Gather calendar events for today."""
         try:
-            # Initialize COM for this thread
-            pythoncom.CoInitialize()
-            
-            outlook = win32com.client.Dispatch("Outlook.Application")
-            namespace = outlook.GetNamespace("MAPI")
-            calendar = namespace.GetDefaultFolder(9)  # 9 is the calendar folder
-            
-            today = datetime.datetime.now().date()
-            start_time = datetime.datetime.combine(today, datetime.time.min)
-            end_time = datetime.datetime.combine(today, datetime.time.max)
-            
-            # Filter for today's events
-            restriction = f"[Start] >= '{start_time.strftime('%m/%d/%Y')}' AND [End] <= '{end_time.strftime('%m/%d/%Y')}'"
-            appointments = calendar.Items.Restrict(restriction)
-            
-            # Process the events
-            current_events = []
-            upcoming_events = []
             now = datetime.datetime.now()
+            index = self._cached_index(now)
+            end_of_day = datetime.datetime.combine(now.date() + datetime.timedelta(days=1),
+                                                   datetime.time.min)
             
-            for appointment in appointments:
-                event_data = {
-                    'subject': appointment.Subject,
-                    'start': appointment.Start,
-                    'end': appointment.End,
-                    'location': appointment.Location
-                }
-                
-                # Check if event is happening now
-                if appointment.Start <= now <= appointment.End:
-                    current_events.append(event_data)
-                elif now < appointment.Start:
-                    upcoming_events.append(event_data)
+            # Events in progress, and the rest of today's events
+            current_events = [dict(event) for event in index.overlapping(now)]
+            upcoming_events = [dict(event) for event in index.starting_between(now, end_of_day)]
             
             return {
                 'calendar_has_current_meeting': len(current_events) > 0,
                 'calendar_current_meetings': current_events,
                 'calendar_upcoming_meetings': upcoming_events,
-                'calendar_next_meeting_in_minutes': self._get_minutes_to_next_meeting(upcoming_events, now)
+                'calendar_next_meeting_in_minutes': self._get_minutes_to_next_meeting(
+                    index.next_start(now), now, end_of_day)
             }
             
         except Exception as e:
@@ -171,14 +351,41 @@ class CalendarCollector:
                 'calendar_upcoming_meetings': [],
                 'calendar_next_meeting_in_minutes': None
             }
-        finally:
-            pythoncom.CoUninitialize()
     
-    def _get_minutes_to_next_meeting(self, upcoming_events, now):
-        """Calculate minutes until the next meeting."""
-        if not upcoming_events:
+    def close(self):
+        """Close the calendar source."""
+        self.source.close()
+    
+    def _cached_index(self, now):
+        """Return the event index, re-reading the source only when the cache is outdated."""
+        today = datetime.datetime.combine(now.date(), datetime.time.min)
+        with self._lock:
+            fresh = (not self._dirty and self._window is not None and
+                     self._window[0] <= today and today + datetime.timedelta(days=1) <= self._window[1] and
+                     time.monotonic() - self._loaded_at < self.refresh_ttl)
+            if fresh:
+                return self._index
+            # Cleared before reading, so a change during the read triggers another one
+            self._dirty = False
+        
+        window = (today, today + datetime.timedelta(days=self.window_days))
+        try:
+            index = EventIndex(self.source.events(*window))
+        except Exception:
+            self.invalidate()
+            raise
+        with self._lock:
+            self._index = index
+            self._window = window
+            self._loaded_at = time.monotonic()
+        self.logger.debug(f"Indexed {len(index)} calendar events from {window[0]:%Y-%m-%d} "
+                          f"for {self.window_days} days")
+        return index
+    
+    def _get_minutes_to_next_meeting(self, next_meeting, now, end_of_day):
+        """Calculate minutes until the next meeting today."""
+        if next_meeting is None or next_meeting['start'] >= end_of_day:
             return None
         
-        next_meeting = min(upcoming_events, key=lambda x: x['start'])
         delta = next_meeting['start'] - now
         return int(delta.total_seconds() / 60)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+class ConnectionManager:
+    """
+    Persistent per-thread SQLite connections.
+
+    Each thread gets its own long-lived connection, opened once and tuned
+    with WAL journaling so readers (e.g. the dashboard) never block the
+    writer (the monitoring loop) and vice versa. sqlite3 caches prepared
+    statements per connection keyed by their SQL text, so reusing the same
+    connection lets repeated queries skip re-parsing.
+    """
+
+    def __init__(self, db_path, cache_size_kb=8192, statement_cache_size=128, busy_timeout=5.0):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            cache_size_kb (int): Page cache size per connection in KiB
+            statement_cache_size (int): Number of prepared statements cached per connection
+            busy_timeout (float): Seconds to wait on a locked database before failing
+        """
+        self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.statement_cache_size = statement_cache_size
+        self.busy_timeout = busy_timeout
+        self.logger = logging.getLogger("ConnectionManager")
+        self._local = threading.local()
+        self._connections = {}  # thread -> connection, so close() can reach all of them
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._close_dead_threads()
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in a transaction on the calling thread's connection."""
+        conn = self.get()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def close(self):
+        """Close every connection opened by this manager."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                self.logger.error(f"Error closing database connection: {e}")
+        self._local = threading.local()
+
+    def _connect(self):
+        """Open and tune a new connection."""
+        # Connections stay owned by one thread; check_same_thread is only
+        # relaxed so close() can clean up after threads that have exited
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               cached_statements=self.statement_cache_size,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL makes NORMAL safe against corruption; only the last commits can be lost on power failure
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _close_dead_threads(self):
+        """Close connections whose owning thread has exited."""
+        for thread in [t for t in self._connections if not t.is_alive()]:
+            try:
+                self._connections.pop(thread).close()
+            except sqlite3.Error:
+                pass
\ No newline at end of file
@@ -0,0 +1,65 @@
+import datetime
+from bisect import bisect_left, bisect_right
+
+class EventIndex:
+    """
+    Static interval index over calendar events.
+
+    Events are sorted by start, which answers "next start after t" and
+    "events starting in a range" with a binary search. On top of that, an
+    implicit segment tree holds the latest end in each block of events,
+    so "events in progress at t" only descends into blocks that can
+    contain one: O(log n) per event returned instead of a scan of the
+    whole calendar. The index is rebuilt, not updated, when the calendar
+    changes.
+    """
+
+    def __init__(self, events=()):
+        """
+        Build the index.
+
+        Args:
+            events (iterable): Event dicts with datetime 'start' and 'end'
+        """
+        self.events = sorted(events, key=lambda event: event['start'])
+        self.starts = [event['start'] for event in self.events]
+
+        self._size = 1
+        while self._size < len(self.events):
+            self._size *= 2
+        # Latest end per tree node; padding leaves can never match
+        self._max_end = [datetime.datetime.min] * (2 * self._size)
+        for i, event in enumerate(self.events):
+            self._max_end[self._size + i] = event['end']
+        for node in range(self._size - 1, 0, -1):
+            self._max_end[node] = max(self._max_end[2 * node], self._max_end[2 * node + 1])
+
+    def __len__(self):
+        return len(self.events)
+
+    def overlapping(self, t):
+        """Return the events with start <= t <= end, in start order."""
+        started = bisect_right(self.starts, t)  # only these can be in progress
+        found = []
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= started or self._max_end[node] < t:
+                continue
+            if hi - lo == 1:
+                found.append(self.events[lo])
+                continue
+            mid = (lo + hi) // 2
+            # Right half first so the left one is popped, and reported, first
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+    def next_start(self, t):
+        """Return the first event starting after t, or None."""
+        i = bisect_right(self.starts, t)
+        return self.events[i] if i < len(self.events) else None
+
+    def starting_between(self, start, end):
+        """Return the events with start < event start < end, in start order."""
+        return self.events[bisect_right(self.starts, start):bisect_left(self.starts, end)]
\ No newline at end of file
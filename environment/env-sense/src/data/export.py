@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import shutil
+import numpy as np
+
+MANIFEST = 'manifest.json'
+DTYPE = np.dtype('<f8')
+
+class ColumnarDataset:
+    """
+    Append-only columnar dataset of float64 columns on disk.
+
+    Every column is a raw little-endian float64 file that new rows are
+    appended to, and a small JSON manifest records the column names, the
+    committed row count and a caller-defined watermark (e.g. the last
+    exported row id). Columns are read back with ``np.memmap``, so opening
+    the dataset costs nothing however many rows it holds, and the data is
+    only paged in as an estimator touches it.
+
+    The manifest is replaced atomically after the column files have been
+    written, so a crash mid-append leaves the dataset at its previous
+    state; bytes past the committed row count are cut off on the next
+    append.
+    """
+
+    def __init__(self, path):
+        """
+        Open (or prepare to create) a dataset.
+
+        Args:
+            path (str): Directory holding the column files and manifest
+        """
+        self.path = path
+        self.logger = logging.getLogger("ColumnarDataset")
+        self._manifest = {'columns': [], 'rows': 0, 'watermark': None}
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._manifest = json.load(f)
+
+    def __len__(self):
+        return self._manifest['rows']
+
+    def __getstate__(self):
+        # Only the location and manifest travel to worker processes; the
+        # columns are memory-mapped again on the other side
+        return {'path': self.path, '_manifest': self._manifest}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = logging.getLogger("ColumnarDataset")
+
+    @property
+    def columns(self):
+        """Names of the stored columns."""
+        return list(self._manifest['columns'])
+
+    @property
+    def watermark(self):
+        """Caller-defined marker of how far the dataset has been appended."""
+        return self._manifest['watermark']
+
+    def append(self, columns, watermark=None):
+        """
+        Append rows to every column.
+
+        Args:
+            columns (dict): Column name -> 1-D array, all of the same length.
+                The first append defines the column set; later ones must match.
+            watermark: Optional marker stored with the new row count
+        """
+        names = list(columns)
+        if self._manifest['columns'] and names != self._manifest['columns']:
+            raise ValueError(f"Columns {names} don't match the dataset's {self._manifest['columns']}")
+        arrays = [np.ascontiguousarray(columns[name], dtype=DTYPE) for name in names]
+        n = len(arrays[0]) if arrays else 0
+        if any(len(array) != n for array in arrays):
+            raise ValueError("All columns must have the same number of rows")
+
+        os.makedirs(self.path, exist_ok=True)
+        committed = self._manifest['rows'] * DTYPE.itemsize
+        for name, array in zip(names, arrays):
+            with open(self._column_path(name), 'ab') as f:
+                # Drop anything a crashed append left past the committed rows
+                f.truncate(committed)
+                array.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._write_manifest({'columns': names, 'rows': self._manifest['rows'] + n,
+                              'watermark': watermark if watermark is not None
+                              else self._manifest['watermark']})
+
+    def column(self, name):
+        """Return a column as a read-only memory map (an empty array if there are no rows)."""
+        if name not in self._manifest['columns']:
+            raise KeyError(name)
+        rows = self._manifest['rows']
+        if rows == 0:
+            return np.empty(0, dtype=DTYPE)
+        return np.memmap(self._column_path(name), dtype=DTYPE, mode='r', shape=(rows,))
+
+    def matrix(self, names, start=0, stop=None):
+        """
+        Assemble a range of rows of some columns into a row-major matrix.
+
+        Args:
+            names (list): Columns to include, in order
+            start (int): First row to read
+            stop (int): Row to stop before, defaults to the end
+
+        Returns:
+            numpy.ndarray: Array of shape (stop - start, len(names))
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        out = np.empty((max(0, stop - start), len(names)), dtype=DTYPE)
+        for j, name in enumerate(names):
+            out[:, j] = self.column(name)[start:stop]
+        return out
+
+    def clear(self):
+        """Delete all stored rows and columns."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._manifest = {'columns': [], 'rows': 0, 'watermark': None}
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f'{name}.f64')
+
+    def _write_manifest(self, manifest):
+        tmp_path = os.path.join(self.path, MANIFEST + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+        self._manifest = manifest
\ No newline at end of file
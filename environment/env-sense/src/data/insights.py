@@ -0,0 +1,262 @@
+import math
+import numpy as np
+from datetime import datetime
+from .processors import _column, _timestamps, _to_frame, adjust_environment
+
+class RunningInsights:
+    """
+    Insights maintained incrementally as samples arrive.
+
+    Keeps the statistics ``processors.process_user_data`` derives from a full
+    list of data points as running aggregates instead: sample and per-hour
+    and per-weekday counts, per-hour activity sums, and Welford mean and
+    variance accumulators for any tracked numeric field. Each update is
+    O(1), two instances built from disjoint data can be merged exactly, and
+    the state round-trips through a plain dict for persistence.
+    """
+
+    def __init__(self, fields=(), activity_field='activity_level'):
+        """
+        Initialize empty running insights.
+
+        Args:
+            fields (iterable): Numeric fields to keep a running mean and variance of
+            activity_field (str): Field averaged into 'average_activity' and 'hourly_activity'
+        """
+        self.activity_field = activity_field
+        self.fields = list(dict.fromkeys([activity_field, *fields]))
+        self.sample_count = 0
+        self.hourly_counts = [0] * 24
+        self.weekday_counts = [0] * 7
+        self.hourly_activity_sums = [0.0] * 24
+        self.hourly_activity_counts = [0] * 24
+        # field -> [count, mean, sum of squared deviations]
+        self.moments = {field: [0, 0.0, 0.0] for field in self.fields}
+
+    def update(self, sample, timestamp=None):
+        """
+        Fold one sample into the aggregates.
+
+        Args:
+            sample (dict): Data point; missing or non-numeric fields are skipped
+            timestamp: datetime or ISO string, defaults to sample['timestamp']
+        """
+        self.sample_count += 1
+
+        for field in self.fields:
+            value = self._number(sample.get(field))
+            if value is None:
+                continue
+            moment = self.moments[field]
+            moment[0] += 1
+            delta = value - moment[1]
+            moment[1] += delta / moment[0]
+            moment[2] += delta * (value - moment[1])
+
+        when = self._time(sample.get('timestamp') if timestamp is None else timestamp)
+        if when is not None:
+            self.hourly_counts[when.hour] += 1
+            self.weekday_counts[when.weekday()] += 1
+            activity = self._number(sample.get(self.activity_field))
+            if activity is not None:
+                self.hourly_activity_sums[when.hour] += activity
+                self.hourly_activity_counts[when.hour] += 1
+
+    @classmethod
+    def from_batch(cls, user_data, fields=(), activity_field='activity_level'):
+        """
+        Build the aggregates of a whole batch at once with vectorized operations.
+
+        Equivalent to calling update() for every data point, but much faster
+        for large batches, e.g. the chunks of a map-reduce over the history.
+
+        Args:
+            user_data: List of dicts, a DataFrame or a dict of columns
+            fields (iterable): Numeric fields to keep a running mean and variance of
+            activity_field (str): Field averaged into 'average_activity' and 'hourly_activity'
+        """
+        insights = cls(fields, activity_field)
+        frame = _to_frame(user_data)
+        insights.sample_count = len(frame)
+
+        for field in insights.fields:
+            values = _column(frame, field)
+            values = values[np.isfinite(values)]
+            if values.size:
+                mean = float(values.mean())
+                insights.moments[field] = [int(values.size), mean, float(((values - mean) ** 2).sum())]
+
+        if 'timestamp' in frame:
+            timestamps = _timestamps(frame)
+            valid = timestamps.notna().to_numpy()
+            hours = timestamps.dt.hour.to_numpy()[valid].astype(np.int64)
+            weekdays = timestamps.dt.weekday.to_numpy()[valid].astype(np.int64)
+            activity = _column(frame, activity_field)[valid]
+            timed = np.isfinite(activity)
+            insights.hourly_counts = np.bincount(hours, minlength=24).tolist()
+            insights.weekday_counts = np.bincount(weekdays, minlength=7).tolist()
+            insights.hourly_activity_sums = np.bincount(hours[timed], weights=activity[timed],
+                                                        minlength=24).tolist()
+            insights.hourly_activity_counts = np.bincount(hours[timed], minlength=24).tolist()
+        return insights
+
+    @classmethod
+    def from_rollups(cls, rows, fields=(), activity_field='activity_level'):
+        """
+        Build the aggregates of samples that only survive as retention rollups.
+
+        Counts and means are exact. A rollup keeps no spread within its
+        bucket, so variances only reflect the spread between buckets and
+        understate the true variance. Daily buckets add to the weekday
+        histogram but, having no hour, not to the hourly ones.
+
+        Args:
+            rows (iterable): Rollup rows as dicts with 'bucket' ('YYYY-MM-DD'
+                or 'YYYY-MM-DDTHH'), 'samples' and '<field>_mean'/'<field>_count'
+            fields (iterable): Numeric fields to keep a running mean and variance of
+            activity_field (str): Field averaged into 'average_activity' and 'hourly_activity'
+        """
+        insights = cls(fields, activity_field)
+        for row in rows:
+            part = cls(fields, activity_field)
+            part.sample_count = int(row['samples'])
+            when = datetime.fromisoformat(row['bucket'][:10])
+            part.weekday_counts[when.weekday()] = part.sample_count
+            hour = int(row['bucket'][11:13]) if len(row['bucket']) > 10 else None
+            if hour is not None:
+                part.hourly_counts[hour] = part.sample_count
+            for field in part.fields:
+                count, mean = row.get(f'{field}_count'), row.get(f'{field}_mean')
+                if not count or mean is None:
+                    continue
+                part.moments[field] = [int(count), float(mean), 0.0]
+                if field == activity_field and hour is not None:
+                    part.hourly_activity_sums[hour] = float(mean) * count
+                    part.hourly_activity_counts[hour] = int(count)
+            insights.merge(part)
+        return insights
+
+    def merge(self, other):
+        """
+        Combine the aggregates of another instance built from different samples.
+
+        Args:
+            other (RunningInsights): Insights to fold into this one
+
+        Returns:
+            RunningInsights: self
+        """
+        self.sample_count += other.sample_count
+        for i in range(24):
+            self.hourly_counts[i] += other.hourly_counts[i]
+            self.hourly_activity_sums[i] += other.hourly_activity_sums[i]
+            self.hourly_activity_counts[i] += other.hourly_activity_counts[i]
+        for i in range(7):
+            self.weekday_counts[i] += other.weekday_counts[i]
+
+        for field, (n_b, mean_b, m2_b) in other.moments.items():
+            if field not in self.moments:
+                self.fields.append(field)
+                self.moments[field] = [0, 0.0, 0.0]
+            moment = self.moments[field]
+            n_a, mean_a, m2_a = moment
+            n = n_a + n_b
+            if n == 0:
+                continue
+            # Parallel combination of Welford accumulators (Chan et al.)
+            delta = mean_b - mean_a
+            moment[0] = n
+            moment[1] = mean_a + delta * n_b / n
+            moment[2] = m2_a + m2_b + delta * delta * n_a * n_b / n
+        return self
+
+    def mean(self, field):
+        """Running mean of a tracked field, or None before any value was seen."""
+        n, mean, _ = self.moments.get(field, (0, 0.0, 0.0))
+        return mean if n else None
+
+    def variance(self, field):
+        """Running sample variance of a tracked field, or None with fewer than two values."""
+        n, _, m2 = self.moments.get(field, (0, 0.0, 0.0))
+        return m2 / (n - 1) if n > 1 else None
+
+    def insights(self):
+        """
+        Return the current insights.
+
+        Returns:
+            dict: The keys produced by processors.process_user_data, plus
+                'means' and 'variances' of the tracked fields
+        """
+        average_activity = self.mean(self.activity_field)
+        has_hours = any(self.hourly_counts)
+        return {
+            'sample_count': self.sample_count,
+            'average_activity': average_activity if average_activity is not None else 0,
+            'hourly_histogram': list(self.hourly_counts),
+            'weekday_histogram': list(self.weekday_counts),
+            'most_active_hour': self.hourly_counts.index(max(self.hourly_counts)) if has_hours else None,
+            'hourly_activity': [s / c if c else None
+                                for s, c in zip(self.hourly_activity_sums, self.hourly_activity_counts)],
+            'means': {field: self.mean(field) for field in self.fields},
+            'variances': {field: self.variance(field) for field in self.fields},
+        }
+
+    def analyze(self):
+        """Return current insights and adjustments, like processors.analyze_data."""
+        insights = self.insights()
+        return {'insights': insights, 'adjustments': adjust_environment(insights)}
+
+    def to_dict(self):
+        """Serialize the aggregates to a JSON-compatible dict."""
+        return {
+            'activity_field': self.activity_field,
+            'sample_count': self.sample_count,
+            'hourly_counts': list(self.hourly_counts),
+            'weekday_counts': list(self.weekday_counts),
+            'hourly_activity_sums': list(self.hourly_activity_sums),
+            'hourly_activity_counts': list(self.hourly_activity_counts),
+            'moments': {field: list(moment) for field, moment in self.moments.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state, fields=()):
+        """
+        Restore aggregates saved with to_dict.
+
+        Args:
+            state (dict): Saved aggregates
+            fields (iterable): Fields to track in addition to the saved ones
+        """
+        insights = cls(list(state['moments']) + list(fields), state['activity_field'])
+        insights.sample_count = state['sample_count']
+        insights.hourly_counts = list(state['hourly_counts'])
+        insights.weekday_counts = list(state['weekday_counts'])
+        insights.hourly_activity_sums = list(state['hourly_activity_sums'])
+        insights.hourly_activity_counts = list(state['hourly_activity_counts'])
+        for field, moment in state['moments'].items():
+            insights.moments[field] = list(moment)
+        return insights
+
+    @staticmethod
+    def _number(value):
+        """Return value as a finite float, or None."""
+        if value is None or isinstance(value, str):
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if math.isfinite(value) else None
+
+    @staticmethod
+    def _time(value):
+        """Return value as a datetime, or None if it can't be read."""
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return None
\ No newline at end of file
@@ -1,26 +1,91 @@
-from datetime import datetime
+import logging
+import time
 import numpy as np
+import pandas as pd
+
+def _to_frame(user_data):
+    """Accept a list of dicts, a dict of columns or a DataFrame."""
+    if isinstance(user_data, pd.DataFrame):
+        return user_data
+    return pd.DataFrame(user_data)
+
+def _column(frame, name):
+    """Return a column as floats, with NaN where it is missing or not numeric."""
+    if name not in frame:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+
+def _timestamps(frame):
+    """
+    Parse the frame's ISO timestamps, with NaT where a row has none.
+    
+    Every row is parsed as ISO 8601 on its own terms, so timestamps with
+    and without fractional seconds (isoformat() drops zero microseconds)
+    can be mixed. Timestamps that are not ISO 8601 at all are logged and
+    skipped rather than failing the whole batch.
+    """
+    try:
+        return pd.to_datetime(frame['timestamp'], format='ISO8601')
+    except (ValueError, TypeError):
+        timestamps = frame['timestamp'].map(_parse_timestamp)
+        bad = int(timestamps.isna().sum() - frame['timestamp'].isna().sum())
+        logging.getLogger("DataProcessor").warning(f"Skipping {bad} unparseable timestamp(s)")
+        return pd.to_datetime(timestamps)
+
+def _parse_timestamp(value):
+    if pd.isna(value):
+        return pd.NaT
+    try:
+        return pd.to_datetime(value, format='ISO8601')
+    except (ValueError, TypeError):
+        return pd.NaT
 
 def process_user_data(user_data):
     """
     Process the collected user data to extract meaningful insights.
     
+    All statistics are computed with vectorized operations in a single
+    pass over each column, so the cost grows linearly with the number of
+    data points.
+    
     Parameters:
-        user_data (list): A list of dictionaries containing user data points.
-        
+        user_data (list): A list of dictionaries containing user data points,
+            or the same data as a DataFrame or a dict of columns.
+    
     Returns:
         dict: A dictionary containing processed insights.
     """
-    insights = {}
+    frame = _to_frame(user_data)
+    insights = {'sample_count': len(frame)}
+    
+    # Average activity level over the data points that report one
+    activity = _column(frame, 'activity_level')
+    has_activity = ~np.isnan(activity)
+    insights['average_activity'] = float(activity[has_activity].mean()) if has_activity.any() else 0
     
-    # Example: Calculate average activity level throughout the day
-    activity_levels = [data['activity_level'] for data in user_data if 'activity_level' in data]
-    insights['average_activity'] = np.mean(activity_levels) if activity_levels else 0
+    # Parse every timestamp at once; rows without one are skipped
+    if 'timestamp' in frame:
+        timestamps = _timestamps(frame)
+        valid = timestamps.notna().to_numpy()
+        hours = timestamps.dt.hour.to_numpy()[valid].astype(np.int64)
+        weekdays = timestamps.dt.weekday.to_numpy()[valid].astype(np.int64)
+    else:
+        valid = np.zeros(len(frame), dtype=bool)
+        hours = weekdays = np.empty(0, dtype=np.int64)
+    
+    # Histograms of data points per hour of day and day of week
+    hourly_counts = np.bincount(hours, minlength=24)
+    insights['hourly_histogram'] = hourly_counts.tolist()
+    insights['weekday_histogram'] = np.bincount(weekdays, minlength=7).tolist()
+    insights['most_active_hour'] = int(hourly_counts.argmax()) if hours.size else None
     
-    # Example: Determine the most active hour of the day
-    hours = [datetime.fromisoformat(data['timestamp']).hour for data in user_data if 'timestamp' in data]
-    most_active_hour = max(set(hours), key=hours.count) if hours else None
-    insights['most_active_hour'] = most_active_hour
+    # Mean activity per hour of day, None for hours without any activity data
+    timed_activity = activity[valid]
+    timed = ~np.isnan(timed_activity)
+    activity_counts = np.bincount(hours[timed], minlength=24)
+    activity_sums = np.bincount(hours[timed], weights=timed_activity[timed], minlength=24)
+    insights['hourly_activity'] = [float(s / c) if c else None
+                                   for s, c in zip(activity_sums, activity_counts)]
     
     return insights
 
@@ -50,7 +115,8 @@ def analyze_data(user_data):
     Analyze the user data and suggest environmental adjustments.
     
     Parameters:
-        user_data (list): A list of dictionaries containing user data points.
+        user_data (list): A list of dictionaries containing user data points,
+            or the same data as a DataFrame or a dict of columns.
         
     Returns:
         dict: A dictionary containing insights and suggested adjustments.
@@ -61,4 +127,42 @@ def analyze_data(user_data):
     return {
         'insights': insights,
         'adjustments': adjustments
-    }
\ No newline at end of file
+    }
+
+def benchmark_processors(sizes=(10_000, 100_000, 1_000_000), repeats=3, seed=0):
+    """
+    Time analyze_data on synthetic data of increasing size.
+    
+    Parameters:
+        sizes (tuple): Numbers of data points to analyze.
+        repeats (int): Runs per size; the fastest is reported.
+        seed (int): Seed for the synthetic data.
+    
+    Returns:
+        list: One dict per size with 'rows', 'seconds' and 'us_per_row'.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        # ISO strings, as stored, so timestamp parsing is part of the timing
+        offsets = pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, size), unit='s')
+        data = {
+            'timestamp': (pd.Timestamp('2024-01-01') + offsets).strftime('%Y-%m-%dT%H:%M:%S'),
+            'activity_level': rng.uniform(0, 10, size),
+        }
+        
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            analyze_data(data)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        results.append({'rows': size, 'seconds': seconds, 'us_per_row': seconds / size * 1e6})
+    return results
+
+def format_benchmark(results):
+    """Format processor benchmark results as a plain-text table."""
+    lines = [f"{'rows':>12}{'seconds':>12}{'us/row':>10}"]
+    for result in results:
+        lines.append(f"{result['rows']:>12,}{result['seconds']:>12.3f}{result['us_per_row']:>10.3f}")
+    return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,294 @@
+import logging
+from datetime import datetime, timedelta
+from .schema import NUMERIC_COLUMN_NAMES
+
+# Rollup tiers, finest first: table name and length of the bucket key
+# taken from the ISO timestamp ('YYYY-MM-DDTHH' and 'YYYY-MM-DD')
+HOURLY = ('environment_hourly', 13)
+DAILY = ('environment_daily', 10)
+
+# Tier a query of each resolution is answered from, before falling back to finer ones
+RESOLUTION_TIERS = {
+    'raw': [],
+    'hour': [HOURLY],
+    'hour_of_day': [HOURLY],
+    'day': [DAILY, HOURLY],
+}
+
+# Ids of the samples feedback was given in (the latest sample at or before
+# each feedback row, as get_training_data joins them). Only feedback older
+# than the first sample at or after the cutoff can refer to an older sample.
+FEEDBACK_SAMPLES_SQL = '''
+SELECT sample_id FROM (
+    SELECT (SELECT e.id FROM environment_data e
+            WHERE e.timestamp <= p.timestamp
+            ORDER BY e.timestamp DESC LIMIT 1) AS sample_id
+    FROM user_preferences p
+    WHERE p.timestamp < COALESCE((SELECT MIN(timestamp) FROM environment_data
+                                  WHERE timestamp >= ?), '9999')
+) WHERE sample_id IS NOT NULL
+'''
+
+def _rollup_columns():
+    """Column definitions shared by the rollup tables."""
+    columns = ['bucket TEXT PRIMARY KEY', 'samples INTEGER']
+    for name in NUMERIC_COLUMN_NAMES:
+        columns += [f'{name}_mean REAL', f'{name}_min REAL', f'{name}_max REAL',
+                    f'{name}_count INTEGER']
+    return columns
+
+class RetentionManager:
+    """
+    Downsampling rollups and retention tiers for environment samples.
+
+    Complete hours of raw samples are rolled up into ``environment_hourly``
+    and complete days of hourly rows into ``environment_daily``, keeping
+    mean, min, max and count per numeric feature. Each tier records a
+    watermark up to which it has been rolled up; raw samples and hourly
+    rows are only pruned once they are both older than their retention
+    window and covered by the next tier's watermark, so nothing is lost.
+    Raw samples that user feedback was given in are never pruned, since
+    training joins each piece of feedback to its sample.
+
+    Queries are answered from the coarsest tier that has the requested
+    resolution, with finer tiers filling in the part after its watermark.
+    """
+
+    def __init__(self, connections, raw_days=30, hourly_days=365, daily_days=None):
+        """
+        Initialize the retention manager.
+
+        Args:
+            connections: ConnectionManager for the database
+            raw_days (float): Days raw samples are kept, None to keep them forever
+            hourly_days (float): Days hourly rollups are kept, None to keep them forever
+            daily_days (float): Days daily rollups are kept, None to keep them forever
+        """
+        self.connections = connections
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+        self.logger = logging.getLogger("RetentionManager")
+
+    def init_tables(self, conn):
+        """Create the rollup and watermark tables."""
+        for table, _ in (HOURLY, DAILY):
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(_rollup_columns())})')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS retention_watermarks (
+            tier TEXT PRIMARY KEY,
+            rolled_until TEXT
+        )
+        ''')
+
+    def watermark(self, table, conn=None):
+        """Return the bucket key before which a tier is complete, or None."""
+        conn = conn or self.connections.get()
+        row = conn.execute('SELECT rolled_until FROM retention_watermarks WHERE tier = ?',
+                           (table,)).fetchone()
+        return row[0] if row else None
+
+    def run(self, now=None):
+        """
+        Roll up complete hours and days, then prune data past its retention window.
+
+        Args:
+            now (datetime): Current time, defaults to datetime.now()
+
+        Returns:
+            dict: Rows rolled up and pruned per table
+        """
+        now = now or datetime.now()
+        hour_cutoff = now.strftime('%Y-%m-%dT%H')
+        day_cutoff = now.strftime('%Y-%m-%d')
+        stats = {}
+
+        with self.connections.transaction() as conn:
+            stats['environment_hourly'] = self._roll_up_raw(conn, hour_cutoff)
+            stats['environment_daily'] = self._roll_up_hourly(conn, day_cutoff)
+
+            stats['pruned_raw'] = self._prune(conn, 'environment_data', 'timestamp',
+                                              self._cutoff(now, self.raw_days, 19),
+                                              self.watermark(HOURLY[0], conn))
+            stats['pruned_hourly'] = self._prune(conn, HOURLY[0], 'bucket',
+                                                 self._cutoff(now, self.hourly_days, HOURLY[1]),
+                                                 self.watermark(DAILY[0], conn))
+            stats['pruned_daily'] = self._prune(conn, DAILY[0], 'bucket',
+                                                self._cutoff(now, self.daily_days, DAILY[1]),
+                                                day_cutoff)
+
+        self.logger.debug(f"Retention run: {stats}")
+        return stats
+
+    def sources(self, resolution, column, bucket_expression, start=None, end=None):
+        """
+        Build a UNION ALL of partial aggregates from the tiers for a resolution.
+
+        Every part yields (bucket_key, total, n, low, high) rows, i.e. the
+        sum, count, min and max of the column per row, so callers can combine
+        them with SUM/MIN/MAX whichever tiers they came from.
+
+        Args:
+            resolution (str): 'raw', 'hour', 'hour_of_day' or 'day'
+            column (str): Validated numeric column name
+            bucket_expression (str): SQL giving the output bucket, with ``{ts}`` in
+                place of the time column
+            start (str): Optional ISO timestamp lower bound
+            end (str): Optional ISO timestamp upper bound
+
+        Returns:
+            tuple: (SQL text, parameters)
+        """
+        conn = self.connections.get()
+        parts, params = [], []
+        lower = None  # everything before this key is served by a coarser tier
+
+        for table, length in RESOLUTION_TIERS[resolution]:
+            upper = self.watermark(table, conn)
+            if upper is None:
+                continue
+            clauses, part_params = ['bucket < ?'], [upper]
+            if lower is not None:
+                clauses.append('bucket >= ?')
+                part_params.append(lower)
+            if start is not None:
+                clauses.append('bucket >= ?')
+                part_params.append(start[:length])
+            if end is not None:
+                clauses.append('bucket < ?')
+                part_params.append(end[:length])
+            expression = bucket_expression.format(ts='bucket')
+            parts.append(f'''
+            SELECT {expression} AS bucket_key, {column}_mean * {column}_count AS total,
+                   {column}_count AS n, {column}_min AS low, {column}_max AS high
+            FROM {table} WHERE {' AND '.join(clauses)}
+            ''')
+            params += part_params
+            lower = upper if lower is None else max(lower, upper)
+
+        # Raw samples cover whatever the rollups don't yet
+        clauses, part_params = [f'{column} IS NOT NULL'], []
+        if lower is not None:
+            clauses.append('timestamp >= ?')
+            part_params.append(lower)
+        if start is not None:
+            clauses.append('timestamp >= ?')
+            part_params.append(start)
+        if end is not None:
+            clauses.append('timestamp < ?')
+            part_params.append(end)
+        expression = bucket_expression.format(ts='timestamp')
+        parts.append(f'''
+        SELECT {expression} AS bucket_key, {column} AS total, 1 AS n, {column} AS low, {column} AS high
+        FROM environment_data WHERE {' AND '.join(clauses)}
+        ''')
+        params += part_params
+
+        return ' UNION ALL '.join(parts), tuple(params)
+
+    def rollup_rows(self, columns, start=None, end=None):
+        """
+        Return the rollup rows that stand in for samples no longer read raw.
+
+        Tiers are layered as in sources(): daily rows before the daily
+        watermark, hourly rows from there to the hourly watermark. Raw
+        samples from the hourly watermark on complete the history.
+
+        Args:
+            columns (list): Validated numeric column names
+            start (str): Optional ISO timestamp lower bound
+            end (str): Optional ISO timestamp upper bound
+
+        Returns:
+            tuple: (list of row dicts with 'bucket', 'samples' and
+                '<column>_mean'/'<column>_count', hourly watermark or None)
+        """
+        conn = self.connections.get()
+        selected = ['bucket', 'samples'] + [f'{name}_{part}' for name in columns
+                                            for part in ('mean', 'count')]
+        rows, lower = [], None
+        for table, length in (DAILY, HOURLY):
+            upper = self.watermark(table, conn)
+            if upper is None:
+                continue
+            clauses, params = ['bucket < ?'], [upper]
+            if lower is not None:
+                clauses.append('bucket >= ?')
+                params.append(lower)
+            if start is not None:
+                clauses.append('bucket >= ?')
+                params.append(start[:length])
+            if end is not None:
+                clauses.append('bucket < ?')
+                params.append(end[:length])
+            cursor = conn.execute(f'''
+            SELECT {', '.join(selected)} FROM {table}
+            WHERE {' AND '.join(clauses)} ORDER BY bucket
+            ''', params)
+            rows += [dict(zip(selected, row)) for row in cursor]
+            lower = upper if lower is None else max(lower, upper)
+        return rows, self.watermark(HOURLY[0], conn)
+
+    def _roll_up_raw(self, conn, cutoff):
+        """Roll complete hours of raw samples into the hourly tier."""
+        since = self.watermark(HOURLY[0], conn) or ''
+        aggregates = []
+        for name in NUMERIC_COLUMN_NAMES:
+            aggregates += [f'AVG({name})', f'MIN({name})', f'MAX({name})', f'COUNT({name})']
+        cursor = conn.execute(f'''
+        INSERT OR REPLACE INTO {HOURLY[0]}
+        SELECT substr(timestamp, 1, 13), COUNT(*), {', '.join(aggregates)}
+        FROM environment_data
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY substr(timestamp, 1, 13)
+        ''', (since, cutoff))
+        self._set_watermark(conn, HOURLY[0], cutoff)
+        return cursor.rowcount
+
+    def _roll_up_hourly(self, conn, cutoff):
+        """Roll complete days of hourly rows into the daily tier."""
+        since = self.watermark(DAILY[0], conn) or ''
+        aggregates = []
+        for name in NUMERIC_COLUMN_NAMES:
+            count = f'{name}_count'
+            aggregates += [f'SUM({name}_mean * {count}) / NULLIF(SUM({count}), 0)',
+                           f'MIN({name}_min)', f'MAX({name}_max)', f'SUM({count})']
+        cursor = conn.execute(f'''
+        INSERT OR REPLACE INTO {DAILY[0]}
+        SELECT substr(bucket, 1, 10), SUM(samples), {', '.join(aggregates)}
+        FROM {HOURLY[0]}
+        WHERE bucket >= ? AND bucket < ?
+        GROUP BY substr(bucket, 1, 10)
+        ''', (since, cutoff))
+        self._set_watermark(conn, DAILY[0], cutoff)
+        return cursor.rowcount
+
+    def _prune(self, conn, table, column, cutoff, rolled_until):
+        """Delete rows older than cutoff that a coarser tier already covers."""
+        if cutoff is None or rolled_until is None:
+            return 0
+        cutoff = min(cutoff, rolled_until)
+        if table == 'environment_data':
+            # Samples that feedback was given in are training inputs; keep them
+            conn.execute(f'''
+            DELETE FROM environment_items WHERE sample_id IN (
+                SELECT id FROM environment_data WHERE timestamp < ?
+                AND id NOT IN ({FEEDBACK_SAMPLES_SQL})
+            )
+            ''', (cutoff, cutoff))
+            return conn.execute(f'''
+            DELETE FROM environment_data WHERE timestamp < ?
+            AND id NOT IN ({FEEDBACK_SAMPLES_SQL})
+            ''', (cutoff, cutoff)).rowcount
+        return conn.execute(f'DELETE FROM {table} WHERE {column} < ?', (cutoff,)).rowcount
+
+    def _set_watermark(self, conn, table, value):
+        conn.execute('INSERT OR REPLACE INTO retention_watermarks (tier, rolled_until) VALUES (?, ?)',
+                     (table, value))
+
+    @staticmethod
+    def _cutoff(now, days, length):
+        """Key before which a tier's data has outlived its retention window."""
+        if days is None:
+            return None
+        return (now - timedelta(days=days)).isoformat()[:length]
\ No newline at end of file
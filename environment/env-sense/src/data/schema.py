@@ -0,0 +1,124 @@
+import json
+
+# Scalar features produced by the collectors, stored as typed columns
+FEATURE_COLUMNS = [
+    # TimeCollector
+    ('time_hour', 'INTEGER'),
+    ('time_minute', 'INTEGER'),
+    ('time_day_of_week', 'INTEGER'),
+    ('time_is_weekend', 'INTEGER'),
+    ('time_is_morning', 'INTEGER'),
+    ('time_is_afternoon', 'INTEGER'),
+    ('time_is_evening', 'INTEGER'),
+    ('time_is_night', 'INTEGER'),
+    # WindowsSystemCollector
+    ('system_cpu_usage', 'REAL'),
+    ('system_memory_usage', 'REAL'),
+    ('system_battery', 'REAL'),
+    ('system_active_window', 'TEXT'),
+    # CalendarCollector
+    ('calendar_has_current_meeting', 'INTEGER'),
+    ('calendar_next_meeting_in_minutes', 'INTEGER'),
+]
+
+# Settings recommended for a sample, flattened from its 'recommendations' dict
+SETTING_COLUMNS = [
+    ('lighting_brightness', 'REAL'),
+    ('sound_volume', 'REAL'),
+    ('temperature', 'REAL'),
+    ('app_arrangement', 'TEXT'),
+    ('desktop_arrangement', 'TEXT'),
+]
+
+SAMPLE_COLUMNS = FEATURE_COLUMNS + SETTING_COLUMNS
+SAMPLE_COLUMN_NAMES = [name for name, _ in SAMPLE_COLUMNS]
+FEATURE_COLUMN_NAMES = [name for name, _ in FEATURE_COLUMNS]
+SETTING_COLUMN_NAMES = [name for name, _ in SETTING_COLUMNS]
+NUMERIC_COLUMN_NAMES = [name for name, sql_type in SAMPLE_COLUMNS if sql_type != 'TEXT']
+
+# Variable-length fields stored one item per row in environment_items
+LIST_FIELDS = [
+    'system_active_processes',
+    'calendar_current_meetings',
+    'calendar_upcoming_meetings',
+]
+
+# Schema version recorded in PRAGMA user_version
+SCHEMA_VERSION = 1
+
+def _column_value(value, sql_type):
+    """Coerce a collected value to what its column stores."""
+    if value is None:
+        return None
+    if sql_type == 'TEXT':
+        return str(value)
+    if sql_type == 'INTEGER':
+        return int(value)
+    return float(value)
+
+def split_sample(record):
+    """
+    Split a snapshot into typed column values, list items and leftovers.
+
+    Args:
+        record (dict): Merged collector data, optionally with a
+            'recommendations' dict of the settings chosen for it
+
+    Returns:
+        tuple: (column values in SAMPLE_COLUMNS order,
+                list of (field, position, JSON value) items,
+                JSON text of any fields without a column, or None)
+    """
+    extras = dict(record)
+    settings = dict(extras.pop('recommendations', None) or {})
+
+    values = []
+    for name, sql_type in FEATURE_COLUMNS:
+        try:
+            values.append(_column_value(extras.get(name), sql_type))
+            extras.pop(name, None)
+        except (TypeError, ValueError):
+            values.append(None)  # doesn't fit the column, keep it with the extras
+    for name, sql_type in SETTING_COLUMNS:
+        try:
+            values.append(_column_value(settings.get(name), sql_type))
+            settings.pop(name, None)
+        except (TypeError, ValueError):
+            values.append(None)
+
+    items = []
+    for field in LIST_FIELDS:
+        for position, item in enumerate(extras.pop(field, None) or []):
+            items.append((field, position, json.dumps(item, default=str)))
+
+    if settings:
+        extras['recommendations'] = settings
+    return values, items, json.dumps(extras, default=str) if extras else None
+
+def join_sample(values, extras=None, items=None, columns=None):
+    """
+    Rebuild a snapshot dict from its stored parts, the inverse of split_sample.
+
+    Settings are returned under 'recommendations' and missing (NULL)
+    values are left out, as they were absent when collected.
+
+    Args:
+        values: Column values in the order of ``columns``
+        extras (str): JSON text of fields without a column
+        items (list): (field, position, JSON value) items for list fields
+        columns (list): Column names of ``values``, defaults to SAMPLE_COLUMN_NAMES
+    """
+    record = json.loads(extras) if extras else {}
+    settings = record.pop('recommendations', {})
+    for name, value in zip(columns or SAMPLE_COLUMN_NAMES, values):
+        if value is None:
+            continue
+        if name in SETTING_COLUMN_NAMES:
+            settings[name] = value
+        else:
+            record[name] = value
+    for field, _, value in sorted(items or [], key=lambda item: (item[0], item[1])):
+        record.setdefault(field, []).append(json.loads(value))
+    if settings:
+        record['recommendations'] = settings
+    return record
\ No newline at end of file
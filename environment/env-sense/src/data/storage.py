@@ -2,18 +2,60 @@ import os
 import json
 import logging
 import sqlite3
+import threading
 import pandas as pd
 from datetime import datetime
+from .buffer import WriteBuffer
+from .connection import ConnectionManager
+from .insights import RunningInsights
+from .retention import RetentionManager
+from .schema import (FEATURE_COLUMN_NAMES, LIST_FIELDS, NUMERIC_COLUMN_NAMES, SAMPLE_COLUMNS,
+                     SAMPLE_COLUMN_NAMES, SCHEMA_VERSION, join_sample, split_sample)
+
+INSERT_SAMPLE_SQL = f'''
+INSERT INTO environment_data (timestamp, data, {', '.join(SAMPLE_COLUMN_NAMES)})
+VALUES (?, ?, {', '.join('?' * len(SAMPLE_COLUMN_NAMES))})
+'''
+
+INSERT_ITEM_SQL = '''
+INSERT INTO environment_items (sample_id, field, position, value)
+VALUES (?, ?, ?, ?)
+'''
+
+# Name the running insights over environment samples are saved under
+ENVIRONMENT_INSIGHTS = 'environment'
+
+# Time buckets for SQL aggregation over ISO timestamp text or rollup bucket keys
+AGGREGATE_BUCKETS = {
+    'hour': 'substr({ts}, 1, 13)',
+    'day': 'substr({ts}, 1, 10)',
+    'hour_of_day': 'CAST(substr({ts}, 12, 2) AS INTEGER)',
+}
+
+# How each aggregate combines the (total, n, low, high) partials of the tiers
+AGGREGATE_FUNCTIONS = {
+    'avg': 'SUM(total) * 1.0 / SUM(n)',  # REAL even for INTEGER columns
+    'min': 'MIN(low)',
+    'max': 'MAX(high)',
+    'sum': 'SUM(total)',
+    'count': 'SUM(n)',
+}
 
 class DataStorage:
     """Storage system for environment data and user preferences."""
     
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, buffer_rows=500, flush_interval=2.0,
+                 raw_days=30, hourly_days=365, daily_days=None):
         """
         Initialize the storage system.
         
         Args:
             db_path: Path to the SQLite database file. If None, uses default location.
+            buffer_rows (int): Buffered environment samples that trigger a group commit
+            flush_interval (float): Seconds a buffered sample may wait before it is written
+            raw_days (float): Days raw samples are kept before only rollups remain
+            hourly_days (float): Days hourly rollups are kept before only daily ones remain
+            daily_days (float): Days daily rollups are kept, None to keep them forever
         """
         self.logger = logging.getLogger("DataStorage")
         
@@ -30,18 +72,38 @@ class DataStorage:
         else:
             self.db_path = db_path
             
+        # Persistent per-thread connections in WAL mode
+        self.connections = ConnectionManager(self.db_path)
+        self.retention = RetentionManager(self.connections, raw_days=raw_days,
+                                          hourly_days=hourly_days, daily_days=daily_days)
+        
+        # Running aggregates over every stored sample, updated as samples are written
+        self._insights_lock = threading.Lock()
+        self.insights = RunningInsights(NUMERIC_COLUMN_NAMES)
+        self._staged_insights = None
+            
         # Initialize database
         self._init_database()
+        self.insights = self._load_insights(ENVIRONMENT_INSIGHTS) or self._seed_insights()
+        
+        # Environment samples are group-committed in the background; the rows
+        # of each flush are folded into the insights, which are saved in the
+        # same transaction and only take effect once it has committed
+        self.write_buffer = WriteBuffer(self.connections, max_rows=buffer_rows,
+                                        max_delay=flush_interval, write=self._write_samples,
+                                        on_flush=self._save_insights,
+                                        on_commit=self._commit_insights)
         
     def _init_database(self):
         """Initialize the SQLite database with necessary tables."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.connections.get()
             cursor = conn.cursor()
             
             # Create tables if they don't exist
             
-            # Environment data table
+            # Environment data table; typed columns are added by _migrate
+            # and data only keeps fields that have no column of their own
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS environment_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -50,6 +112,17 @@ class DataStorage:
             )
             ''')
             
+            # List fields of environment samples, one row per item
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS environment_items (
+                sample_id INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                value TEXT,
+                PRIMARY KEY (sample_id, field, position)
+            ) WITHOUT ROWID
+            ''')
+            
             # User preferences table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_preferences (
@@ -60,6 +133,28 @@ class DataStorage:
             )
             ''')
             
+            # Time-range queries (new data since the last training run,
+            # nearest sample before a piece of feedback) seek on these
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_environment_data_timestamp
+            ON environment_data (timestamp)
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_preferences_timestamp
+            ON user_preferences (timestamp)
+            ''')
+            
+            # Hourly and daily rollups of older samples
+            self.retention.init_tables(conn)
+            
+            # Saved running insights
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS insights (
+                name TEXT PRIMARY KEY,
+                state TEXT
+            )
+            ''')
+            
             # Model data table
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS models (
@@ -71,99 +166,548 @@ class DataStorage:
             ''')
             
             conn.commit()
+            
+            self._migrate(conn)
         except sqlite3.Error as e:
             self.logger.error(f"Error initializing database: {e}")
-        finally:
-            conn.close()
             
-    def save_environment_data(self, timestamp, data):
-        """Save environment data to the database."""
+    def _migrate(self, conn):
+        """Bring an existing database up to SCHEMA_VERSION in place."""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+            
+        self.logger.info(f"Migrating database from schema version {version} to {SCHEMA_VERSION}")
+        # DDL and backfill in one transaction, so a failed migration leaves the old schema
+        conn.execute('BEGIN IMMEDIATE')
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if version < 1:
+                self._migrate_to_typed_columns(conn)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
             
-            cursor.execute('''
-            INSERT INTO environment_data (timestamp, data)
-            VALUES (?, ?)
-            ''', (timestamp, data))
+    def _migrate_to_typed_columns(self, conn, batch_size=1000):
+        """Add typed sample columns and move values out of the JSON blobs."""
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(environment_data)')}
+        for name, sql_type in SAMPLE_COLUMNS:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE environment_data ADD COLUMN {name} {sql_type}')
+                
+        # Backfill in id order, a batch at a time
+        assignments = ', '.join(f'{name} = ?' for name in SAMPLE_COLUMN_NAMES)
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+            SELECT id, data FROM environment_data
+            WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
             
-            conn.commit()
+            updates, items = [], []
+            for sample_id, data in rows:
+                try:
+                    record = json.loads(data) if data else {}
+                except ValueError:
+                    continue  # leave unreadable blobs as they are
+                if not isinstance(record, dict):
+                    continue
+                values, sample_items, extras = split_sample(record)
+                updates.append((*values, extras, sample_id))
+                items.extend((sample_id, *item) for item in sample_items)
+            conn.executemany(f'UPDATE environment_data SET {assignments}, data = ? WHERE id = ?',
+                             updates)
+            conn.executemany(INSERT_ITEM_SQL.replace('INSERT', 'INSERT OR REPLACE', 1), items)
+            
+    def save_environment_data(self, timestamp, data):
+        """
+        Queue environment data for saving.
+        
+        Scalar collector fields are stored in typed columns, list fields in
+        environment_items and anything else as JSON in the data column.
+        Samples are written in batches by the write buffer; call flush() to
+        write them immediately. The running insights cover a sample once it
+        has been written.
+        
+        Args:
+            timestamp: datetime or ISO timestamp of the sample
+            data (dict): Collected data, optionally with 'recommendations';
+                a JSON string of such a dict is also accepted
+        """
+        if isinstance(data, str):
+            data = json.loads(data) if data else {}
+        values, items, extras = split_sample(data)
+        
+        # Items are queued with their sample, which only gets its id once written
+        self.write_buffer.add(INSERT_SAMPLE_SQL, ((self._timestamp(timestamp), extras, *values), items))
+            
+    def flush(self):
+        """Write all buffered samples to the database now."""
+        return self.write_buffer.flush()
+            
+    @staticmethod
+    def _write_samples(conn, batches):
+        """Insert flushed samples, then their list items under the ids SQLite assigned."""
+        items = []
+        for row, sample_items in batches.get(INSERT_SAMPLE_SQL, ()):
+            sample_id = conn.execute(INSERT_SAMPLE_SQL, row).lastrowid
+            items.extend((sample_id, *item) for item in sample_items)
+        conn.executemany(INSERT_ITEM_SQL, items)
+            
+    def get_insights(self):
+        """
+        Return the running insights over all stored environment samples.
+        
+        The aggregates are updated as each batch of samples is written and
+        restored from the database on startup, so this never rescans the
+        history. Buffered samples are written first.
+        
+        Returns:
+            dict: As RunningInsights.insights()
+        """
+        self.flush()
+        with self._insights_lock:
+            return self.insights.insights()
+            
+    def _save_insights(self, conn, batches):
+        """Fold the flushed samples into the insights and save them; runs inside each flush."""
+        self._staged_insights = None
+        samples = batches.get(INSERT_SAMPLE_SQL)
+        if not samples:
+            return
+        records = [self._insight_record(timestamp, extras, values)
+                   for (timestamp, extras, *values), _ in samples]
+        with self._insights_lock:
+            staged = RunningInsights.from_dict(self.insights.to_dict(), NUMERIC_COLUMN_NAMES)
+        staged.merge(RunningInsights.from_batch(records, NUMERIC_COLUMN_NAMES))
+        conn.execute('INSERT OR REPLACE INTO insights (name, state) VALUES (?, ?)',
+                     (ENVIRONMENT_INSIGHTS, json.dumps(staged.to_dict())))
+        self._staged_insights = staged
+            
+    def _commit_insights(self):
+        """Make the insights saved by the last flush current once it has committed."""
+        if self._staged_insights is not None:
+            with self._insights_lock:
+                self.insights, self._staged_insights = self._staged_insights, None
+            
+    def _seed_insights(self, batch_size=10000):
+        """Compute the insights of a database that has none saved yet, once."""
+        insights = RunningInsights(NUMERIC_COLUMN_NAMES)
+        try:
+            conn = self.connections.get()
+            last_id = 0
+            while True:
+                rows = conn.execute(f'''
+                SELECT id, timestamp, data, {', '.join(SAMPLE_COLUMN_NAMES)} FROM environment_data
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                insights.merge(RunningInsights.from_batch(
+                    [self._insight_record(timestamp, extras, values)
+                     for _, timestamp, extras, *values in rows], NUMERIC_COLUMN_NAMES))
+            with self.connections.transaction() as conn:
+                conn.execute('INSERT OR REPLACE INTO insights (name, state) VALUES (?, ?)',
+                             (ENVIRONMENT_INSIGHTS, json.dumps(insights.to_dict())))
         except sqlite3.Error as e:
-            self.logger.error(f"Error saving environment data: {e}")
-        finally:
-            conn.close()
+            self.logger.error(f"Error computing insights from stored data: {e}")
+        if insights.sample_count:
+            self.logger.info(f"Computed insights from {insights.sample_count} stored samples")
+        return insights
             
-    def get_environment_data(self):
-        """Retrieve all environment data from the database."""
+    @staticmethod
+    def _insight_record(timestamp, extras, values):
+        """A stored sample as the flat dict the insights read, settings next to features."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            record = join_sample(values, extras)
+        except ValueError:
+            record = {}
+        settings = record.pop('recommendations', {})
+        return {**record, **settings, 'timestamp': timestamp}
+            
+    def _load_insights(self, name):
+        """Restore saved running insights, or None if there are none."""
+        try:
+            row = self.connections.get().execute(
+                'SELECT state FROM insights WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return None
+            return RunningInsights.from_dict(json.loads(row[0]), NUMERIC_COLUMN_NAMES)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            self.logger.warning(f"Ignoring unreadable saved insights '{name}': {e}")
+            return None
+            
+    def get_environment_data(self, start=None, end=None, columns=None, limit=None,
+                             after=None, descending=False, include_lists=False):
+        """
+        Retrieve a page of environment data from the database.
+        
+        Rows are ordered by (timestamp, id) and paged with a keyset cursor:
+        pass the (timestamp, id) of the last row of the previous page as
+        ``after`` to continue from there. Each page is an index seek, so
+        reading deep into the history costs the same as reading its start.
+        
+        Args:
+            start: Optional datetime or ISO timestamp; only rows at or after it are returned
+            end: Optional datetime or ISO timestamp; only rows before it are returned
+            columns (list): Optional sample columns or list fields to return. Rows
+                are then flat dicts of just those fields; otherwise full snapshots
+            limit (int): Maximum number of rows to return
+            after (tuple): (timestamp, id) cursor of the last row already read
+            descending (bool): Newest rows first; ``after`` then continues backwards
+            include_lists (bool): Also load list fields such as meetings and processes
             
-            cursor.execute('SELECT * FROM environment_data')
+        Returns:
+            list: One dict per sample with 'id', 'timestamp' and the requested data
+        """
+        if columns is not None:
+            unknown = [c for c in columns if c not in SAMPLE_COLUMN_NAMES and c not in LIST_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown environment data columns: {unknown}")
+                
+        # Include samples that are still buffered
+        self.flush()
+        try:
+            cursor = self.connections.get().cursor()
+            
+            if columns is None:
+                selected = ['data'] + SAMPLE_COLUMN_NAMES
+                list_fields = LIST_FIELDS if include_lists else []
+            else:
+                selected = [c for c in columns if c in SAMPLE_COLUMN_NAMES]
+                list_fields = [c for c in columns if c in LIST_FIELDS]
+            where, params = self._time_range(start, end)
+            where, params = self._after(where, params, after, descending)
+            order = 'DESC' if descending else 'ASC'
+            sql = f'''
+            SELECT {', '.join(['id', 'timestamp'] + selected)}
+            FROM environment_data{where}
+            ORDER BY timestamp {order}, id {order}
+            '''
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params += (int(limit),)
+            cursor.execute(sql, params)
             rows = cursor.fetchall()
             
-            return rows
+            items = self._load_items([row[0] for row in rows], list_fields) if list_fields and rows else {}
+            samples = []
+            for sample_id, timestamp, *values in rows:
+                if columns is not None:
+                    sample = {'id': sample_id, 'timestamp': timestamp, **dict(zip(selected, values))}
+                    for field, _, value in sorted(items.get(sample_id, []), key=lambda item: item[1]):
+                        sample.setdefault(field, []).append(json.loads(value))
+                    samples.append(sample)
+                    continue
+                extras, values = values[0], values[1:]
+                try:
+                    record = join_sample(values, extras, items.get(sample_id))
+                except ValueError as e:
+                    # e.g. a legacy blob that was never valid JSON
+                    self.logger.warning(f"Ignoring unreadable data of sample {sample_id}: {e}")
+                    record = join_sample(values, None, items.get(sample_id))
+                samples.append({'id': sample_id, 'timestamp': timestamp, **record})
+            return samples
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving environment data: {e}")
             return []
-        finally:
-            conn.close()
             
-    def save_user_preferences(self, timestamp, settings, satisfaction):
-        """Save user preferences to the database."""
+    def iter_environment_data(self, start=None, end=None, columns=None, batch_size=1000,
+                              descending=False, include_lists=False):
+        """
+        Stream environment data in fixed-size batches.
+        
+        Each batch is fetched with its own keyset query, so memory use stays
+        at one batch however much history is read and no read transaction
+        is held open between batches.
+        
+        Args:
+            start, end, columns, descending, include_lists: As for get_environment_data
+            batch_size (int): Number of rows per batch
+            
+        Yields:
+            list: Up to batch_size sample dicts
+        """
+        after = None
+        while True:
+            batch = self.get_environment_data(start, end, columns=columns, limit=batch_size,
+                                              after=after, descending=descending,
+                                              include_lists=include_lists)
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1]['timestamp'], batch[-1]['id'])
+            
+    def aggregate_environment_data(self, column, bucket='hour', function='avg', start=None, end=None):
+        """
+        Aggregate a numeric sample column per time bucket in SQL.
+        
+        The query is routed to the coarsest retention tier with the requested
+        resolution (daily rollups for 'day', hourly ones for 'hour' and
+        'hour_of_day') and finer tiers only fill in what hasn't been rolled
+        up yet, so long ranges don't scan raw samples. Rollup rows are
+        matched to start and end at their own granularity.
+        
+        Args:
+            column (str): Numeric column, e.g. 'sound_volume' or 'system_cpu_usage'
+            bucket (str): 'hour', 'day' or 'hour_of_day'
+            function (str): 'avg', 'min', 'max', 'sum' or 'count'
+            start: Optional datetime or ISO timestamp bounding the samples
+            end: Optional datetime or ISO timestamp bounding the samples
+            
+        Returns:
+            list: (bucket, value) tuples in bucket order
+        """
+        # Identifiers can't be bound as parameters, so only accept known ones
+        if column not in NUMERIC_COLUMN_NAMES:
+            raise ValueError(f"Unknown numeric column '{column}'")
+        if bucket not in AGGREGATE_BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}', choose from {sorted(AGGREGATE_BUCKETS)}")
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate function '{function}'")
+            
+        self.flush()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.connections.get().cursor()
             
-            cursor.execute('''
-            INSERT INTO user_preferences (timestamp, settings, satisfaction)
-            VALUES (?, ?, ?)
-            ''', (timestamp, settings, satisfaction))
+            sources, params = self.retention.sources(
+                bucket, column, AGGREGATE_BUCKETS[bucket],
+                None if start is None else self._timestamp(start),
+                None if end is None else self._timestamp(end))
+            cursor.execute(f'''
+            SELECT bucket_key, {AGGREGATE_FUNCTIONS[function]}
+            FROM ({sources})
+            GROUP BY bucket_key ORDER BY bucket_key
+            ''', params)
+            return cursor.fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error aggregating environment data: {e}")
+            return []
             
-            conn.commit()
+    def apply_retention(self, now=None):
+        """
+        Roll up older samples and prune data past its retention window.
+        
+        Args:
+            now (datetime): Current time, defaults to datetime.now()
+            
+        Returns:
+            dict: Rows rolled up and pruned per table, empty on error
+        """
+        # Buffered samples belong to hours that are about to be rolled up
+        self.flush()
+        try:
+            return self.retention.run(now)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error applying retention: {e}")
+            return {}
+            
+    def save_user_preferences(self, timestamp, settings, satisfaction):
+        """Save user preferences to the database."""
+        try:
+            with self.connections.transaction() as conn:
+                conn.execute('''
+                INSERT INTO user_preferences (timestamp, settings, satisfaction)
+                VALUES (?, ?, ?)
+                ''', (timestamp, settings, satisfaction))
         except sqlite3.Error as e:
             self.logger.error(f"Error saving user preferences: {e}")
-        finally:
-            conn.close()
             
-    def get_user_preferences(self):
-        """Retrieve all user preferences from the database."""
+    def get_user_preferences(self, start=None, end=None, limit=None, after=None, descending=False):
+        """
+        Retrieve user preferences from the database.
+        
+        Args:
+            start: Optional datetime or ISO timestamp; only rows at or after it are returned
+            end: Optional datetime or ISO timestamp; only rows before it are returned
+            limit (int): Maximum number of rows to return
+            after (tuple): (timestamp, id) cursor of the last row already read
+            descending (bool): Newest rows first
+            
+        Returns:
+            list: (id, timestamp, settings, satisfaction) rows
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.connections.get().cursor()
             
-            cursor.execute('SELECT * FROM user_preferences')
+            where, params = self._time_range(start, end)
+            where, params = self._after(where, params, after, descending)
+            order = 'DESC' if descending else 'ASC'
+            sql = f'SELECT * FROM user_preferences{where} ORDER BY timestamp {order}, id {order}'
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params += (int(limit),)
+            cursor.execute(sql, params)
             rows = cursor.fetchall()
             
             return rows
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving user preferences: {e}")
             return []
-        finally:
-            conn.close()
             
-    def save_model(self, name, version, parameters):
-        """Save model data to the database."""
+    def store_feedback(self, data):
+        """
+        Save a piece of user feedback.
+        
+        Args:
+            data (dict): Settings the feedback refers to, plus 'satisfaction'
+                and an optional 'timestamp' (defaults to now)
+        """
+        settings = dict(data)
+        satisfaction = settings.pop('satisfaction', None)
+        timestamp = settings.pop('timestamp', None) or datetime.now()
+        self.save_user_preferences(self._timestamp(timestamp),
+                                   json.dumps(settings, default=str), satisfaction)
+            
+    def count_new_data(self, since, limit=None):
+        """
+        Count feedback recorded after a point in time.
+        
+        The count is an index range scan on user_preferences.timestamp. With
+        a limit it stops after that many rows, so a "has enough new data
+        arrived" check costs O(log n) however large the history grows.
+        
+        Args:
+            since: datetime or ISO timestamp; None counts everything
+            limit (int): Optional cap on the count
+            
+        Returns:
+            int: Number of feedback rows newer than since, at most limit
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.connections.get().cursor()
             
-            cursor.execute('''
-            INSERT INTO models (name, version, parameters)
-            VALUES (?, ?, ?)
-            ''', (name, version, parameters))
+            where, params = ('', ())
+            if since is not None:
+                where, params = ' WHERE timestamp > ?', (self._timestamp(since),)
+            if limit is None:
+                cursor.execute(f'SELECT COUNT(*) FROM user_preferences{where}', params)
+            else:
+                cursor.execute(f'''
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM user_preferences{where} LIMIT ?
+                )
+                ''', params + (int(limit),))
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error counting new data: {e}")
+            return 0
             
-            conn.commit()
+    def get_training_data(self, start=None, end=None, after_id=None, limit=None):
+        """
+        Pair each piece of feedback with the environment it was given in.
+        
+        Every feedback row is joined to the latest environment sample at or
+        before its timestamp; each lookup is an index seek, not a scan.
+        Rows come back in the order the feedback was recorded.
+        
+        Args:
+            start: Optional datetime or ISO timestamp bounding the feedback
+            end: Optional datetime or ISO timestamp bounding the feedback
+            after_id (int): Only return feedback recorded after the row with this id
+            limit (int): Maximum number of rows to return
+            
+        Returns:
+            list: Dicts with 'id', 'timestamp', 'features' (environment data),
+                'preferences' (settings) and 'satisfaction'
+        """
+        # Feedback may refer to samples that are still buffered
+        self.flush()
+        try:
+            cursor = self.connections.get().cursor()
+            
+            where, params = self._time_range(start, end)
+            if after_id is not None:
+                where = f"{where} AND id > ?" if where else " WHERE id > ?"
+                params += (int(after_id),)
+            feature_columns = ', '.join(f'e.{name}' for name in FEATURE_COLUMN_NAMES)
+            sql = f'''
+            SELECT p.id, p.timestamp, p.settings, p.satisfaction, e.data, {feature_columns}
+            FROM (
+                SELECT id, timestamp, settings, satisfaction,
+                       (SELECT id FROM environment_data
+                        WHERE environment_data.timestamp <= user_preferences.timestamp
+                        ORDER BY environment_data.timestamp DESC LIMIT 1) AS sample_id
+                FROM user_preferences{where}
+            ) p
+            LEFT JOIN environment_data e ON e.id = p.sample_id
+            ORDER BY p.id
+            '''
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params += (int(limit),)
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error retrieving training data: {e}")
+            return []
+            
+        training_data = []
+        for row_id, timestamp, settings, satisfaction, extras, *values in rows:
+            try:
+                features = join_sample(values, extras, columns=FEATURE_COLUMN_NAMES)
+                preferences = json.loads(settings) if settings else {}
+            except ValueError as e:
+                self.logger.warning(f"Skipping unreadable training row at {timestamp}: {e}")
+                continue
+            # The recommendations recorded with a sample are not inputs
+            features.pop('recommendations', None)
+            training_data.append({'id': row_id, 'timestamp': timestamp, 'features': features,
+                                  'preferences': preferences, 'satisfaction': satisfaction})
+        return training_data
+            
+    def export_training_data(self, dataset, encode, batch_size=5000):
+        """
+        Append feedback recorded since the last export to a columnar dataset.
+        
+        Rows are read in batches after the dataset's watermark (the id of
+        the last exported feedback row), encoded to columns and appended, so
+        each export only touches new rows and memory stays at one batch.
+        
+        Args:
+            dataset: ColumnarDataset to append to
+            encode: Callable turning a list of get_training_data dicts into a
+                dict of column name -> 1-D numeric array
+            batch_size (int): Rows read and appended per batch
+            
+        Returns:
+            int: Number of rows appended
+        """
+        exported = 0
+        while True:
+            batch = self.get_training_data(after_id=dataset.watermark, limit=batch_size)
+            if not batch:
+                break
+            dataset.append(encode(batch), watermark=batch[-1]['id'])
+            exported += len(batch)
+            if len(batch) < batch_size:
+                break
+        if exported:
+            self.logger.info(f"Exported {exported} training rows to {dataset.path}")
+        return exported
+            
+    def save_model(self, name, version, parameters):
+        """Save model data to the database."""
+        try:
+            with self.connections.transaction() as conn:
+                conn.execute('''
+                INSERT INTO models (name, version, parameters)
+                VALUES (?, ?, ?)
+                ''', (name, version, parameters))
         except sqlite3.Error as e:
             self.logger.error(f"Error saving model data: {e}")
-        finally:
-            conn.close()
             
     def get_models(self):
         """Retrieve all models from the database."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.connections.get().cursor()
             
             cursor.execute('SELECT * FROM models')
             rows = cursor.fetchall()
@@ -172,5 +716,52 @@ class DataStorage:
         except sqlite3.Error as e:
             self.logger.error(f"Error retrieving models: {e}")
             return []
-        finally:
-            conn.close()
\ No newline at end of file
+            
+    def _load_items(self, sample_ids, fields=LIST_FIELDS):
+        """Load list-field items for samples, grouped by sample id."""
+        cursor = self.connections.get().cursor()
+        cursor.execute(f'''
+        SELECT sample_id, field, position, value FROM environment_items
+        WHERE sample_id BETWEEN ? AND ? AND field IN ({', '.join('?' * len(fields))})
+        ''', (min(sample_ids), max(sample_ids), *fields))
+        
+        wanted = set(sample_ids)
+        items = {}
+        for sample_id, field, position, value in cursor:
+            if sample_id in wanted:
+                items.setdefault(sample_id, []).append((field, position, value))
+        return items
+            
+    def _timestamp(self, value):
+        """Normalize a datetime or string to the stored ISO timestamp format."""
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+            
+    def _time_range(self, start, end, column='timestamp'):
+        """Build a WHERE clause and parameters for an optional [start, end) range."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f'{column} >= ?')
+            params.append(self._timestamp(start))
+        if end is not None:
+            clauses.append(f'{column} < ?')
+            params.append(self._timestamp(end))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, tuple(params)
+            
+    def _after(self, where, params, after, descending=False):
+        """Add a keyset condition continuing after a (timestamp, id) cursor."""
+        if after is None:
+            return where, params
+        timestamp, row_id = self._timestamp(after[0]), int(after[1])
+        # The plain timestamp bound lets the timestamp index seek to the cursor
+        if descending:
+            clause = 'timestamp <= ? AND (timestamp < ? OR id < ?)'
+        else:
+            clause = 'timestamp >= ? AND (timestamp > ? OR id > ?)'
+        where = f"{where} AND {clause}" if where else f" WHERE {clause}"
+        return where, params + (timestamp, timestamp, row_id)
+            
+    def close(self):
+        """Write buffered samples and close all database connections."""
+        self.write_buffer.close()
+        self.connections.close()
\ No newline at end of file
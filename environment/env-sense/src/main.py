@@ -1,3 +1,5 @@
+import argparse
+import json
 import logging
 import sys
 import time
@@ -5,19 +7,26 @@ import threading
 import os
 from datetime import datetime
 
+if not __package__:
+    # Launched as a script (python src/main.py): make the src package
+    # importable so its modules' relative imports resolve
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Import core components
-from core.environment_manager import EnvironmentManager
-from core.preference_engine import PreferenceEngine
-from core.system_interface import SystemInterface
+from src.core.environment_manager import EnvironmentManager
+from src.core.preference_engine import PreferenceEngine
+from src.core.system_interface import SystemInterface
 
 # Import data components
-from data.collectors import TimeCollector, WindowsSystemCollector, CalendarCollector
-from data.storage import DataStorage
+from src.data.collectors import (TimeCollector, WindowsSystemCollector, LinuxSystemCollector,
+                             CalendarCollector)
+from src.data.storage import DataStorage
 
 # Import adapters
-from adapters.lighting import LightingAdapter
-from adapters.sound import SoundAdapter
-from adapters.workspace import WorkspaceAdapter
+from src.adapters.devices import DeviceRegistry
+from src.adapters.lighting import LightingAdapter
+from src.adapters.sound import SoundAdapter
+from src.adapters.workspace import WorkspaceAdapter, WIN32_AVAILABLE
 
 def setup_logging():
     """Configure logging for the application."""
@@ -38,35 +47,147 @@ def setup_logging():
     
     return logging.getLogger("main")
 
-def main():
+def load_config(config_path=None):
+    """Load the YAML configuration, falling back to an empty config."""
+    if not config_path:
+        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   '..', 'config', 'default_config.yaml')
+    try:
+        import yaml
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except Exception as e:
+        logging.getLogger("main").warning(f"Could not load config from {config_path}: {e}")
+        return {}
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Personal Environment Manager")
+    parser.add_argument("--config", help="Path to a YAML config file")
+    parser.add_argument("--benchmark", choices=["models", "processors", "windows", "calendar"],
+                        help="Run a built-in benchmark and exit")
+    parser.add_argument("--analyze-history", action="store_true",
+                        help="Analyze all stored environment data and exit")
+    return parser.parse_args(argv)
+
+def run_benchmark(name, config):
+    """Run a built-in benchmark and print its results."""
+    if name == "models":
+        from src.ml.backends import format_benchmark
+        ml_config = config.get('machine_learning', {})
+        preference_engine = PreferenceEngine(DataStorage(), background_training=False,
+                                             model_backend=ml_config.get('model_backend', 'random_forest'),
+                                             model_params=ml_config.get('model_params'))
+        results = preference_engine.benchmark_backends()
+        print(format_benchmark(results) if results else "Not enough stored history to benchmark")
+    elif name == "processors":
+        from src.data.processors import benchmark_processors, format_benchmark
+        print(format_benchmark(benchmark_processors()))
+    elif name == "windows":
+        from src.data.window_system import benchmark_window_enumeration
+        result = benchmark_window_enumeration()
+        print(f"{result['us_per_pass']:.1f} us/pass, {result['window_calls']:.0f} window system calls "
+              f"and {result['name_lookups']:.0f} name lookups per pass "
+              f"({result['processes']} processes, {result['windows']} visible windows)")
+    elif name == "calendar":
+        from src.data.calendar_source import benchmark_calendar_collector
+        result = benchmark_calendar_collector()
+        print(f"{result['us_per_collect']:.1f} us/collect with {result['events']} events, "
+              f"{result['queries']} calendar queries")
+    return 0
+
+def run_history_analysis(config):
+    """Analyze the stored history on all cores and print the insights."""
+    from src.data.analytics import analyze_history
+    storage = DataStorage()
+    try:
+        analytics_config = config.get('analytics', {})
+        result = analyze_history(storage, batch_size=analytics_config.get('batch_size', 10000),
+                                 max_workers=analytics_config.get('max_workers'))
+    finally:
+        storage.close()
+    print(json.dumps(result, indent=2))
+    return 0
+
+def main(argv=None):
     """Main application entry point."""
+    args = parse_args(argv)
     logger = setup_logging()
+    config = load_config(args.config)
+    
+    if args.benchmark:
+        return run_benchmark(args.benchmark, config)
+    if args.analyze_history:
+        return run_history_analysis(config)
+    
     logger.info("Starting Personal Environment Manager")
     
     # Initialize components
     try:
         # Initialize storage
-        storage = DataStorage()
+        storage_config = config.get('storage', {})
+        retention_config = storage_config.get('retention', {})
+        storage = DataStorage(
+            buffer_rows=storage_config.get('buffer_rows', 500),
+            flush_interval=storage_config.get('flush_interval', 2.0),
+            raw_days=retention_config.get('raw_days', 30),
+            hourly_days=retention_config.get('hourly_days', 365),
+            daily_days=retention_config.get('daily_days')
+        )
         
         # Initialize collectors
-        collectors = [
-            TimeCollector(),
-            WindowsSystemCollector(),
-            CalendarCollector()
-        ]
+        collector_config = config.get('collectors', {})
+        collectors = [TimeCollector()]
+        if sys.platform.startswith('linux'):
+            collectors.append(LinuxSystemCollector())
+        else:
+            collectors.append(WindowsSystemCollector())
+        if sys.platform == 'win32':
+            # The calendar is read from Outlook
+            collectors.append(CalendarCollector(
+                refresh_ttl=collector_config.get('calendar_refresh_ttl', 1800),
+                window_days=collector_config.get('calendar_window_days', 7)))
         
         # Initialize preference engine
-        preference_engine = PreferenceEngine(storage)
+        ml_config = config.get('machine_learning', {})
+        preference_engine = PreferenceEngine(
+            storage,
+            cache_size=ml_config.get('prediction_cache_size', 512),
+            cache_ttl=ml_config.get('prediction_cache_ttl', 600),
+            background_training=ml_config.get('background_training', True),
+            training_process=ml_config.get('training_process', True),
+            model_backend=ml_config.get('model_backend', 'random_forest'),
+            model_params=ml_config.get('model_params'),
+            learning_mode=ml_config.get('learning_mode', 'batch'),
+            consolidation_hours=ml_config.get('consolidation_hours'),
+            dataset_path=(os.path.join(os.path.dirname(storage.db_path), 'training-dataset')
+                          if ml_config.get('columnar_training', True) else None)
+        )
         
         # Initialize adapters
+        lighting_config = config.get('adapters', {}).get('lighting', {})
         adapters = [
-            LightingAdapter(),
-            SoundAdapter(),
-            WorkspaceAdapter()
+            LightingAdapter(DeviceRegistry(
+                ttl=lighting_config.get('discovery_ttl', 86400),
+                refresh_interval=lighting_config.get('discovery_interval', 3600))),
+            SoundAdapter()
         ]
+        if WIN32_AVAILABLE:
+            adapters.append(WorkspaceAdapter())
         
         # Initialize environment manager
-        env_manager = EnvironmentManager(collectors, preference_engine, adapters)
+        env_manager = EnvironmentManager(
+            collectors, preference_engine, adapters,
+            collector_timeout=collector_config.get('default_timeout', 5.0),
+            collector_timeouts=collector_config.get('timeouts'),
+            max_workers=collector_config.get('max_workers', 4),
+            collector_intervals=collector_config.get('intervals'),
+            collector_ttls=collector_config.get('ttls'),
+            actuation_tolerances=config.get('actuation', {}).get('tolerances'),
+            storage=storage,
+            maintenance_interval=storage_config.get('maintenance_interval', 3600)
+        )
+        env_manager.adjustment_frequency = config.get('system', {}).get('check_frequency', 60)
         
         # Start the environment manager
         env_manager.start()
@@ -80,6 +201,10 @@ def main():
         except KeyboardInterrupt:
             logger.info("Shutting down...")
             env_manager.stop()
+            for component in collectors + adapters:
+                if hasattr(component, 'close'):
+                    component.close()
+            storage.close()
             
     except Exception as e:
         logger.error(f"Error starting application: {e}")
@@ -0,0 +1,231 @@
+import logging
+import pickle
+import threading
+import time
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.neighbors import KNeighborsRegressor
+
+logger = logging.getLogger("ModelBackends")
+
+class OnlineRidgeRegressor:
+    """
+    Ridge regression learned from streaming sufficient statistics.
+
+    The model only keeps weighted sums of x, y, x*x^T and x*y^T, so
+    ``partial_fit`` costs the same however much history has been seen and
+    the fitted coefficients are identical to a batch fit on all samples.
+    Features are standardized internally from the same statistics, so the
+    inputs do not need to be scaled beforehand.
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.n_samples_seen_ = 0.0
+        self._sums = None  # (sum_x, sum_y, sum_xx, sum_xy)
+        self._solution = None  # (coef, intercept), replaced atomically
+        self._single_output = False
+        self._lock = threading.Lock()
+
+    def fit(self, X, y, sample_weight=None):
+        """Fit from scratch, discarding previously seen samples."""
+        with self._lock:
+            self._sums = None
+            self.n_samples_seen_ = 0.0
+        return self.partial_fit(X, y, sample_weight)
+
+    def partial_fit(self, X, y, sample_weight=None):
+        """Fold a batch of samples into the statistics and refresh the solution."""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if y.ndim == 1:
+            self._single_output = True
+            y = y.reshape(-1, 1)
+        w = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+        Xw = X * w[:, None]
+        with self._lock:
+            if self._sums is None:
+                d, k = X.shape[1], y.shape[1]
+                self._sums = (np.zeros(d), np.zeros(k), np.zeros((d, d)), np.zeros((d, k)))
+            sum_x, sum_y, sum_xx, sum_xy = self._sums
+            sum_x += Xw.sum(axis=0)
+            sum_y += (y * w[:, None]).sum(axis=0)
+            sum_xx += Xw.T @ X
+            sum_xy += Xw.T @ y
+            self.n_samples_seen_ += float(w.sum())
+            self._solution = self._solve()
+        return self
+
+    def predict(self, X):
+        """Predict targets for X."""
+        solution = self._solution
+        if solution is None:
+            raise ValueError("OnlineRidgeRegressor has not seen any samples")
+        coef, intercept = solution
+        predictions = np.asarray(X, dtype=np.float64) @ coef + intercept
+        return predictions.ravel() if self._single_output else predictions
+
+    def _solve(self):
+        """Solve the standardized ridge system from the current statistics."""
+        n = self.n_samples_seen_
+        if n <= 0:
+            return None
+        sum_x, sum_y, sum_xx, sum_xy = self._sums
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+        cov_xx = sum_xx / n - np.outer(mean_x, mean_x)
+        cov_xy = sum_xy / n - np.outer(mean_x, mean_y)
+
+        std = np.sqrt(np.clip(np.diag(cov_xx), 0, None))
+        std[std < 1e-12] = 1.0
+        system = cov_xx / np.outer(std, std) + (self.alpha / n) * np.eye(len(std))
+        beta = np.linalg.solve(system, cov_xy / std[:, None])
+
+        coef = beta / std[:, None]
+        intercept = mean_y - mean_x @ coef
+        return coef, intercept
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+def _random_forest(**params):
+    return RandomForestRegressor(**params)
+
+def _shallow_forest(**params):
+    # A handful of depth-limited trees is plenty for a few hundred rows
+    defaults = {'n_estimators': 20, 'max_depth': 8, 'min_samples_leaf': 2, 'n_jobs': 1}
+    return RandomForestRegressor(**{**defaults, **params})
+
+def _ridge(**params):
+    return Ridge(**{'alpha': 1.0, **params})
+
+def _linear(**params):
+    return LinearRegression(**params)
+
+def _hist_gradient_boosting(**params):
+    # HistGradientBoostingRegressor only predicts one target, so fit one per output
+    defaults = {'max_iter': 100, 'max_depth': 4, 'learning_rate': 0.1}
+    return MultiOutputRegressor(HistGradientBoostingRegressor(**{**defaults, **params}))
+
+def _knn(**params):
+    return KNeighborsRegressor(**{'n_neighbors': 5, 'weights': 'distance', **params})
+
+def _online_ridge(**params):
+    return OnlineRidgeRegressor(**params)
+
+# Registry of estimator factories selectable by name from the config
+MODEL_BACKENDS = {
+    'random_forest': _random_forest,
+    'shallow_forest': _shallow_forest,
+    'ridge': _ridge,
+    'linear': _linear,
+    'hist_gradient_boosting': _hist_gradient_boosting,
+    'knn': _knn,
+    'online_ridge': _online_ridge,
+}
+
+def register_backend(name, factory):
+    """Register an estimator factory under a backend name."""
+    MODEL_BACKENDS[name] = factory
+
+def available_backends():
+    """Return the names of all registered backends."""
+    return sorted(MODEL_BACKENDS)
+
+def create_backend(name, **params):
+    """
+    Create an unfitted estimator for a backend.
+
+    Args:
+        name (str): Registered backend name
+        **params: Estimator parameters overriding the backend defaults
+
+    Returns:
+        An unfitted scikit-learn style regressor
+    """
+    try:
+        factory = MODEL_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model backend '{name}', choose from {available_backends()}")
+    return factory(**params)
+
+def benchmark_backends(features, targets, backends=None, test_size=0.25,
+                       predict_repeats=50, random_state=0, backend_params=None):
+    """
+    Compare backends on the same data.
+
+    Each backend is trained on a training split and measured for fit time,
+    single-row predict latency through the production inference path,
+    pickled model size and mean absolute error on the held-out split.
+
+    Args:
+        features: Feature matrix or records accepted by FeatureSchema.to_matrix
+        targets: Target matrix, one column per predicted setting
+        backends (list): Backend names to compare, defaults to all registered ones
+        test_size (float): Fraction of rows held out for the error estimate
+        predict_repeats (int): Number of single-row predictions timed per backend
+        random_state (int): Seed for the train/test split
+        backend_params (dict): Optional estimator parameters per backend name;
+            backends without an entry use their defaults
+
+    Returns:
+        list: One result dict per backend
+    """
+    from .models import UserPreferenceModel
+
+    schema = UserPreferenceModel().schema
+    X = schema.to_matrix(features)
+    y = np.asarray(targets, dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state)
+
+    results = []
+    for name in backends or available_backends():
+        result = {'backend': name}
+        try:
+            model = UserPreferenceModel(backend=name, backend_params=(backend_params or {}).get(name))
+
+            start = time.perf_counter()
+            model.train(X_train, y_train)
+            result['fit_seconds'] = time.perf_counter() - start
+
+            row = schema.new_row()
+            timings = []
+            for i in range(predict_repeats):
+                row[:] = X_test[i % len(X_test)]
+                start = time.perf_counter()
+                model.predict_row(row)
+                timings.append(time.perf_counter() - start)
+            result['predict_ms'] = float(np.median(timings) * 1000)
+
+            result['size_kb'] = len(pickle.dumps(model.model)) / 1024
+            predictions = np.asarray(model.predict(X_test)).reshape(y_test.shape)
+            result['mae'] = float(np.mean(np.abs(predictions - y_test)))
+        except Exception as e:
+            logger.warning(f"Benchmark of backend '{name}' failed: {e}")
+            result['error'] = str(e)
+        results.append(result)
+
+    return results
+
+def format_benchmark(results):
+    """Format benchmark results as a plain-text table."""
+    lines = [f"{'backend':<24}{'fit (s)':>10}{'predict (ms)':>14}{'size (KB)':>12}{'MAE':>10}"]
+    for result in results:
+        if 'error' in result:
+            lines.append(f"{result['backend']:<24}  failed: {result['error']}")
+            continue
+        lines.append(f"{result['backend']:<24}{result['fit_seconds']:>10.3f}"
+                     f"{result['predict_ms']:>14.3f}{result['size_kb']:>12.1f}"
+                     f"{result['mae']:>10.2f}")
+    return "\n".join(lines)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import numpy as np
+
+# Ordered model inputs: (name, default used when the value is missing, cache quantum)
+DEFAULT_FEATURES = [
+    ('time_hour', 0, None),
+    ('time_minute', 0, 15),
+    ('time_day_of_week', 0, None),
+    ('time_is_weekend', 0, None),
+    ('system_cpu_usage', 50, 10),
+    ('system_memory_usage', 50, 10),
+    ('system_battery', 100, 10),
+    ('calendar_has_current_meeting', 0, None),
+    ('calendar_next_meeting_in_minutes', 1440, 15),
+]
+
+class FeatureSchema:
+    """
+    Fixed-width, ordered feature layout shared by training and inference.
+
+    Every row produced by the schema has the same columns in the same order,
+    with defaults filled in for values a collector did not provide, so the
+    model always sees the columns it was trained on.
+    """
+
+    def __init__(self, features=None):
+        """
+        Initialize the schema.
+
+        Args:
+            features (list): ``(name, default, quantum)`` tuples, defaults to DEFAULT_FEATURES
+        """
+        features = features if features is not None else DEFAULT_FEATURES
+        self.columns = [name for name, _, _ in features]
+        self.defaults = np.array([default for _, default, _ in features], dtype=np.float64)
+        self.quanta = [quantum for _, _, quantum in features]
+        self._items = list(enumerate(zip(self.columns, self.defaults.tolist())))
+
+    @property
+    def width(self):
+        """Number of columns in a feature row."""
+        return len(self.columns)
+
+    def new_row(self):
+        """Allocate a row buffer that can be reused with fill()."""
+        return self.defaults.copy()
+
+    def fill(self, data, out):
+        """
+        Write the features for one sample into a preallocated row.
+
+        Args:
+            data (dict): Collected environment data
+            out (numpy.ndarray): Row of length ``width`` to fill in place
+
+        Returns:
+            numpy.ndarray: The filled row
+        """
+        for i, (name, default) in self._items:
+            value = data.get(name)
+            out[i] = default if value is None else value
+        return out
+
+    def to_matrix(self, records):
+        """Build a feature matrix from a list of dicts, a DataFrame or an array."""
+        if hasattr(records, 'reindex'):
+            # DataFrame: select schema columns in order, defaulting missing ones
+            frame = records.reindex(columns=self.columns)
+            return frame.fillna(dict(zip(self.columns, self.defaults))).to_numpy(dtype=np.float64)
+        if isinstance(records, np.ndarray):
+            return np.asarray(records, dtype=np.float64).reshape(-1, self.width)
+
+        matrix = np.empty((len(records), self.width), dtype=np.float64)
+        for row, record in zip(matrix, records):
+            self.fill(record, row)
+        return matrix
+
+    def quantize(self, row):
+        """Return a hashable key for a row with values rounded to their quanta."""
+        return tuple(int(value // quantum) if quantum else value
+                     for value, quantum in zip(row.tolist(), self.quanta))
+
+    def to_dict(self):
+        """Serialize the schema so it can be stored alongside a trained model."""
+        return {'features': [[name, float(default), quantum] for name, default, quantum
+                             in zip(self.columns, self.defaults, self.quanta)]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a schema serialized with to_dict()."""
+        return cls([tuple(feature) for feature in data['features']])
+
+    def __eq__(self, other):
+        return (isinstance(other, FeatureSchema) and self.columns == other.columns
+                and np.array_equal(self.defaults, other.defaults))
\ No newline at end of file
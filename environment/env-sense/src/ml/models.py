@@ -1,26 +1,117 @@
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import numpy as np
 import pandas as pd
+from ..data.export import ColumnarDataset
+from .backends import create_backend
+from .features import FeatureSchema
 
 class UserPreferenceModel:
-    def __init__(self):
-        self.model = RandomForestRegressor()
+    def __init__(self, backend='random_forest', backend_params=None, schema=None):
+        # Estimator is chosen from the backend registry (see ml/backends.py)
+        self.backend = backend
+        self.model = create_backend(backend, **(backend_params or {}))
         self.scaler = StandardScaler()
+        # Column layout the model is trained on and expects at inference time
+        self.schema = schema if schema is not None else FeatureSchema()
+        self._mean = None
+        self._scale = None
 
-    def train(self, features, targets):
-        features_scaled = self.scaler.fit_transform(features)
+    def train(self, features, targets, chunk_size=65536):
+        """
+        Fit the scaler and the estimator.
+
+        Args:
+            features: Feature records, DataFrame or matrix, or a ColumnarDataset
+            targets: Target matrix, or the names of the target columns when
+                training from a ColumnarDataset
+            chunk_size (int): Rows read at a time from a ColumnarDataset
+        """
+        if isinstance(features, ColumnarDataset):
+            features_scaled = self._scale_dataset(features, chunk_size)
+            targets = features.matrix(targets)
+        else:
+            features_scaled = self.scaler.fit_transform(self.schema.to_matrix(features))
         self.model.fit(features_scaled, targets)
+        self._mean = self.scaler.mean_.copy()
+        self._scale = self.scaler.scale_.copy()
+
+    def _scale_dataset(self, dataset, chunk_size):
+        """
+        Fit the scaler on a memory-mapped dataset and return the scaled features.
+
+        Both passes read the columns chunk by chunk straight from the memory
+        maps, so the only full-size allocation is the scaled matrix handed
+        to the estimator.
+        """
+        columns = self.schema.columns
+        n = len(dataset)
+        for start in range(0, n, chunk_size):
+            self.scaler.partial_fit(dataset.matrix(columns, start, start + chunk_size))
+
+        features_scaled = np.empty((n, len(columns)))
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            features_scaled[start:stop] = self.scaler.transform(dataset.matrix(columns, start, stop))
+        return features_scaled
 
     def predict(self, features):
-        features_scaled = self.scaler.transform(features)
+        if self._mean is None:
+            raise ValueError("Model has not been trained")
+        features_scaled = (self.schema.to_matrix(features) - self._mean) / self._scale
         return self.model.predict(features_scaled)
 
+    @property
+    def supports_partial_fit(self):
+        """Whether the backend can be updated incrementally."""
+        return hasattr(self.model, 'partial_fit')
+
+    def partial_fit(self, features, targets, sample_weight=None):
+        """
+        Update the model with new samples without refitting from scratch.
+
+        A model that has never been batch-trained keeps its inputs unscaled,
+        since the scaling would otherwise drift as samples arrive; a model
+        that was batch-trained keeps using the scaling it was trained with.
+        """
+        if not self.supports_partial_fit:
+            raise TypeError(f"Backend '{self.backend}' does not support incremental updates")
+        if self._mean is None:
+            self._mean = np.zeros(self.schema.width)
+            self._scale = np.ones(self.schema.width)
+        features_scaled = (self.schema.to_matrix(features) - self._mean) / self._scale
+        self.model.partial_fit(features_scaled, targets, sample_weight=sample_weight)
+
+    def predict_row(self, row):
+        """
+        Predict for a single row filled by ``schema.fill``.
+
+        The row is scaled in place and handed to the estimator as a 2-D view,
+        so no DataFrame or intermediate arrays are built. The row's contents
+        are overwritten and must be refilled before the next call.
+        """
+        if self._mean is None:
+            raise ValueError("Model has not been trained")
+        np.subtract(row, self._mean, out=row)
+        np.divide(row, self._scale, out=row)
+        return self.model.predict(row.reshape(1, -1))
+
     def save_model(self, filepath):
         import joblib
-        joblib.dump(self.model, filepath)
+        joblib.dump({'model': self.model, 'scaler': self.scaler, 'backend': self.backend,
+                     'schema': self.schema.to_dict(), 'mean': self._mean,
+                     'scale': self._scale}, filepath)
 
     def load_model(self, filepath):
         import joblib
-        self.model = joblib.load(filepath)
\ No newline at end of file
+        saved = joblib.load(filepath)
+        if isinstance(saved, dict):
+            self.model = saved['model']
+            self.scaler = saved['scaler']
+            self.backend = saved.get('backend', self.backend)
+            self.schema = FeatureSchema.from_dict(saved['schema'])
+            self._mean = saved.get('mean', getattr(self.scaler, 'mean_', None))
+            self._scale = saved.get('scale', getattr(self.scaler, 'scale_', None))
+        else:
+            # Older files only contain the estimator
+            self.model = saved
\ No newline at end of file
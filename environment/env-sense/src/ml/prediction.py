@@ -2,6 +2,7 @@ import logging
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from .features import FeatureSchema
 from .models import UserPreferenceModel
 
 class PredictionEngine:
@@ -16,6 +17,7 @@ class PredictionEngine:
         """
         self.model = model
         self.logger = logging.getLogger("PredictionEngine")
+        self._row = None  # reused feature buffer
         
     def predict(self, features):
         """
@@ -28,11 +30,17 @@ class PredictionEngine:
             dict: Predicted preferences
         """
         try:
-            # Convert features to DataFrame for prediction
-            features_df = pd.DataFrame([features])
+            # Fill a fixed-width row in the model's feature schema
+            schema = getattr(self.model, 'schema', None) or FeatureSchema()
+            if self._row is None or len(self._row) != schema.width:
+                self._row = schema.new_row()
+            schema.fill(features, self._row)
             
             # Make prediction
-            prediction = self.model.predict(features_df)
+            if hasattr(self.model, 'predict_row'):
+                prediction = self.model.predict_row(self._row)
+            else:
+                prediction = self.model.predict(self._row.reshape(1, -1))
             
             # Convert numerical predictions to settings
             settings = self._interpret_prediction(prediction)
@@ -1,3 +1,13 @@
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from ..data.export import ColumnarDataset
+from .models import UserPreferenceModel
+
 class Training:
     def __init__(self, model, data_processor):
         self.model = model
@@ -17,4 +27,160 @@ class Training:
 
     def load_model(self, file_path):
         import joblib
-        self.model = joblib.load(file_path)
\ No newline at end of file
+        self.model = joblib.load(file_path)
+
+def _lower_priority():
+    """Run the training worker at a lower scheduling priority where supported."""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+def fit_model(features, targets, backend='random_forest', backend_params=None):
+    """
+    Fit a fresh preference model.
+
+    Kept at module level so it can be pickled and run in a worker process.
+
+    Args:
+        features: Training features
+        targets: Training targets
+        backend (str): Model backend name from ml/backends.py
+        backend_params (dict): Optional estimator parameters for the backend
+
+    Returns:
+        UserPreferenceModel: The fitted model
+    """
+    model = UserPreferenceModel(backend=backend, backend_params=backend_params)
+    model.train(features, targets)
+    return model
+
+def validate_model(model, features, n_rows=5):
+    """Check that a freshly trained model produces finite predictions."""
+    if isinstance(features, ColumnarDataset):
+        sample = features.matrix(model.schema.columns, stop=n_rows)
+    else:
+        sample = features.iloc[:n_rows] if hasattr(features, 'iloc') else features[:n_rows]
+    predictions = np.asarray(model.predict(sample), dtype=float)
+    return len(predictions) == len(sample) and bool(np.all(np.isfinite(predictions)))
+
+class BackgroundTrainer:
+    """
+    Trains preference models off the calling thread and hot-swaps the result.
+
+    Fitting runs in a single low-priority worker process so it does not
+    contend with the monitoring loop or the UI for the GIL. Requests that
+    arrive while a training run is in progress are coalesced into a single
+    follow-up run, and the finished model is only handed to ``on_model_ready``
+    once it has been validated, so the old model keeps serving until then.
+    """
+
+    def __init__(self, load_data, on_model_ready, use_process=True, model_options=None):
+        """
+        Initialize the background trainer.
+
+        Args:
+            load_data: Callable taking ``force`` and returning ``(features, targets)``,
+                or None if there is not enough data to train
+            on_model_ready: Callable receiving the validated model and its sample count
+            use_process (bool): Fit in a worker process rather than a thread
+            model_options (dict): Keyword arguments passed to fit_model, e.g. the backend
+        """
+        self.load_data = load_data
+        self.on_model_ready = on_model_ready
+        self.use_process = use_process
+        self.model_options = dict(model_options or {})
+        self.logger = logging.getLogger("BackgroundTrainer")
+        self._executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = False
+        self._force = False
+
+    @property
+    def is_training(self):
+        """Whether a training run is in progress or queued."""
+        with self._lock:
+            return self._running
+
+    def request(self, force=False):
+        """
+        Request a training run.
+
+        Args:
+            force (bool): Train even if the data volume check would normally skip it
+
+        Returns:
+            bool: True if a new run was started, False if it was coalesced into a running one
+        """
+        with self._lock:
+            self._force = self._force or force
+            if self._running:
+                self._pending = True
+                return False
+            self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="model-trainer")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def wait(self, timeout=None):
+        """Wait for the current training run to finish."""
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def shutdown(self):
+        """Stop the worker process."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self):
+        """Training thread body; keeps going while coalesced requests are pending."""
+        while True:
+            with self._lock:
+                force = self._force
+                self._force = False
+                self._pending = False
+
+            try:
+                self._train_once(force)
+            except Exception as e:
+                self.logger.error(f"Error training model in background: {e}")
+
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+
+    def _train_once(self, force):
+        """Load data, fit a new model, validate it and hand it over."""
+        data = self.load_data(force)
+        if data is None:
+            return False
+        features, targets = data
+
+        model = self._fit(features, targets)
+        if not validate_model(model, features):
+            self.logger.warning("Discarding trained model that failed validation")
+            return False
+
+        self.on_model_ready(model, len(features))
+        return True
+
+    def _fit(self, features, targets):
+        """Fit in the worker process, falling back to this thread if that fails."""
+        if self.use_process:
+            try:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=1, initializer=_lower_priority)
+                return self._executor.submit(fit_model, features, targets,
+                                             **self.model_options).result()
+            except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+                self.logger.warning(f"Training process unavailable, training in thread instead: {e}")
+                self.shutdown()
+                self.use_process = False
+        return fit_model(features, targets, **self.model_options)
@@ -170,7 +170,7 @@ class Dashboard:
         ttk.Label(general_frame, text="Environment check frequency (seconds):").grid(
             row=0, column=0, sticky="w", padx=5, pady=5)
         
-        self.frequency_var = tk.StringVar(value="60")
+        self.frequency_var = tk.StringVar(value=str(self.env_manager.adjustment_frequency))
         frequency_entry = ttk.Entry(general_frame, textvariable=self.frequency_var, width=10)
         frequency_entry.grid(row=0, column=1, padx=5, pady=5)
         
@@ -362,12 +362,8 @@ class Dashboard:
             except ValueError:
                 pass
                 
-            # Apply settings through adapters
-            for adapter in self.env_manager.adapters:
-                relevant_settings = {k: v for k, v in settings.items() 
-                                    if k in adapter.supported_settings()}
-                if relevant_settings:
-                    adapter.apply_settings(relevant_settings)
+            # Apply settings through adapters, even if they look unchanged
+            self.env_manager.apply_settings(settings, force=True)
             
             # Show confirmation
             import tkinter.messagebox as messagebox
@@ -403,8 +399,14 @@ class Dashboard:
         try:
             metric = self.metric_var.get()
             
-            # Get historical data
-            user_prefs = self.storage.get_environment_data(limit=50)
+            # Get the 50 most recent points, reading only the plotted column
+            if metric == 'satisfaction':
+                rows = self.storage.get_user_preferences(limit=50, descending=True)
+                user_prefs = [{'timestamp': timestamp, 'satisfaction': satisfaction}
+                              for _, timestamp, _, satisfaction in reversed(rows)]
+            else:
+                rows = self.storage.get_environment_data(columns=[metric], limit=50, descending=True)
+                user_prefs = list(reversed(rows))
             
             if not user_prefs:
                 return
@@ -420,7 +422,7 @@ class Dashboard:
                         values.append(pref['satisfaction'])
             else:
                 for pref in user_prefs:
-                    if metric in pref:
+                    if pref.get(metric) is not None:
                         timestamps.append(datetime.fromisoformat(pref['timestamp']))
                         values.append(pref[metric])
             
@@ -1,5 +1,16 @@
 import unittest
-from src.data.collectors import DataCollector
+import datetime
+import os
+import psutil
+from src.data.calendar_source import CalendarSource, FakeCalendarSource, benchmark_calendar_collector
+from src.core.process_cache import ProcessCache, ProcessInfo
+import random
+import shutil
+import tempfile
+from src.data.collectors import (CalendarCollector, DataCollector, LinuxSystemCollector,
+                                 WindowsSystemCollector)
+from src.data.event_index import EventIndex
+from src.data.window_system import FakeWindowSystem, WindowSystem, benchmark_window_enumeration
 
 class TestDataCollector(unittest.TestCase):
 
@@ -22,5 +33,242 @@ class TestDataCollector(unittest.TestCase):
         data = self.collector.collect_data()
         self.assertEqual(data, {})
 
+class TestWindowsSystemCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.lookups = []
+        self.names = {10: 'code.exe', 20: 'chrome.exe', 21: 'chrome.exe', 30: 'svchost.exe'}
+        # (hwnd, pid, visible): two chrome processes, a hidden service window
+        self.windows = FakeWindowSystem([(1, 10, True), (2, 20, True), (3, 20, True),
+                                         (4, 21, True), (5, 30, False)], foreground=2)
+        self.cache = ProcessCache(max_age=3600, pids=lambda: list(self.names), lookup=self._lookup)
+        self.collector = WindowsSystemCollector(window_system=self.windows, process_cache=self.cache)
+
+    def _lookup(self, pid):
+        self.lookups.append(pid)
+        return ProcessInfo(pid, float(len(self.lookups)), self.names[pid]) if pid in self.names else None
+
+    def test_single_enumeration_pass(self):
+        self.assertEqual(self.collector._get_active_processes(), ['code.exe', 'chrome.exe'])
+        self.assertEqual(self.windows.calls, 1)
+        # One scan of the process table, nothing looked up per window
+        self.assertEqual(sorted(self.lookups), [10, 20, 21, 30])
+
+    def test_names_served_from_cache(self):
+        self.collector._get_active_processes()
+        self.assertEqual(self.collector._get_active_window(), 'chrome.exe')
+        self.collector._get_active_processes()
+        self.assertEqual(len(self.lookups), 4)
+
+    def test_benchmark_needs_no_lookups_when_warm(self):
+        result = benchmark_window_enumeration(processes=50, windows=20, repeats=3)
+        self.assertEqual(result['window_calls'], 2)
+        self.assertEqual(result['name_lookups'], 0)
+
+    def test_incomplete_backend_rejected(self):
+        class NoEnumeration(WindowSystem):
+            def foreground_pid(self):
+                return None
+        with self.assertRaises(TypeError):
+            NoEnumeration()
+
+class TestProcessCache(unittest.TestCase):
+
+    def setUp(self):
+        self.live = {1: 'a.exe', 2: 'b.exe'}
+        self.started = {}  # pid -> create time, when not 100 + pid
+        self.lookups = []
+        self.cache = ProcessCache(max_age=3600, pids=lambda: list(self.live), lookup=self._lookup,
+                                  create_time=self._create_time)
+
+    def _lookup(self, pid):
+        self.lookups.append(pid)
+        return ProcessInfo(pid, self._create_time(pid), self.live[pid]) if pid in self.live else None
+
+    def _create_time(self, pid):
+        if pid not in self.live:
+            raise psutil.NoSuchProcess(pid)
+        return self.started.get(pid, 100.0 + pid)
+
+    def test_incremental_refresh(self):
+        self.assertEqual(self.cache.names(), {'a.exe', 'b.exe'})
+        self.live = {2: 'b.exe', 3: 'c.exe'}
+        self.cache.refresh(force=True)
+        self.assertEqual(self.cache.names(), {'b.exe', 'c.exe'})
+        # Only the new pid was looked up on the second scan
+        self.assertEqual(self.lookups, [1, 2, 3])
+
+    def test_pid_reused_between_scans(self):
+        self.assertEqual(self.cache.names(), {'a.exe', 'b.exe'})
+        self.live[1], self.started[1] = 'notepad.exe', 500.0
+        self.cache.refresh(force=True)
+        self.assertEqual(self.cache.names(), {'notepad.exe', 'b.exe'})
+        self.assertEqual(self.cache.find('notepad.exe'), [ProcessInfo(1, 500.0, 'notepad.exe')])
+        self.assertEqual(self.lookups, [1, 2, 1])
+
+    def test_scan_reused_within_max_age(self):
+        self.cache.names()
+        self.live[3] = 'c.exe'
+        self.assertEqual(self.cache.names(), {'a.exe', 'b.exe'})
+        # A pid the scan hasn't seen yet is looked up on its own
+        self.assertEqual(self.cache.name(3), 'c.exe')
+        self.assertEqual([info.pid for info in self.cache.find('C.EXE')], [3])
+
+    def test_reused_pid_is_not_handed_out(self):
+        info = ProcessCache().get(os.getpid())
+        self.assertEqual(ProcessCache().process(info).pid, os.getpid())
+
+        # An entry cached for an earlier process that had the same pid
+        stale = info._replace(create_time=info.create_time - 1)
+        cache = ProcessCache(pids=lambda: [stale.pid], lookup=lambda pid: stale)
+        with self.assertRaises(psutil.NoSuchProcess):
+            cache.process(cache.get(stale.pid))
+        self.assertEqual(cache.processes(), [])  # dropped until it is looked up again
+
+class TestLinuxSystemCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.proc = os.path.join(self.root, 'proc')
+        self.power = os.path.join(self.root, 'power_supply')
+        os.makedirs(os.path.join(self.power, 'BAT0'))
+        os.makedirs(os.path.join(self.power, 'AC'))
+        os.makedirs(self.proc)
+        self._write('power_supply/BAT0/type', 'Battery\n')
+        self._write('power_supply/BAT0/capacity', '80\n')
+        self._write('power_supply/AC/type', 'Mains\n')
+        self._write('proc/meminfo', 'MemTotal:  1000 kB\nMemFree:  100 kB\nMemAvailable:  250 kB\n')
+        self._write_stat([(100, 0, 100, 800, 0), (50, 0, 50, 400, 0), (50, 0, 50, 400, 0)])
+        self.collector = LinuxSystemCollector(self.proc, self.power)
+
+    def tearDown(self):
+        self.collector.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, path, text):
+        with open(os.path.join(self.root, path), 'w') as f:
+            f.write(text)
+
+    def _write_stat(self, cpus):
+        lines = []
+        for i, (user, nice, system, idle, iowait) in enumerate(cpus):
+            name = 'cpu ' if i == 0 else f'cpu{i - 1}'
+            lines.append(f'{name} {user} {nice} {system} {idle} {iowait} 0 0 0 0 0')
+        lines.append('intr 12345 0 0')
+        self._write('proc/stat', '\n'.join(lines) + '\n')
+
+    def test_cpu_usage_from_deltas(self):
+        # cpu0 busy for 50 of 100 ticks, cpu1 idle for all 100
+        self._write_stat([(150, 0, 150, 900, 0), (100, 0, 100, 400, 0), (50, 0, 50, 500, 0)])
+        data = self.collector.collect()
+        self.assertEqual(data['system_cpu_usage'], 50.0)
+        self.assertEqual(data['system_cpu_per_core'], [100.0, 0.0])
+        # No ticks elapsed since the last sample
+        self.assertEqual(self.collector.collect()['system_cpu_usage'], 0.0)
+
+    def test_memory_and_battery(self):
+        data = self.collector.collect()
+        self.assertEqual(data['system_memory_usage'], 75.0)
+        self.assertEqual(data['system_battery'], 80.0)
+        self._write('power_supply/BAT0/capacity', '79\n')
+        self.assertEqual(self.collector.collect()['system_battery'], 79.0)
+        self.assertEqual(data['system_active_processes'], [])
+
+    def test_reads_real_proc(self):
+        if not os.path.exists('/proc/stat'):
+            self.skipTest("no procfs")
+        collector = LinuxSystemCollector()
+        data = collector.collect()
+        collector.close()
+        self.assertGreaterEqual(data['system_cpu_usage'], 0)
+        self.assertTrue(data['system_cpu_per_core'])
+        self.assertTrue(0 < data['system_memory_usage'] < 100)
+
+class TestCalendarCollector(unittest.TestCase):
+
+    def setUp(self):
+        now = datetime.datetime.now()
+        self.current = {'subject': 'Standup', 'start': now - datetime.timedelta(minutes=5),
+                        'end': now + datetime.timedelta(minutes=10), 'location': 'Room 1'}
+        self.upcoming = {'subject': 'Review', 'start': now + datetime.timedelta(minutes=30, seconds=30),
+                         'end': now + datetime.timedelta(minutes=60), 'location': ''}
+        self.source = FakeCalendarSource([self.current, self.upcoming])
+        self.collector = CalendarCollector(source=self.source)
+
+    def test_served_from_cache(self):
+        for _ in range(3):
+            data = self.collector.collect()
+        self.assertEqual(self.source.queries, 1)
+        self.assertTrue(data['calendar_has_current_meeting'])
+        self.assertEqual([e['subject'] for e in data['calendar_upcoming_meetings']], ['Review'])
+        self.assertEqual(data['calendar_next_meeting_in_minutes'], 30)
+
+    def test_incomplete_source_rejected(self):
+        with self.assertRaises(TypeError):
+            type('NoEvents', (CalendarSource,), {})()
+
+    def test_change_notification_refreshes(self):
+        self.collector.collect()
+        self.source.set_events([self.upcoming])
+        data = self.collector.collect()
+        self.assertEqual(self.source.queries, 2)
+        self.assertFalse(data['calendar_has_current_meeting'])
+
+    def test_ttl_refreshes(self):
+        self.collector.refresh_ttl = 0
+        self.collector.collect()
+        self.collector.collect()
+        self.assertEqual(self.source.queries, 2)
+
+    def test_window_covers_later_days(self):
+        tomorrow = self.current['start'] + datetime.timedelta(days=1)
+        self.source.set_events([self.current, {'subject': 'Tomorrow', 'start': tomorrow,
+                                               'end': tomorrow, 'location': ''}])
+        data = self.collector.collect()
+        # Indexed, but not reported as one of today's meetings
+        self.assertEqual(len(self.collector._index), 2)
+        self.assertEqual(data['calendar_upcoming_meetings'], [])
+        self.assertIsNone(data['calendar_next_meeting_in_minutes'])
+
+    def test_benchmark_makes_no_queries_when_warm(self):
+        result = benchmark_calendar_collector(events=20, repeats=10)
+        self.assertEqual(result['queries'], 0)
+
+class TestEventIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        base = datetime.datetime(2024, 1, 1)
+        self.events = []
+        for i in range(300):
+            start = base + datetime.timedelta(minutes=rng.randrange(0, 7 * 24 * 60))
+            length = datetime.timedelta(minutes=rng.choice([15, 30, 60, 480, 2000]))
+            self.events.append({'subject': str(i), 'start': start, 'end': start + length})
+        self.index = EventIndex(self.events)
+        self.probes = [base + datetime.timedelta(minutes=m) for m in range(-60, 8 * 24 * 60, 97)]
+
+    def test_overlapping_matches_scan(self):
+        for t in self.probes:
+            expected = sorted((e for e in self.events if e['start'] <= t <= e['end']),
+                              key=lambda e: e['start'])
+            self.assertEqual([e['subject'] for e in self.index.overlapping(t)],
+                             [e['subject'] for e in expected])
+
+    def test_next_start_and_range(self):
+        for t in self.probes:
+            later = [e for e in self.events if e['start'] > t]
+            expected = min(later, key=lambda e: e['start'])['start'] if later else None
+            found = self.index.next_start(t)
+            self.assertEqual(found['start'] if found else None, expected)
+        t = self.probes[10]
+        end = t + datetime.timedelta(hours=6)
+        self.assertEqual(len(self.index.starting_between(t, end)),
+                         sum(1 for e in self.events if t < e['start'] < end))
+
+    def test_empty(self):
+        index = EventIndex()
+        self.assertEqual(index.overlapping(datetime.datetime.now()), [])
+        self.assertIsNone(index.next_start(datetime.datetime.now()))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,234 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.core.actuation import ActuationLayer
+from src.core.environment_manager import STORAGE_MAINTENANCE, EnvironmentManager
+from src.core.scheduler import TimerWheel
+
+class StaticCollector:
+    def __init__(self, data, delay=0.0):
+        self.data = data
+        self.delay = delay
+        self.calls = 0
+
+    def collect(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return dict(self.data)
+
+class RecordingAdapter:
+    def __init__(self, settings, succeed=True):
+        self.settings = settings
+        self.succeed = succeed
+        self.calls = []
+
+    def supported_settings(self):
+        return self.settings
+
+    def apply_settings(self, settings):
+        self.calls.append(settings)
+        return self.succeed
+
+class RecordingStorage:
+    def __init__(self):
+        self.saved = []
+        self.flushes = 0
+        self.retention_runs = 0
+
+    def save_environment_data(self, timestamp, data):
+        self.saved.append((timestamp, data))
+
+    def flush(self):
+        self.flushes += 1
+
+    def apply_retention(self):
+        self.retention_runs += 1
+
+class ClosingEngine:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestCollectorFanOut(unittest.TestCase):
+
+    def setUp(self):
+        self.fast = StaticCollector({'time_hour': 9})
+        self.slow = StaticCollector({'system_cpu_usage': 10})
+        self.manager = EnvironmentManager([self.fast, self.slow], None, [],
+                                          collector_timeout=0.2)
+        self.manager.executor = ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.manager.executor.shutdown(wait=True)
+
+    def test_collectors_merged(self):
+        data = self.manager._collect_data()
+        self.assertEqual(data, {'time_hour': 9, 'system_cpu_usage': 10})
+
+    def test_slow_collector_served_from_last_result(self):
+        self.manager._collect_data()
+
+        self.slow.delay = 1.0
+        self.slow.data = {'system_cpu_usage': 99}
+        start = time.monotonic()
+        data = self.manager._collect_data()
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(data['system_cpu_usage'], 10)
+
+    def test_stuck_collector_not_resubmitted(self):
+        self.slow.delay = 0.5
+        self.manager._collect_data()
+        self.manager._collect_data()
+        self.assertEqual(self.slow.calls, 1)
+
+    def test_per_collector_deadline(self):
+        self.manager.collector_timeouts = {'StaticCollector': 1.5}
+        self.assertEqual(self.manager.collector_deadline(self.slow), 1.5)
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_jobs_due_on_their_tick(self):
+        wheel = TimerWheel(tick=1.0, slots=4)
+        wheel.schedule('fast', 1)
+        wheel.schedule('slow', 6)
+
+        due = [wheel.advance() for _ in range(6)]
+
+        self.assertEqual(due[0], ['fast'])
+        self.assertEqual(due[5], ['slow'])
+        self.assertEqual(sum(len(d) for d in due), 2)
+
+    def test_reschedule_replaces_entry(self):
+        wheel = TimerWheel(tick=1.0, slots=8)
+        wheel.schedule('job', 2)
+        wheel.schedule('job', 3)
+        wheel.cancel('other')
+
+        due = [wheel.advance() for _ in range(3)]
+
+        self.assertEqual(due, [[], [], ['job']])
+        self.assertEqual(len(wheel), 0)
+
+class TestCollectorScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.fast = StaticCollector({'time_hour': 9})
+        self.fast.interval = 1
+        self.slow = StaticCollector({'calendar_has_current_meeting': False})
+        self.slow.interval = 3
+        self.manager = EnvironmentManager([self.fast, self.slow], None, [])
+        self.manager.executor = ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.manager.executor.shutdown(wait=True)
+
+    def test_interval_and_ttl_overrides(self):
+        self.manager.collector_intervals = {'StaticCollector': 10}
+        self.assertEqual(self.manager.collector_interval(self.slow), 10)
+        self.assertEqual(self.manager.collector_ttl(self.slow), 10)
+        self.manager.collector_ttls = {'StaticCollector': 20}
+        self.assertEqual(self.manager.collector_ttl(self.slow), 20)
+
+    def test_adjustment_frequency_scales_intervals(self):
+        self.manager.collector_intervals = {'StaticCollector': 10}
+        self.manager.adjustment_frequency = 30
+        self.assertEqual(self.manager.collector_interval(self.slow), 5)
+        self.assertEqual(self.manager.collector_ttl(self.slow), 5)
+
+        # Collectors are moved to their new intervals on the next tick
+        self.manager.scheduler.schedule(self.slow, 60)
+        due = [self.manager._due_collectors() for _ in range(5)]
+        self.assertIn(self.slow, due[-1])
+
+    def test_only_stale_collectors_rerun(self):
+        self.manager._collect_data()
+        for collector in (self.fast, self.slow):
+            self.manager.scheduler.schedule(collector, collector.interval)
+
+        # Pretend the cached results are older than the fast collector's TTL
+        for collector in self.manager._result_times:
+            self.manager._result_times[collector] -= 1.5
+
+        due = self.manager._due_collectors()
+        self.assertEqual(due, [self.fast])
+
+        data = self.manager._collect_data(due)
+        self.assertEqual(self.fast.calls, 2)
+        self.assertEqual(self.slow.calls, 1)
+        self.assertIn('calendar_has_current_meeting', data)
+
+class TestActuationLayer(unittest.TestCase):
+
+    def setUp(self):
+        self.lighting = RecordingAdapter(['lighting_brightness', 'lighting_mode'])
+        self.sound = RecordingAdapter(['sound_volume'])
+        self.actuator = ActuationLayer([self.lighting, self.sound])
+
+    def test_first_apply_pushes_everything(self):
+        self.actuator.apply({'lighting_brightness': 70, 'lighting_mode': 'auto', 'sound_volume': 40})
+        self.assertEqual(self.lighting.calls, [{'lighting_brightness': 70, 'lighting_mode': 'auto'}])
+        self.assertEqual(self.sound.calls, [{'sound_volume': 40}])
+
+    def test_unchanged_settings_skipped(self):
+        settings = {'lighting_brightness': 70, 'lighting_mode': 'auto', 'sound_volume': 40}
+        self.actuator.apply(settings)
+        applied = self.actuator.apply({'lighting_brightness': 71, 'lighting_mode': 'auto', 'sound_volume': 45})
+
+        self.assertEqual(applied, {'RecordingAdapter': {'sound_volume': 45}})
+        self.assertEqual(len(self.lighting.calls), 1)
+        self.assertEqual(self.sound.calls[-1], {'sound_volume': 45})
+
+    def test_only_changed_keys_sent(self):
+        self.actuator.apply({'lighting_brightness': 70, 'lighting_mode': 'auto'})
+        self.actuator.apply({'lighting_brightness': 70, 'lighting_mode': 'manual'})
+        self.assertEqual(self.lighting.calls[-1], {'lighting_mode': 'manual'})
+
+    def test_failed_apply_is_retried(self):
+        self.sound.succeed = False
+        self.actuator.apply({'sound_volume': 40})
+        self.actuator.apply({'sound_volume': 40})
+        self.assertEqual(len(self.sound.calls), 2)
+
+    def test_force_pushes_unchanged(self):
+        self.actuator.apply({'sound_volume': 40})
+        self.actuator.apply({'sound_volume': 40}, force=True)
+        self.assertEqual(len(self.sound.calls), 2)
+
+class TestSnapshotRecording(unittest.TestCase):
+
+    def test_snapshot_recorded_and_flushed_on_stop(self):
+        storage = RecordingStorage()
+        manager = EnvironmentManager([], None, [], storage=storage)
+        manager._record_snapshot({'time_hour': 9}, {'sound_volume': 40})
+        manager.stop()
+
+        record = storage.saved[0][1]
+        self.assertEqual(record['time_hour'], 9)
+        self.assertEqual(record['recommendations'], {'sound_volume': 40})
+        self.assertEqual(storage.flushes, 1)
+
+    def test_stop_closes_preference_engine(self):
+        engine = ClosingEngine()
+        manager = EnvironmentManager([], engine, [])
+        manager.stop()
+        self.assertTrue(engine.closed)
+
+    def test_maintenance_runs_on_schedule(self):
+        storage = RecordingStorage()
+        manager = EnvironmentManager([], None, [], storage=storage, maintenance_interval=2)
+        manager.executor = ThreadPoolExecutor(max_workers=1)
+        manager.scheduler.schedule(STORAGE_MAINTENANCE, 1)
+        for _ in range(5):
+            manager._due_collectors()
+            if manager._maintenance:
+                manager._maintenance.result()
+        manager.executor.shutdown(wait=True)
+        # Due on ticks 1, 3 and 5
+        self.assertEqual(storage.retention_runs, 3)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from src.adapters.bulbs import BulbError, BulbPool
+from src.adapters.devices import DeviceRegistry, discover_yeelight
+from src.adapters.lighting import LightingAdapter
+
+class TestDeviceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'devices.json')
+        self.calls = []
+        self.bulbs = [{'id': '0x1', 'address': '10.0.0.5', 'port': 55443, 'model': 'color'}]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _registry(self, **kwargs):
+        def yeelight():
+            self.calls.append('yeelight')
+            return self.bulbs
+        return DeviceRegistry(self.path, discoverers={'yeelight': yeelight}, **kwargs)
+
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_background_discovery_and_cache(self):
+        registry = self._registry(refresh_interval=None)
+        self.assertEqual(registry.devices(), [])
+        registry.start()
+        self._wait_for(lambda: registry.devices())
+        registry.stop()
+        self.assertEqual(registry.devices('yeelight')[0]['address'], '10.0.0.5')
+
+        # A fresh cache is used as is, without discovering again
+        restarted = self._registry(refresh_interval=None)
+        restarted.start()
+        restarted.stop()
+        self.assertEqual(self.calls, ['yeelight'])
+        self.assertEqual(restarted.kinds(), ['yeelight'])
+
+    def test_stale_cache_is_rediscovered(self):
+        self._registry().update('yeelight', [])
+        registry = self._registry(ttl=0, refresh_interval=None)
+        registry.start()
+        self._wait_for(lambda: registry.devices())
+        registry.stop()
+        self.assertEqual(len(registry.devices()), 1)
+
+    def test_failed_discovery_keeps_devices(self):
+        registry = self._registry()
+        registry.update('yeelight', self.bulbs)
+        registry.discoverers['yeelight'] = lambda: 1 / 0
+        registry.refresh()
+        self.assertEqual(len(registry.devices()), 1)
+
+    def test_empty_scans_do_not_erase_devices(self):
+        registry = self._registry(max_misses=3)
+        registry.refresh()
+        changes = []
+        registry.on_change(changes.append)
+        self.bulbs = []  # replies lost
+        for _ in range(2):
+            registry.refresh()
+            self.assertEqual(len(self._registry().devices()), 1)
+        self.assertEqual(changes, [])
+
+        # Seen again: the misses start over
+        self.bulbs = [{'id': '0x1', 'address': '10.0.0.5', 'port': 55443, 'model': 'color'}]
+        registry.refresh()
+        self.bulbs = []
+        for _ in range(3):
+            registry.refresh()
+        self.assertEqual(registry.devices(), [])
+        self.assertEqual(changes, ['yeelight'])
+
+    def test_unseen_devices_expire_after_ttl(self):
+        registry = self._registry(ttl=0)
+        registry.update('yeelight', self.bulbs)
+        self.bulbs = [{'id': '0x2', 'address': '10.0.0.6', 'port': 55443}]
+        registry.refresh()
+        self.assertEqual([d['id'] for d in registry.devices()], ['0x2'])
+
+    def test_adapter_uses_registry_only(self):
+        registry = self._registry(refresh_interval=None)
+        registry.update('yeelight', self.bulbs)
+        registry.start = lambda: None  # no discovery at all
+        adapter = LightingAdapter(registry)
+        self.assertEqual(adapter.available_systems, ['yeelight', 'windows'])
+
+class TestYeelightDiscovery(unittest.TestCase):
+
+    def test_collects_every_reply(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+
+        def respond():
+            _, client = server.recvfrom(1024)
+            for i in (1, 2, 2):
+                server.sendto(('HTTP/1.1 200 OK\r\n'
+                               f'Location: yeelight://127.0.0.{i}:55443\r\n'
+                               f'id: 0x{i}\r\nmodel: mono\r\n\r\n').encode(), client)
+
+        thread = threading.Thread(target=respond)
+        thread.start()
+        devices = discover_yeelight(timeout=0.3, address=server.getsockname())
+        thread.join()
+        server.close()
+        self.assertEqual(sorted(d['address'] for d in devices), ['127.0.0.1', '127.0.0.2'])
+        self.assertEqual(devices[0]['port'], 55443)
+
+class FakeBulb:
+    """Local TCP server speaking the Yeelight command protocol."""
+
+    def __init__(self, delay=0.0, power='on'):
+        self.delay = delay
+        self.power = power
+        self.commands = []
+        self.connects = 0
+        self.connections = []
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen()
+        self.device = {'id': f'bulb-{self.server.getsockname()[1]}', 'address': '127.0.0.1',
+                       'port': self.server.getsockname()[1]}
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    @property
+    def scenes(self):
+        return [params for method, params in self.commands if method == 'set_scene']
+
+    def switch(self, power):
+        """Change the power state from outside, like the Yeelight app."""
+        self.power = power
+        for conn in self.connections:
+            conn.sendall(json.dumps({'method': 'props', 'params': {'power': power}}).encode() + b'\r\n')
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connects += 1
+            self.connections.append(conn)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                request = json.loads(line)
+                method, params = request['method'], request['params']
+                self.commands.append((method, params))
+                time.sleep(self.delay)
+                if method == 'get_prop':
+                    reply = {'id': request['id'], 'result': [self.power]}
+                elif method == 'set_scene':
+                    self.power = 'on'
+                    # Real bulbs push a notification before the reply
+                    conn.sendall(json.dumps({'method': 'props', 'params': {
+                        'power': 'on', 'bright': params[2]}}).encode() + b'\r\n')
+                    reply = {'id': request['id'], 'result': ['ok']}
+                else:
+                    reply = {'id': request['id'], 'error': {'code': -1, 'message': 'unsupported'}}
+                conn.sendall(json.dumps(reply).encode() + b'\r\n')
+
+    def close(self):
+        self.server.close()
+
+class TestBulbPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = BulbPool(timeout=1.0)
+        self.bulbs = []
+
+    def tearDown(self):
+        self.pool.close()
+        for bulb in self.bulbs:
+            bulb.close()
+
+    def _bulbs(self, count, delay=0.0):
+        self.bulbs = [FakeBulb(delay) for _ in range(count)]
+        return [bulb.device for bulb in self.bulbs]
+
+    def test_one_combined_command_per_bulb(self):
+        devices = self._bulbs(3)
+        results = self.pool.apply(devices, 75, 4000)
+        self.assertEqual(list(results.values()), [['ok']] * 3)
+        for bulb in self.bulbs:
+            self.assertEqual(bulb.commands, [('get_prop', ['power']), ('set_scene', ['ct', 4000, 75])])
+
+    def test_connections_are_reused(self):
+        devices = self._bulbs(2)
+        for brightness in (10, 20, 30):
+            self.pool.apply(devices, brightness, 9000)
+        self.assertEqual([bulb.connects for bulb in self.bulbs], [1, 1])
+        self.assertEqual(self.bulbs[0].commands[-1], ('set_scene', ['ct', 6500, 30]))
+        # The power state is asked for once per connection, then followed from notifications
+        self.assertEqual(len(self.bulbs[0].commands), 4)
+
+    def test_bulbs_that_are_off_stay_off(self):
+        devices = self._bulbs(2)
+        self.bulbs[1].power = 'off'
+        results = self.pool.apply(devices, 50, 3000)
+        self.assertEqual(list(results), [devices[0]['id']])
+        self.assertEqual(self.bulbs[1].scenes, [])
+        self.assertEqual(self.bulbs[1].power, 'off')
+
+        # Switched off from elsewhere while connected: known without asking again
+        self.bulbs[0].switch('off')
+        self.bulbs[1].switch('on')
+        time.sleep(0.1)
+        self.assertEqual(list(self.pool.apply(devices, 60, 3000)), [devices[1]['id']])
+        self.assertEqual(self.bulbs[0].scenes, [['ct', 3000, 50]])
+        self.assertEqual(self.bulbs[1].scenes, [['ct', 3000, 60]])
+        self.assertEqual([len(bulb.commands) for bulb in self.bulbs], [2, 2])
+
+    def test_bulbs_are_commanded_concurrently(self):
+        devices = self._bulbs(5, delay=0.2)
+        start = time.monotonic()
+        self.pool.apply(devices, 50, 3000)
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_reconnects_after_dropped_connection(self):
+        devices = self._bulbs(1)
+        self.pool.apply(devices, 50, 3000)
+        self.pool.connection(devices[0])._sock.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(self.pool.apply(devices, 60, 3000), {devices[0]['id']: ['ok']})
+        self.assertEqual(self.bulbs[0].connects, 2)
+
+    def test_errors_are_returned_per_bulb(self):
+        devices = self._bulbs(1)
+        unreachable = {'id': 'gone', 'address': '127.0.0.1', 'port': 1}
+        results = self.pool.send_all(devices + [unreachable], 'bad', [])
+        self.assertIsInstance(results[devices[0]['id']], BulbError)
+        self.assertIsInstance(results['gone'], BulbError)
+
+    def test_retain_drops_removed_bulbs(self):
+        devices = self._bulbs(2)
+        self.pool.apply(devices, 50, 3000)
+        self.pool.retain(devices[:1])
+        self.pool.apply(devices, 50, 3000)
+        self.assertEqual([bulb.connects for bulb in self.bulbs], [1, 2])
+
+    def test_adapter_applies_through_pool(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        registry = DeviceRegistry(os.path.join(tmpdir, 'devices.json'), discoverers={})
+        registry.update('yeelight', self._bulbs(2))
+        adapter = LightingAdapter(registry, bulb_pool=self.pool)
+        self.addCleanup(registry.stop)
+        adapter._apply_windows_settings = lambda: False
+        self.assertTrue(adapter.apply_settings({'lighting_brightness': 40, 'lighting_color_temp': 2700}))
+        for bulb in self.bulbs:
+            self.assertEqual(bulb.scenes, [['ct', 2700, 40]])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+import unittest
+from src import main
+
+class TestEntryPoint(unittest.TestCase):
+
+    def test_parse_args(self):
+        args = main.parse_args(['--benchmark', 'processors'])
+        self.assertEqual(args.benchmark, 'processors')
+        self.assertFalse(args.analyze_history)
+
+    def test_importable_as_script(self):
+        # python src/main.py puts src/ first on the path and imports main at top level
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+        result = subprocess.run([sys.executable, '-c', 'import main; main.parse_args([])'],
+                                cwd=src, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+import unittest
+from datetime import datetime
+import pandas as pd
+from src.core.preference_engine import PreferenceEngine
+from src.ml.cache import PredictionCache
+from src.ml.features import FeatureSchema
+from src.ml.models import UserPreferenceModel
+
+class CountingModel:
+    def __init__(self):
+        self.schema = FeatureSchema()
+        self.predictions = 0
+        self.rows = []
+
+    def predict_row(self, row):
+        self.predictions += 1
+        self.rows.append(row.copy())
+        return [[60, 40, 21, 1, 0]]
+
+    predict = predict_row
+
+class FakeStorage:
+    def __init__(self):
+        self.feedback = []
+
+    def count_new_data(self, since, limit=None):
+        return 0
+
+    def store_feedback(self, data):
+        self.feedback.append(data)
+
+class TestPredictionCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(maxsize=2, ttl=None)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        cache = PredictionCache(maxsize=2, ttl=0)
+        cache.put('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+class TestRecommendationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.model = CountingModel()
+        self.engine = PreferenceEngine(FakeStorage(), model=self.model)
+        self.engine.last_training_time = datetime.now()
+
+    def test_similar_features_hit_cache(self):
+        first = self.engine.get_recommendations({'time_hour': 9, 'time_minute': 1, 'system_cpu_usage': 12})
+        second = self.engine.get_recommendations({'time_hour': 9, 'time_minute': 7, 'system_cpu_usage': 17})
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.model.predictions, 1)
+        self.assertEqual(self.engine.get_cache_stats()['hits'], 1)
+
+    def test_different_bucket_misses(self):
+        self.engine.get_recommendations({'time_hour': 9, 'system_cpu_usage': 12})
+        self.engine.get_recommendations({'time_hour': 9, 'system_cpu_usage': 55})
+        self.assertEqual(self.model.predictions, 2)
+
+    def test_returned_dict_is_a_copy(self):
+        first = self.engine.get_recommendations({'time_hour': 9})
+        first['sound_volume'] = 0
+        second = self.engine.get_recommendations({'time_hour': 9})
+        self.assertEqual(second['sound_volume'], 40)
+
+    def test_new_model_invalidates_cache(self):
+        self.engine.get_recommendations({'time_hour': 9})
+        self.engine.model_version += 1
+        self.engine.get_recommendations({'time_hour': 9})
+        self.assertEqual(self.model.predictions, 2)
+
+class TestFeatureSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = FeatureSchema()
+
+    def test_missing_values_use_defaults(self):
+        row = self.schema.fill({'time_hour': 9, 'calendar_next_meeting_in_minutes': None},
+                               self.schema.new_row())
+        values = dict(zip(self.schema.columns, row))
+        self.assertEqual(values['time_hour'], 9)
+        self.assertEqual(values['system_battery'], 100)
+        self.assertEqual(values['calendar_next_meeting_in_minutes'], 1440)
+
+    def test_fill_reuses_buffer(self):
+        row = self.schema.new_row()
+        self.assertIs(self.schema.fill({'time_hour': 1}, row), row)
+
+    def test_matrix_from_dicts_and_frame_match(self):
+        records = [{'time_hour': 9, 'system_cpu_usage': 20}, {'calendar_has_current_meeting': True}]
+        from_dicts = self.schema.to_matrix(records)
+        from_frame = self.schema.to_matrix(pd.DataFrame(records))
+        self.assertEqual(from_dicts.shape, (2, self.schema.width))
+        self.assertTrue((from_dicts == from_frame).all())
+
+    def test_round_trip(self):
+        self.assertEqual(FeatureSchema.from_dict(self.schema.to_dict()), self.schema)
+
+class TestFixedSchemaInference(unittest.TestCase):
+
+    def test_trained_model_predicts_from_partial_data(self):
+        model = UserPreferenceModel()
+        features = [{'time_hour': h, 'system_cpu_usage': h * 3} for h in range(24)]
+        targets = [[50 + h, 40, 22, 0, 0] for h in range(24)]
+        model.train(features, targets)
+
+        # Calendar and system collectors failed: the row still has every column
+        row = model.schema.fill({'time_hour': 10}, model.schema.new_row())
+        self.assertEqual(model.predict_row(row).shape, (1, 5))
+
+        engine = PreferenceEngine(FakeStorage(), model=model)
+        engine.last_training_time = datetime.now()
+        recommendations = engine.get_recommendations({'time_hour': 10})
+        self.assertTrue(50 <= recommendations['lighting_brightness'] <= 73)
+
+class TestIncrementalLearning(unittest.TestCase):
+
+    def setUp(self):
+        self.storage = FakeStorage()
+        self.engine = PreferenceEngine(self.storage, background_training=False,
+                                       model_backend='online_ridge', learning_mode='incremental')
+        # Skip the bootstrap from stored history
+        self.engine.last_training_attempt = datetime.now()
+
+    def test_feedback_updates_model_without_retraining(self):
+        for hour in (8, 20):
+            self.engine.get_recommendations({'time_hour': hour})
+            brightness = 80 if hour == 8 else 30
+            self.engine.record_feedback({'lighting_brightness': brightness, 'sound_volume': 40,
+                                         'app_arrangement': 'focused'}, 90)
+
+        morning = self.engine.get_recommendations({'time_hour': 8})
+        evening = self.engine.get_recommendations({'time_hour': 20})
+
+        self.assertEqual(len(self.storage.feedback), 2)
+        self.assertEqual(self.engine.model.model.n_samples_seen_, 1.8)
+        self.assertGreater(morning['lighting_brightness'], evening['lighting_brightness'])
+        self.assertEqual(morning['app_arrangement'], 'focused')
+        self.assertIsNone(self.engine.last_training_time)
+
+    def test_zero_satisfaction_ignored(self):
+        self.engine.get_recommendations({'time_hour': 8})
+        self.engine.record_feedback({'lighting_brightness': 10}, 0)
+        self.assertEqual(self.engine.model.model.n_samples_seen_, 0)
+
+    def test_batch_backend_falls_back_to_batch_mode(self):
+        engine = PreferenceEngine(self.storage, background_training=False,
+                                  model_backend='ridge', learning_mode='incremental')
+        self.assertEqual(engine.learning_mode, 'batch')
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
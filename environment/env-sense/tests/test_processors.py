@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta
+import pandas as pd
+from src.data.insights import RunningInsights
+from src.data.processors import analyze_data, benchmark_processors, process_user_data
+
+class TestProcessUserData(unittest.TestCase):
+
+    def setUp(self):
+        start = datetime(2024, 1, 1, 8)  # a Monday
+        self.data = [{'timestamp': (start + timedelta(hours=h)).isoformat(), 'activity_level': h}
+                     for h in (0, 1, 1, 2, 25)]
+
+    def test_matches_row_by_row_definition(self):
+        insights = process_user_data(self.data)
+        self.assertEqual(insights['average_activity'], 5.8)
+        self.assertEqual(insights['most_active_hour'], 9)
+        self.assertEqual(insights['sample_count'], 5)
+
+    def test_histograms(self):
+        insights = process_user_data(self.data)
+        # 09:00 twice on Monday and once on Tuesday
+        self.assertEqual(insights['hourly_histogram'][9], 3)
+        self.assertEqual(sum(insights['hourly_histogram']), 5)
+        self.assertEqual(insights['weekday_histogram'][:2], [4, 1])
+        self.assertEqual(insights['hourly_activity'][9], 9.0)
+        self.assertIsNone(insights['hourly_activity'][0])
+
+    def test_columns_and_frames_accepted(self):
+        frame = pd.DataFrame(self.data)
+        self.assertEqual(process_user_data(frame), process_user_data(self.data))
+        self.assertEqual(process_user_data(frame.to_dict('list')), process_user_data(self.data))
+
+    def test_missing_and_bad_values_skipped(self):
+        with self.assertLogs('DataProcessor', level='WARNING'):
+            insights = process_user_data([{'activity_level': 4}, {'timestamp': 'not a time'}, {}])
+        self.assertEqual(insights['average_activity'], 4)
+        self.assertIsNone(insights['most_active_hour'])
+
+    def test_whole_second_timestamps_kept(self):
+        # isoformat() drops the fraction when microseconds are zero
+        data = [{'timestamp': datetime(2024, 1, 1, 9, 0, 0, 500).isoformat()},
+                {'timestamp': datetime(2024, 1, 1, 10).isoformat()},
+                {'timestamp': datetime(2024, 1, 1, 11, 0, 1).isoformat()}]
+        insights = process_user_data(data)
+        self.assertEqual(sum(insights['hourly_histogram']), 3)
+        self.assertEqual(RunningInsights.from_batch(data).hourly_counts, insights['hourly_histogram'])
+
+    def test_empty_data(self):
+        result = analyze_data([])
+        self.assertEqual(result['insights']['average_activity'], 0)
+        self.assertEqual(result['adjustments'], {'lighting': 'dim', 'sound': 'calm'})
+
+    def test_benchmark_reports_each_size(self):
+        results = benchmark_processors(sizes=(100, 1000), repeats=1)
+        self.assertEqual([r['rows'] for r in results], [100, 1000])
+
+class TestRunningInsights(unittest.TestCase):
+
+    def setUp(self):
+        start = datetime(2024, 1, 1, 8)
+        self.data = [{'timestamp': (start + timedelta(hours=h)).isoformat(), 'activity_level': h}
+                     for h in (0, 1, 1, 2, 25, 30)]
+        self.data.append({'timestamp': 'not a time', 'activity_level': 'high'})
+
+    def _running(self, data):
+        insights = RunningInsights()
+        for sample in data:
+            insights.update(sample)
+        return insights
+
+    def test_matches_batch_processing(self):
+        running = self._running(self.data).insights()
+        batch = process_user_data(self.data)
+        for key, value in batch.items():
+            if key == 'average_activity':
+                self.assertAlmostEqual(running[key], value)
+            elif key == 'hourly_activity':
+                for r, b in zip(running[key], value):
+                    self.assertEqual(r is None, b is None)
+                    if b is not None:
+                        self.assertAlmostEqual(r, b)
+            else:
+                self.assertEqual(running[key], value)
+
+    def test_merge_equals_single_pass(self):
+        whole = self._running(self.data)
+        merged = self._running(self.data[:3]).merge(self._running(self.data[3:]))
+        self.assertEqual(merged.sample_count, whole.sample_count)
+        self.assertEqual(merged.hourly_counts, whole.hourly_counts)
+        self.assertAlmostEqual(merged.mean('activity_level'), whole.mean('activity_level'))
+        self.assertAlmostEqual(merged.variance('activity_level'), whole.variance('activity_level'))
+        self.assertAlmostEqual(whole.variance('activity_level'), pd.Series([0, 1, 1, 2, 25, 30]).var())
+
+    def test_batch_equals_updates(self):
+        batch = RunningInsights.from_batch(self.data)
+        running = self._running(self.data)
+        self.assertEqual(batch.hourly_counts, running.hourly_counts)
+        self.assertEqual(batch.weekday_counts, running.weekday_counts)
+        self.assertEqual(batch.hourly_activity_counts, running.hourly_activity_counts)
+        for b, r in zip(batch.moments['activity_level'], running.moments['activity_level']):
+            self.assertAlmostEqual(b, r)
+
+    def test_round_trip_and_analyze(self):
+        running = self._running(self.data)
+        restored = RunningInsights.from_dict(running.to_dict())
+        self.assertEqual(restored.insights(), running.insights())
+        self.assertEqual(restored.analyze()['adjustments'], {'lighting': 'bright', 'sound': 'upbeat'})
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
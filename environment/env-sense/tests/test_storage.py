@@ -0,0 +1,585 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+from datetime import datetime, timedelta
+from src.core.preference_engine import PreferenceEngine
+from src.data.analytics import analyze_history, reduce_chunks
+from src.data.buffer import WriteBuffer
+from src.data.connection import ConnectionManager
+from src.data.export import ColumnarDataset
+from src.data.storage import DataStorage
+
+class TestConnectionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'test.db')
+        self.connections = ConnectionManager(self.db_path)
+
+    def tearDown(self):
+        self.connections.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_wal_mode_enabled(self):
+        mode = self.connections.get().execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_connection_reused_within_thread(self):
+        self.assertIs(self.connections.get(), self.connections.get())
+
+    def test_each_thread_gets_its_own_connection(self):
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.connections.get()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], self.connections.get())
+
+    def test_reader_not_blocked_by_open_write(self):
+        with self.connections.transaction() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+        self.connections.get().execute('BEGIN IMMEDIATE')
+        self.connections.get().execute('INSERT INTO t VALUES (1)')
+
+        rows = []
+        thread = threading.Thread(
+            target=lambda: rows.extend(self.connections.get().execute('SELECT * FROM t').fetchall()))
+        thread.start()
+        thread.join(5)
+        self.connections.get().commit()
+
+        # The reader saw the last committed state instead of waiting for the writer
+        self.assertEqual(rows, [])
+
+    def test_failed_transaction_rolled_back(self):
+        with self.connections.transaction() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+        with self.assertRaises(RuntimeError):
+            with self.connections.transaction() as conn:
+                conn.execute('INSERT INTO t VALUES (1)')
+                raise RuntimeError()
+        self.assertEqual(self.connections.get().execute('SELECT COUNT(*) FROM t').fetchone()[0], 0)
+
+class TestWriteBuffer(unittest.TestCase):
+
+    INSERT = 'INSERT INTO t VALUES (?)'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.connections = ConnectionManager(os.path.join(self.tmpdir, 'test.db'))
+        with self.connections.transaction() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+
+    def tearDown(self):
+        self.connections.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def count(self):
+        return self.connections.get().execute('SELECT COUNT(*) FROM t').fetchone()[0]
+
+    def wait_for(self, n, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.count() < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.count()
+
+    def test_rows_held_until_threshold(self):
+        buffer = WriteBuffer(self.connections, max_rows=100, max_delay=60)
+        for i in range(10):
+            buffer.add(self.INSERT, (i,))
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(len(buffer), 10)
+        buffer.close()
+
+    def test_size_threshold_flushes(self):
+        buffer = WriteBuffer(self.connections, max_rows=5, max_delay=60)
+        for i in range(5):
+            buffer.add(self.INSERT, (i,))
+        self.assertEqual(self.wait_for(5), 5)
+        buffer.close()
+
+    def test_time_threshold_flushes(self):
+        buffer = WriteBuffer(self.connections, max_rows=100, max_delay=0.05)
+        buffer.add(self.INSERT, (1,))
+        self.assertEqual(self.wait_for(1), 1)
+        buffer.close()
+
+    def test_close_writes_pending_rows(self):
+        buffer = WriteBuffer(self.connections, max_rows=100, max_delay=60)
+        for i in range(3):
+            buffer.add(self.INSERT, (i,))
+        buffer.close()
+        self.assertEqual(self.count(), 3)
+        with self.assertRaises(RuntimeError):
+            buffer.add(self.INSERT, (4,))
+
+    def test_flush_blocked_by_other_writer_keeps_rows(self):
+        buffer = WriteBuffer(self.connections, max_rows=100, max_delay=60)
+        buffer.add(self.INSERT, (1,))
+        self.connections.get().execute('PRAGMA busy_timeout=10')
+        other = sqlite3.connect(self.connections.db_path)
+        other.execute('BEGIN IMMEDIATE')
+        self.assertFalse(buffer.flush())
+        self.assertEqual(len(buffer), 1)
+
+        other.rollback()
+        other.close()
+        self.assertTrue(buffer.flush())
+        self.assertEqual(self.count(), 1)
+        buffer.close()
+
+    def test_unwritable_rows_dropped(self):
+        with self.connections.transaction() as conn:
+            conn.execute('CREATE TABLE strict (x INTEGER NOT NULL)')
+        buffer = WriteBuffer(self.connections, max_rows=100, max_delay=60)
+        buffer.add('INSERT INTO strict VALUES (?)', (None,))
+        with self.assertLogs('WriteBuffer', 'ERROR'):
+            self.assertFalse(buffer.flush())
+        self.assertEqual(len(buffer), 0)
+
+        # Later rows are not held up behind the failed batch
+        buffer.add(self.INSERT, (1,))
+        self.assertTrue(buffer.flush())
+        self.assertEqual(self.count(), 1)
+        buffer.close()
+
+class TestDataStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = DataStorage(os.path.join(self.tmpdir, 'test.db'))
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_round_trip(self):
+        self.storage.save_environment_data('2024-01-01T09:00:00', '{"time_hour": 9}')
+        self.storage.save_user_preferences('2024-01-01T09:00:00', '{}', 80)
+        self.assertEqual(len(self.storage.get_environment_data()), 1)
+        self.assertEqual(len(self.storage.get_user_preferences()), 1)
+
+    def test_flush_on_close(self):
+        path = self.storage.db_path
+        self.storage.save_environment_data('2024-01-01T09:00:00', '{}')
+        self.storage.close()
+        self.storage = DataStorage(path)
+        self.assertEqual(len(self.storage.get_environment_data()), 1)
+
+    def test_insights_updated_and_persisted(self):
+        path = self.storage.db_path
+        for hour, cpu in ((9, 10.0), (9, 30.0), (14, 20.0)):
+            self.storage.save_environment_data(f'2024-01-01T{hour:02d}:00:00',
+                                               {'system_cpu_usage': cpu})
+        insights = self.storage.get_insights()
+        self.assertEqual(insights['sample_count'], 3)
+        self.assertEqual(insights['most_active_hour'], 9)
+        self.assertAlmostEqual(insights['means']['system_cpu_usage'], 20.0)
+
+        self.storage.close()
+        self.storage = DataStorage(path)
+        self.assertEqual(self.storage.get_insights(), insights)
+        self.storage.save_environment_data('2024-01-02T14:00:00', {'system_cpu_usage': 40.0})
+        self.assertEqual(self.storage.get_insights()['sample_count'], 4)
+
+    def test_insights_only_cover_written_samples(self):
+        self.storage.save_environment_data('2024-01-01T09:00:00', {'system_cpu_usage': 10.0})
+        self.storage.flush()
+        self.storage.connections.get().execute('PRAGMA busy_timeout=10')
+        other = sqlite3.connect(self.storage.db_path)
+        other.execute('BEGIN IMMEDIATE')
+        self.storage.save_environment_data('2024-01-01T10:00:00', {'system_cpu_usage': 30.0})
+        self.assertFalse(self.storage.flush())
+        self.assertEqual(self.storage.insights.sample_count, 1)
+
+        other.rollback()
+        other.close()
+        self.assertEqual(self.storage.get_insights()['sample_count'], 2)
+        self.assertAlmostEqual(self.storage.get_insights()['means']['system_cpu_usage'], 20.0)
+
+    def test_insights_seeded_from_existing_history(self):
+        path = self.storage.db_path
+        for hour in (9, 9, 14):
+            self.storage.save_environment_data(f'2024-01-01T{hour:02d}:00:00',
+                                               {'system_cpu_usage': float(hour),
+                                                'recommendations': {'sound_volume': 40}})
+        expected = self.storage.get_insights()
+        self.storage.close()
+        # A database written before insights were saved
+        with sqlite3.connect(path) as conn:
+            conn.execute('DELETE FROM insights')
+
+        self.storage = DataStorage(path)
+        self.assertEqual(self.storage.get_insights(), expected)
+        self.assertAlmostEqual(expected['means']['sound_volume'], 40.0)
+
+    def test_analyze_history_matches_running_insights(self):
+        start = datetime(2024, 1, 1)
+        for minute in range(0, 600, 7):
+            self.storage.save_environment_data(start + timedelta(minutes=minute),
+                                               {'system_cpu_usage': minute % 97, 'sound_volume': 50})
+        expected = self.storage.get_insights()
+        for workers in (0, 2):
+            result = analyze_history(self.storage, batch_size=16, max_workers=workers)
+            insights = result['insights']
+            self.assertEqual(insights['sample_count'], expected['sample_count'])
+            self.assertEqual(insights['hourly_histogram'], expected['hourly_histogram'])
+            self.assertAlmostEqual(insights['means']['system_cpu_usage'],
+                                   expected['means']['system_cpu_usage'])
+            self.assertAlmostEqual(insights['variances']['system_cpu_usage'],
+                                   expected['variances']['system_cpu_usage'])
+            self.assertIn('adjustments', result)
+
+    def test_reduce_chunks_bounds_pending(self):
+        chunks = ([{'activity_level': i}] for i in range(10))
+        insights = reduce_chunks(chunks, max_workers=2, max_pending=2)
+        self.assertEqual(insights.sample_count, 10)
+        self.assertAlmostEqual(insights.mean('activity_level'), 4.5)
+
+    def test_time_range_query(self):
+        for hour in (8, 9, 10):
+            self.storage.save_environment_data(f'2024-01-01T{hour:02d}:00:00', '{}')
+        rows = self.storage.get_environment_data(start=datetime(2024, 1, 1, 9), end='2024-01-01T10:00:00')
+        self.assertEqual([row['timestamp'] for row in rows], ['2024-01-01T09:00:00'])
+
+    def test_count_new_data_uses_index(self):
+        start = datetime(2024, 1, 1)
+        for minute in range(30):
+            self.storage.store_feedback({'sound_volume': 40, 'satisfaction': 80,
+                                         'timestamp': start + timedelta(minutes=minute)})
+
+        since = start + timedelta(minutes=9, seconds=30)
+        self.assertEqual(self.storage.count_new_data(since), 20)
+        self.assertEqual(self.storage.count_new_data(since, limit=5), 5)
+        self.assertEqual(self.storage.count_new_data(None), 30)
+
+        plan = self.storage.connections.get().execute(
+            'EXPLAIN QUERY PLAN SELECT 1 FROM user_preferences WHERE timestamp > ?',
+            (since.isoformat(),)).fetchall()
+        self.assertIn('idx_user_preferences_timestamp', str(plan))
+
+    def test_feedback_joined_to_preceding_sample(self):
+        self.storage.save_environment_data('2024-01-01T08:00:00', '{"time_hour": 8}')
+        self.storage.save_environment_data('2024-01-01T09:00:00',
+                                           '{"time_hour": 9, "recommendations": {}}')
+        self.storage.save_environment_data('2024-01-01T10:00:00', '{"time_hour": 10}')
+        self.storage.store_feedback({'app_arrangement': 'focused', 'satisfaction': 70,
+                                     'timestamp': datetime(2024, 1, 1, 9, 30)})
+
+        training_data = self.storage.get_training_data()
+        self.assertEqual(len(training_data), 1)
+        self.assertEqual(training_data[0]['features'], {'time_hour': 9})
+        self.assertEqual(training_data[0]['preferences'], {'app_arrangement': 'focused'})
+        self.assertEqual(training_data[0]['satisfaction'], 70)
+
+    def test_engine_trains_from_stored_feedback(self):
+        start = datetime(2024, 1, 1)
+        for i in range(12):
+            timestamp = start + timedelta(hours=i)
+            self.storage.save_environment_data(timestamp.isoformat(), f'{{"time_hour": {i}}}')
+            self.storage.store_feedback({'lighting_brightness': 40 + i, 'app_arrangement': 'relaxed',
+                                         'satisfaction': 80, 'timestamp': timestamp})
+
+        engine = PreferenceEngine(self.storage, background_training=False, model_backend='ridge')
+        self.assertTrue(engine._train_model())
+        self.assertEqual(engine.get_recommendations({'time_hour': 5})['app_arrangement'], 'relaxed')
+
+    def test_engine_trains_from_exported_dataset(self):
+        start = datetime(2024, 1, 1)
+        def add_feedback(hours):
+            for i in hours:
+                timestamp = start + timedelta(hours=i)
+                self.storage.save_environment_data(timestamp, {'time_hour': i})
+                self.storage.store_feedback({'lighting_brightness': 40 + i, 'satisfaction': 80,
+                                             'timestamp': timestamp})
+
+        engine = PreferenceEngine(self.storage, background_training=False, model_backend='ridge',
+                                  dataset_path=os.path.join(self.tmpdir, 'dataset'))
+        add_feedback(range(12))
+        self.assertTrue(engine._train_model())
+        add_feedback(range(12, 20))
+        self.assertTrue(engine._train_model())
+
+        # Only the new feedback was exported the second time
+        self.assertEqual(len(engine.dataset), 20)
+        self.assertEqual(engine.dataset.watermark, 20)
+        np.testing.assert_array_equal(engine.dataset.column('time_hour'), np.arange(20))
+        self.assertAlmostEqual(engine.get_recommendations({'time_hour': 10})['lighting_brightness'],
+                               50, delta=1)
+
+class TestPaginatedReads(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = DataStorage(os.path.join(self.tmpdir, 'test.db'))
+        start = datetime(2024, 1, 1)
+        for i in range(25):
+            # Pairs of samples share a timestamp to exercise the id tie-break
+            self.storage.save_environment_data(start + timedelta(minutes=i // 2),
+                                               {'time_hour': i, 'recommendations': {'sound_volume': i}})
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, after = [], None
+        while True:
+            page = self.storage.get_environment_data(limit=10, after=after)
+            if not page:
+                break
+            seen.extend(row['time_hour'] for row in page)
+            after = (page[-1]['timestamp'], page[-1]['id'])
+        self.assertEqual(seen, list(range(25)))
+
+    def test_descending_limit_returns_latest(self):
+        page = self.storage.get_environment_data(limit=3, descending=True)
+        self.assertEqual([row['time_hour'] for row in page], [24, 23, 22])
+        cursor = (page[-1]['timestamp'], page[-1]['id'])
+        page = self.storage.get_environment_data(limit=2, after=cursor, descending=True)
+        self.assertEqual([row['time_hour'] for row in page], [21, 20])
+
+    def test_column_projection(self):
+        row = self.storage.get_environment_data(columns=['sound_volume'], limit=1)[0]
+        self.assertEqual(set(row), {'id', 'timestamp', 'sound_volume'})
+        with self.assertRaises(ValueError):
+            self.storage.get_environment_data(columns=['data'])
+
+    def test_iteration_in_fixed_batches(self):
+        batches = list(self.storage.iter_environment_data(columns=['time_hour'], batch_size=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual([row['time_hour'] for batch in batches for row in batch], list(range(25)))
+
+    def test_cursor_query_uses_timestamp_index(self):
+        where, params = self.storage._after('', (), ('2024-01-01T00:05:00', 11))
+        plan = self.storage.connections.get().execute(
+            f'EXPLAIN QUERY PLAN SELECT id FROM environment_data{where} ORDER BY timestamp, id LIMIT 10',
+            params).fetchall()
+        self.assertIn('idx_environment_data_timestamp', str(plan))
+        self.assertNotIn('TEMP B-TREE', str(plan))
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = DataStorage(os.path.join(self.tmpdir, 'test.db'), raw_days=1, hourly_days=2)
+        start = datetime(2024, 1, 1)
+        for i in range(4 * 24 * 2):
+            timestamp = start + timedelta(minutes=30 * i)
+            self.storage.save_environment_data(timestamp, {
+                'system_cpu_usage': i % 7,
+                'recommendations': {'sound_volume': timestamp.hour}})
+        self.now = datetime(2024, 1, 4, 12, 15)
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def queries(self):
+        return [self.storage.aggregate_environment_data('sound_volume', 'day', function)
+                for function in ('avg', 'min', 'max', 'count')] + [
+                # Hour resolution is only kept for hourly_days
+                self.storage.aggregate_environment_data('system_cpu_usage', 'hour_of_day',
+                                                        start=datetime(2024, 1, 2, 12)),
+                self.storage.aggregate_environment_data('sound_volume', 'hour',
+                                                        start=datetime(2024, 1, 3))]
+
+    def test_rollups_answer_queries_like_raw_data(self):
+        before = self.queries()
+        stats = self.storage.apply_retention(self.now)
+        after = self.queries()
+
+        self.assertEqual(stats['environment_daily'], 3)
+        self.assertGreater(stats['pruned_raw'], 0)
+        for expected, actual in zip(before, after):
+            self.assertEqual([b for b, _ in expected], [b for b, _ in actual])
+            for (_, e), (_, a) in zip(expected, actual):
+                self.assertAlmostEqual(e, a)
+
+    def test_old_tiers_pruned(self):
+        self.storage.apply_retention(self.now)
+        samples = self.storage.get_environment_data(columns=['sound_volume'])
+        self.assertEqual(samples[0]['timestamp'], '2024-01-03T12:30:00')
+
+        conn = self.storage.connections.get()
+        oldest_hour = conn.execute('SELECT MIN(bucket) FROM environment_hourly').fetchone()[0]
+        self.assertEqual(oldest_hour, '2024-01-02T12')
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM environment_daily').fetchone()[0], 3)
+
+    def test_feedback_samples_kept_for_training(self):
+        self.storage.store_feedback({'sound_volume': 30, 'satisfaction': 90,
+                                     'timestamp': datetime(2024, 1, 1, 6, 10)})
+        stats = self.storage.apply_retention(self.now)
+        self.assertGreater(stats['pruned_raw'], 0)
+
+        training_data = self.storage.get_training_data()
+        self.assertEqual(len(training_data), 1)
+        self.assertEqual(training_data[0]['features']['system_cpu_usage'], 12 % 7)
+        samples = self.storage.get_environment_data(columns=['system_cpu_usage'])
+        self.assertEqual(samples[0]['timestamp'], '2024-01-01T06:00:00')
+        self.assertEqual(samples[1]['timestamp'], '2024-01-03T12:30:00')
+
+    def test_analyze_history_covers_pruned_samples(self):
+        expected = self.storage.get_insights()
+        self.storage.apply_retention(self.now)
+        insights = analyze_history(self.storage, batch_size=50, max_workers=0)['insights']
+
+        self.assertEqual(insights['sample_count'], expected['sample_count'])
+        self.assertEqual(insights['weekday_histogram'], expected['weekday_histogram'])
+        for field in ('system_cpu_usage', 'sound_volume'):
+            self.assertAlmostEqual(insights['means'][field], expected['means'][field])
+        # Only the part after the daily rollups keeps its hours
+        self.assertEqual(sum(insights['hourly_histogram']), 4 * 48 - 3 * 48)
+
+        # Bounds apply at the resolution of the tier that covers them
+        for start, count in ((datetime(2024, 1, 3), 96), (datetime(2024, 1, 4, 6), 36)):
+            since = analyze_history(self.storage, start=start, max_workers=0)
+            self.assertEqual(since['insights']['sample_count'], count)
+
+    def test_repeated_runs_are_idempotent(self):
+        self.storage.apply_retention(self.now)
+        before = self.queries()
+        stats = self.storage.apply_retention(self.now)
+        self.assertEqual(stats['pruned_raw'], 0)
+        self.assertEqual(self.queries(), before)
+
+class TestColumnarDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'dataset')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_appends_are_memory_mapped_on_reopen(self):
+        dataset = ColumnarDataset(self.path)
+        dataset.append({'a': [1, 2], 'b': [3, 4]}, watermark=7)
+        dataset.append({'a': [5], 'b': [6]})
+
+        reopened = ColumnarDataset(self.path)
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.watermark, 7)
+        self.assertIsInstance(reopened.column('a'), np.memmap)
+        np.testing.assert_array_equal(reopened.matrix(['b', 'a'], start=1), [[4, 2], [6, 5]])
+
+    def test_mismatched_columns_rejected(self):
+        dataset = ColumnarDataset(self.path)
+        dataset.append({'a': [1]})
+        with self.assertRaises(ValueError):
+            dataset.append({'b': [1]})
+
+    def test_uncommitted_bytes_discarded(self):
+        dataset = ColumnarDataset(self.path)
+        dataset.append({'a': [1.0]})
+        # Simulate a crash after writing a column but before the manifest
+        with open(os.path.join(self.path, 'a.f64'), 'ab') as f:
+            np.array([99.0]).tofile(f)
+
+        dataset = ColumnarDataset(self.path)
+        self.assertEqual(len(dataset), 1)
+        dataset.append({'a': [2.0]})
+        np.testing.assert_array_equal(dataset.column('a'), [1.0, 2.0])
+
+class TestTypedSchema(unittest.TestCase):
+
+    SAMPLE = {'time_hour': 9, 'system_cpu_usage': 12.5, 'system_active_window': 'code.exe',
+              'calendar_has_current_meeting': True, 'system_active_processes': ['code.exe', 'slack.exe'],
+              'calendar_upcoming_meetings': [{'subject': 'Standup', 'start': '2024-01-01 10:00:00'}],
+              'weather': 'rain', 'recommendations': {'sound_volume': 40, 'app_arrangement': 'focused'}}
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'test.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_sample_round_trip(self):
+        storage = DataStorage(self.db_path)
+        storage.save_environment_data(datetime(2024, 1, 1, 9), self.SAMPLE)
+        sample = storage.get_environment_data(include_lists=True)[0]
+        storage.close()
+
+        for key, value in self.SAMPLE.items():
+            self.assertEqual(sample[key], value, key)
+        self.assertNotIn('calendar_current_meetings', sample)
+
+    def test_storages_sharing_a_database_keep_items_apart(self):
+        first = DataStorage(self.db_path)
+        second = DataStorage(self.db_path)
+        first.save_environment_data(datetime(2024, 1, 1, 9), {'system_active_processes': ['a.exe']})
+        second.save_environment_data(datetime(2024, 1, 1, 10), {'system_active_processes': ['b.exe']})
+        self.assertTrue(first.flush())
+        self.assertTrue(second.flush())
+        samples = first.get_environment_data(include_lists=True)
+        first.close()
+        second.close()
+
+        self.assertEqual([sample['system_active_processes'] for sample in samples],
+                         [['a.exe'], ['b.exe']])
+
+    def test_scalars_stored_in_typed_columns(self):
+        storage = DataStorage(self.db_path)
+        storage.save_environment_data(datetime(2024, 1, 1, 9), self.SAMPLE)
+        storage.flush()
+        row = storage.connections.get().execute(
+            'SELECT typeof(time_hour), typeof(system_cpu_usage), sound_volume, data '
+            'FROM environment_data').fetchone()
+        storage.close()
+
+        self.assertEqual(row[:3], ('integer', 'real', 40.0))
+        self.assertEqual(json.loads(row[3]), {'weather': 'rain'})
+
+    def test_legacy_database_migrated_in_place(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE environment_data (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                     'timestamp TEXT, data TEXT)')
+        conn.execute('INSERT INTO environment_data (timestamp, data) VALUES (?, ?)',
+                     ('2024-01-01T09:00:00', json.dumps(self.SAMPLE)))
+        conn.execute('INSERT INTO environment_data (timestamp, data) VALUES (?, ?)',
+                     ('2024-01-01T09:01:00', 'not json'))
+        conn.commit()
+        conn.close()
+
+        storage = DataStorage(self.db_path)
+        samples = storage.get_environment_data(include_lists=True)
+        version = storage.connections.get().execute('PRAGMA user_version').fetchone()[0]
+        storage.save_environment_data('2024-01-01T09:02:00', {'time_hour': 9})
+        ids = [sample['id'] for sample in storage.get_environment_data()]
+        storage.close()
+
+        self.assertEqual(version, 1)
+        self.assertEqual(samples[0]['system_active_processes'], ['code.exe', 'slack.exe'])
+        self.assertEqual(samples[0]['recommendations']['sound_volume'], 40)
+        self.assertEqual(ids, [1, 2, 3])
+
+    def test_hourly_average_in_sql(self):
+        storage = DataStorage(self.db_path)
+        for minute, volume in ((0, 20), (30, 40), (90, 70)):
+            storage.save_environment_data(datetime(2024, 1, 1, 9) + timedelta(minutes=minute),
+                                          {'recommendations': {'sound_volume': volume}})
+        averages = storage.aggregate_environment_data('sound_volume', bucket='hour',
+                                                      start=datetime(2024, 1, 1))
+        with self.assertRaises(ValueError):
+            storage.aggregate_environment_data('sound_volume; DROP TABLE models')
+        storage.close()
+
+        self.assertEqual(averages, [('2024-01-01T09', 30.0), ('2024-01-01T10', 70.0)])
+
+    def test_integer_column_average_is_not_truncated(self):
+        storage = DataStorage(self.db_path)
+        for minute in (1, 2):
+            storage.save_environment_data(datetime(2024, 1, 1, 9, minute), {'time_minute': minute})
+        averages = storage.aggregate_environment_data('time_minute', bucket='day')
+        storage.close()
+
+        self.assertEqual(averages, [('2024-01-01', 1.5)])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import tempfile
+import threading
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+from src.data.export import ColumnarDataset
+from src.ml.backends import OnlineRidgeRegressor, available_backends, benchmark_backends, create_backend
+from src.ml.models import UserPreferenceModel
+from src.ml.training import BackgroundTrainer
+
+def make_data(n=40):
+    rng = np.random.default_rng(0)
+    features = pd.DataFrame({'time_hour': rng.integers(0, 24, n),
+                             'system_cpu_usage': rng.uniform(0, 100, n)})
+    targets = pd.DataFrame({'lighting_brightness': rng.uniform(20, 90, n),
+                            'sound_volume': rng.uniform(10, 80, n)})
+    return features, targets
+
+class TestBackgroundTrainer(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = 0
+        self.models = []
+        self.release = threading.Event()
+
+    def load_data(self, force):
+        self.loads += 1
+        self.release.wait(5)
+        return make_data()
+
+    def on_model_ready(self, model, n_samples):
+        self.models.append((model, n_samples))
+
+    def test_model_handed_over_after_training(self):
+        self.release.set()
+        trainer = BackgroundTrainer(self.load_data, self.on_model_ready, use_process=False)
+        self.assertTrue(trainer.request())
+        trainer.wait(30)
+
+        self.assertEqual(len(self.models), 1)
+        model, n_samples = self.models[0]
+        self.assertEqual(n_samples, 40)
+        self.assertEqual(model.predict(make_data()[0]).shape, (40, 2))
+
+    def test_concurrent_requests_coalesced(self):
+        trainer = BackgroundTrainer(self.load_data, self.on_model_ready, use_process=False)
+        self.assertTrue(trainer.request())
+        self.assertFalse(trainer.request())
+        self.assertFalse(trainer.request(force=True))
+        self.assertTrue(trainer.is_training)
+
+        self.release.set()
+        trainer.wait(30)
+
+        # The first run plus one coalesced follow-up
+        self.assertEqual(self.loads, 2)
+        self.assertFalse(trainer.is_training)
+
+    def test_not_enough_data_keeps_old_model(self):
+        trainer = BackgroundTrainer(lambda force: None, self.on_model_ready, use_process=False)
+        trainer.request()
+        trainer.wait(5)
+        self.assertEqual(self.models, [])
+
+    def test_trains_in_worker_process(self):
+        self.release.set()
+        trainer = BackgroundTrainer(self.load_data, self.on_model_ready, use_process=True)
+        trainer.request()
+        trainer.wait(60)
+        trainer.shutdown()
+        self.assertEqual(len(self.models), 1)
+
+class TestModelBackends(unittest.TestCase):
+
+    def test_every_backend_trains_and_predicts(self):
+        features, targets = make_data()
+        for name in available_backends():
+            model = UserPreferenceModel(backend=name)
+            model.train(features, targets)
+            row = model.schema.fill({'time_hour': 9}, model.schema.new_row())
+            self.assertEqual(np.asarray(model.predict_row(row)).shape, (1, 2), name)
+
+    def test_training_from_memory_mapped_dataset_matches_matrix(self):
+        features, targets = make_data()
+        from_matrix = UserPreferenceModel(backend='ridge')
+        from_matrix.train(features, targets)
+
+        with tempfile.TemporaryDirectory() as path:
+            dataset = ColumnarDataset(path)
+            schema = from_matrix.schema
+            columns = dict(zip(schema.columns, schema.to_matrix(features).T))
+            columns.update({'y0': targets.iloc[:, 0], 'y1': targets.iloc[:, 1]})
+            dataset.append(columns)
+
+            from_dataset = UserPreferenceModel(backend='ridge')
+            from_dataset.train(dataset, ['y0', 'y1'], chunk_size=7)
+
+        row = schema.fill({'time_hour': 9}, schema.new_row())
+        expected = from_matrix.predict_row(row.copy())
+        np.testing.assert_allclose(from_dataset.predict_row(row), expected)
+
+    def test_unknown_backend_rejected(self):
+        with self.assertRaises(ValueError):
+            create_backend('deep_net')
+
+    def test_benchmark_reports_each_backend(self):
+        features, targets = make_data(80)
+        results = benchmark_backends(features, targets, backends=['ridge', 'shallow_forest'],
+                                     predict_repeats=5)
+        self.assertEqual([r['backend'] for r in results], ['ridge', 'shallow_forest'])
+        for result in results:
+            for key in ('fit_seconds', 'predict_ms', 'size_kb', 'mae'):
+                self.assertIn(key, result)
+
+    def test_benchmark_uses_backend_params(self):
+        features, targets = make_data(80)
+        results = benchmark_backends(features, targets, backends=['ridge', 'shallow_forest'],
+                                     predict_repeats=5, backend_params={'ridge': {'bogus': 1}})
+        # Only the backend the parameters were given for is built with them
+        self.assertIn('error', results[0])
+        self.assertNotIn('error', results[1])
+
+class TestOnlineRidge(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.X = rng.uniform(0, 100, (200, 3))
+        self.y = self.X @ np.array([[0.5, -1.0], [2.0, 0.1], [0.0, 0.3]]) + rng.normal(0, 1, (200, 2))
+
+    def test_matches_batch_ridge_on_standardized_features(self):
+        online = OnlineRidgeRegressor(alpha=5.0).fit(self.X, self.y)
+        scaler = StandardScaler().fit(self.X)
+        batch = Ridge(alpha=5.0).fit(scaler.transform(self.X), self.y)
+        np.testing.assert_allclose(online.predict(self.X[:10]),
+                                   batch.predict(scaler.transform(self.X[:10])), rtol=1e-6)
+
+    def test_streaming_equals_fit(self):
+        streamed = OnlineRidgeRegressor()
+        for i in range(0, 200, 7):
+            streamed.partial_fit(self.X[i:i + 7], self.y[i:i + 7])
+        fitted = OnlineRidgeRegressor().fit(self.X, self.y)
+        np.testing.assert_allclose(streamed.predict(self.X[:5]), fitted.predict(self.X[:5]))
+        self.assertEqual(streamed.n_samples_seen_, 200)
+
+    def test_unfitted_raises(self):
+        with self.assertRaises(ValueError):
+            OnlineRidgeRegressor().predict(self.X[:1])
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file